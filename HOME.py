@@ -2,27 +2,46 @@ import streamlit as st
 import subprocess
 import json
 import os
-import glob
-import psutil
 import time
-from PIL import Image
 from datetime import datetime
+from watcher_engine.actions_lib.log_tail import LogTailer
+from watcher_engine.actions_lib import library_index
+from watcher_engine.actions_lib import counter_store
+from watcher_engine.actions_lib import engine_status
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import thumbnails
 
 # --- 1. CONFIGURATION & VERSIONING ---
-# Version V26.2.17: 
-# - Stability Fix: Based on V26.2.13 logic.
+# Version V26.4.0: 
+# - Output: Selectable output format (PNG/WebP/JPEG/AVIF) and quality; gallery lists all formats.
+# - Loop: 'Redo Fan-out' setting (regenerations harvested per redo job).
+# - Perf: engine.log is tailed by byte offset (LogTailer); each tick reads only appended bytes.
+# Version V26.5.0: 
+# - Gallery: Backed by the SQLite library index; paginated with filename/prompt search and a 'prompt only' filter.
+# Version V26.6.0: 
+# - Counters: Read from counter_store (SQLite, written by the engine per job); counter.json and log-line counting removed.
+# - Loop tasks carry "loop": true; Start Loop opens a new counter session.
+# Version V26.7.0: 
+# - Engine discovery: Online state comes from the engine heartbeat (engine_status.json); no process-table scans.
+# Version V26.8.0: 
+# - Config: All config.json writes go through config_store (locked, atomic, field-level patches);
+#   the 2s config fragment only re-syncs widgets when config_version changes.
+# Version V26.8.1: 
+# - Log: engine.log is kept across engine starts (the engine rotates it); readiness is detected from the current end of the log.
+# Version V26.9.0: 
+# - Gallery: Shows cached WebP thumbnails (thumbnails service) instead of full-resolution outputs.
 # - Core Fix: Prevent Reset/Loop counters from jumping during first start.
-# - Defense Logic: Reset will ONLY increment if BOTH memory and physical counter.json show Total > 0.
 # - UI: Maintained English interface and 'stretch' width compliance.
-APP_VERSION = "V26.2.17"
+APP_VERSION = "V26.9.0"
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 ENGINE_DIR = os.path.join(ROOT_DIR, "watcher_engine")
 DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, "browser_outputs")
 CONFIG_FILE = os.path.join(ROOT_DIR, "config.json")
 TASK_FILE = os.path.join(ROOT_DIR, "task.json")
 LOG_FILE = os.path.join(ROOT_DIR, "engine.log")
-COUNTER_FILE = os.path.join(ROOT_DIR, "counter.json")
 TEMP_UPLOAD_DIR = os.path.join(ROOT_DIR, "temp_uploads")
+OUTPUT_FORMATS = ["png", "webp", "jpeg", "avif"]
+GALLERY_PAGE_SIZES = [12, 24, 48, 96]
 
 if not os.path.exists(TEMP_UPLOAD_DIR):
     os.makedirs(TEMP_UPLOAD_DIR)
@@ -30,15 +49,6 @@ if not os.path.exists(TEMP_UPLOAD_DIR):
 st.set_page_config(page_title=f"GemiPersona Pro {APP_VERSION}", layout="wide")
 
 # --- 2. JSON DATA PERSISTENCE ---
-def load_json_file(file_path, default_val):
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            pass
-    return default_val
-
 def save_json_file(file_path, data):
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
@@ -58,29 +68,31 @@ def initialize_config():
         "loop_count": 0,
         "count_until_switch": False,
         "count_until": 0,
+        "dedup_mode": "skip",
+        "dedup_phash_distance": 6,
+        "embed_xmp": False,
+        "output_format": "png",
+        "output_quality": 90,
+        "redo_fanout": 1,
+        "network_detection": False,
+        "profile_seconds": 60,
+        "gem_scrape_concurrency": 6,
+        "gem_cache_ttl_hours": 24,
+        "auth_check_ttl": 300,
         "selectors": {"textbox": 'div[role=\"textbox\"]', "send_btn": 'button[aria-label*=\"Send\"]', "img_list": "img"}
     }
-    disk_cfg = load_json_file(CONFIG_FILE, default_cfg)
-    
-    changed = False
-    for k, v in default_cfg.items():
-        if k not in disk_cfg:
-            disk_cfg[k] = v
-            changed = True
-            
-    if changed:
-        save_json_file(CONFIG_FILE, disk_cfg)
-    return disk_cfg
+    return config_store.patch(default_cfg, CONFIG_FILE, only_missing=True)
 
-def get_counter():
-    return load_json_file(COUNTER_FILE, {"total_count": 0, "image_save": 0, "image_decline": 0, "fail_count": 0, "line_offset": 0})
+def patch_config(updates):
+    """Field-level config update; keeps st.session_state.config in step with disk."""
+    st.session_state.config = config_store.patch(updates, CONFIG_FILE)
+    return st.session_state.config
 
-def update_counter(total, saved, decline, fail, offset):
-    data = {
-        "total_count": total, "image_save": saved, "image_decline": decline, "fail_count": fail, "line_offset": offset
-    }
-    save_json_file(COUNTER_FILE, data)
-    return data
+def get_counter():
+    try:
+        return counter_store.current()
+    except Exception:
+        return {"session_id": None, "total_count": 0, "image_save": 0, "image_decline": 0, "fail_count": 0}
 
 if 'config' not in st.session_state:
     st.session_state.config = initialize_config()
@@ -90,24 +102,19 @@ if 'is_first_run' not in st.session_state:
     st.session_state.is_first_run = True
 if 'last_processed_log_line' not in st.session_state:
     st.session_state.last_processed_log_line = ""
+if 'log_tailer' not in st.session_state:
+    st.session_state.log_tailer = LogTailer.at_end(LOG_FILE)
+    st.session_state.log_tailer.prime_last_line()
 
 # --- 3. SYSTEM UTILS ---
 def get_engine_info():
-    for proc in psutil.process_iter(['cmdline']):
-        try:
-            cmd = " ".join(proc.info.get('cmdline') or []).lower()
-            if "watcher.py" in cmd: return True, proc.pid
-        except: continue
-    return False, None
+    return engine_status.get_engine_info()
 
-def wait_for_browser_ready(timeout=20):
+def wait_for_browser_ready(timeout=20, tailer=None):
     start_time = time.time()
+    tailer = tailer or LogTailer.at_end(LOG_FILE)
     while time.time() - start_time < timeout:
-        if os.path.exists(LOG_FILE):
-            try:
-                with open(LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                    if ">>> Browser Ready" in f.read(): return True
-            except: pass
+        if any(">>> Browser Ready" in line for line in tailer.read_new_lines()): return True
         time.sleep(0.5)
     return False
 
@@ -138,20 +145,17 @@ with st.sidebar:
             if st.button("🛑 Shutdown Browser", width='stretch'):
                 save_json_file(TASK_FILE, {"action": "close_browser", "timestamp": time.time()})
                 time.sleep(1.5)
-                for proc in psutil.process_iter(['cmdline']):
-                    try:
-                        if "watcher.py" in " ".join(proc.info.get('cmdline') or []).lower(): proc.terminate()
-                    except: continue
+                engine_status.terminate_engine()
                 st.session_state.loop_active = False
                 st.rerun()
         else:
             VENV_PYTHON = os.path.normpath(os.path.join(ROOT_DIR, ".venv", "Scripts", "python.exe"))
             WATCHER_SCRIPT = os.path.normpath(os.path.join(ROOT_DIR, "watcher_engine", "watcher.py"))
             if st.button("🔥 Fire up Browser (Headless)", width='stretch', type="primary"):
+                ready_tailer = LogTailer.at_end(LOG_FILE)
                 subprocess.Popen([VENV_PYTHON, WATCHER_SCRIPT], creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
-                if os.path.exists(LOG_FILE): os.remove(LOG_FILE)
                 save_json_file(TASK_FILE, {"action": "launch_headless", "timestamp": time.time()})
-                wait_for_browser_ready(25)
+                wait_for_browser_ready(25, ready_tailer)
                 st.rerun()
     
     render_sidebar_status()
@@ -162,10 +166,7 @@ with st.sidebar:
             new_val = int(st.session_state.loop_count_input)
         except ValueError:
             new_val = 0
-        current_cfg = load_json_file(CONFIG_FILE, st.session_state.config)
-        current_cfg["loop_count"] = new_val
-        save_json_file(CONFIG_FILE, current_cfg)
-        st.session_state.config = current_cfg
+        patch_config({"loop_count": new_val})
 
     st.text_input("Loop Limit", 
                   value=str(st.session_state.config.get("loop_count", 0)), 
@@ -174,14 +175,11 @@ with st.sidebar:
                   disabled=st.session_state.loop_active)
     
     def update_count_until_settings():
-        current_cfg = load_json_file(CONFIG_FILE, st.session_state.config)
         try:
-            current_cfg["count_until"] = int(st.session_state.count_until_input)
+            count_until = int(st.session_state.count_until_input)
         except ValueError:
-            current_cfg["count_until"] = 0
-        current_cfg["count_until_switch"] = st.session_state.count_until_switch_input
-        save_json_file(CONFIG_FILE, current_cfg)
-        st.session_state.config = current_cfg
+            count_until = 0
+        patch_config({"count_until": count_until, "count_until_switch": st.session_state.count_until_switch_input})
 
     st.text_input("Count Until (Saved)", 
                   value=str(st.session_state.config.get("count_until", 0)),
@@ -196,6 +194,17 @@ with st.sidebar:
               help="If enabled, the loop will stop only when 'Saved' count matches target. Ignores Loop Limit.",
               disabled=st.session_state.loop_active)
 
+    def update_redo_fanout():
+        patch_config({"redo_fanout": int(st.session_state.redo_fanout_input)})
+
+    st.number_input("Redo Fan-out",
+                    min_value=1, max_value=10,
+                    value=int(st.session_state.config.get("redo_fanout", 1)),
+                    key="redo_fanout_input",
+                    on_change=update_redo_fanout,
+                    help="Regenerations per redo job. All variants are downloaded and saved in one batch.",
+                    disabled=st.session_state.loop_active)
+
     st.divider()
 
     def auto_save_config():
@@ -215,20 +224,24 @@ with st.sidebar:
             "save_dir": new_path,
             "name_prefix": st.session_state.prefix_input,
             "name_padding": st.session_state.padding_input,
-            "name_start": st.session_state.start_input
+            "name_start": st.session_state.start_input,
+            "output_format": st.session_state.format_input,
+            "output_quality": st.session_state.quality_input
         }
-        current_cfg = load_json_file(CONFIG_FILE, st.session_state.config)
-        current_cfg.update(updates)
-        save_json_file(CONFIG_FILE, current_cfg)
-        st.session_state.config = current_cfg
+        patch_config(updates)
 
     @st.fragment(run_every="2s")
     def render_config_inputs():
-        disk_data = load_json_file(CONFIG_FILE, st.session_state.config)
-        mapping = {"url_input": "url", "storage_input": "save_dir", "prefix_input": "name_prefix", "padding_input": "name_padding", "start_input": "name_start"}
-        for widget_key, disk_key in mapping.items():
-            if widget_key not in st.session_state or st.session_state[widget_key] != disk_data.get(disk_key):
-                st.session_state[widget_key] = disk_data.get(disk_key)
+        mapping = {"url_input": "url", "storage_input": "save_dir", "prefix_input": "name_prefix", "padding_input": "name_padding", "start_input": "name_start",
+                   "format_input": "output_format", "quality_input": "output_quality"}
+        # Re-sync widgets only when another writer bumped config_version (or on first render).
+        disk_data = config_store.load_if_changed(st.session_state.get("config_seen_version"), CONFIG_FILE)
+        if disk_data is not None or any(k not in st.session_state for k in mapping):
+            disk_data = disk_data if disk_data is not None else config_store.load(CONFIG_FILE, st.session_state.config)
+            st.session_state.config_seen_version = disk_data.get(config_store.VERSION_KEY, 0)
+            for widget_key, disk_key in mapping.items():
+                if widget_key not in st.session_state or st.session_state[widget_key] != disk_data.get(disk_key):
+                    st.session_state[widget_key] = disk_data.get(disk_key)
         
         st.text_input("Target URL", key="url_input", on_change=auto_save_config)
         st.text_input("Storage Path", key="storage_input", on_change=auto_save_config)
@@ -246,7 +259,12 @@ with st.sidebar:
         st.text_input("Name Prefix", key="prefix_input", on_change=auto_save_config)
         n_col1, n_col2 = st.columns(2)
         n_col1.number_input("Padding", min_value=1, max_value=10, key="padding_input", on_change=auto_save_config)
-        n_col2.number_input("Start No.", min_value=0, key="start_input", on_change=auto_save_config)
+        n_col2.number_input("Start No.", min_value=0, key="start_input", on_change=auto_save_config,
+                        help="Numbering restarts from this value when changed; the running index is kept in the output folder.")
+        f_col1, f_col2 = st.columns(2)
+        f_col1.selectbox("Format", OUTPUT_FORMATS, key="format_input", on_change=auto_save_config,
+                         help="Lossy formats keep the prompt in EXIF ImageDescription and the provenance record in XMP.")
+        f_col2.number_input("Quality", min_value=1, max_value=100, key="quality_input", on_change=auto_save_config)
 
     render_config_inputs()
     st.divider()
@@ -274,76 +292,42 @@ def render_live_status():
             st.rerun()
             return
 
-    if os.path.exists(LOG_FILE):
-        try:
-            with open(LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                all_lines = f.readlines()
-                if not all_lines: return
-                
-                offset = cnt.get("line_offset", 0)
-                new_lines = all_lines[offset:]
-                
-                cur_total = cnt['total_count']
-                cur_saved = cnt['image_save']
-                cur_decline = cnt['image_decline']
-                cur_fail = cnt.get('fail_count', 0)
-                
-                processed_count = 0
-                for line in new_lines:
-                    clean_line = line.strip()
-                    if not clean_line: continue
-                    processed_count += 1
-                    
-                    if st.session_state.loop_active:
-                        if "Executing Action:" in clean_line:
-                            cur_total += 1
-                    
-                    if "Saved:" in clean_line:
-                        cur_saved += 1
-                    
-                    if "Declined" in clean_line:
-                        cur_decline += 1
-                
-                if processed_count > 0:
-                    update_counter(cur_total, cur_saved, cur_decline, cur_fail, offset + processed_count)
-
-                last_line = all_lines[-1].strip()
-                if "[END]" in last_line and last_line != st.session_state.last_processed_log_line:
-                    st.session_state.loop_active = False
-                    st.session_state.last_processed_log_line = last_line
-                    st.rerun()
-                    return
-
-                if st.session_state.loop_active and ("[SUCCESS]" in last_line or "[FAIL]" in last_line) and last_line != st.session_state.last_processed_log_line:
-                    disk_cfg = load_json_file(CONFIG_FILE, {})
-                    task_list = disk_cfg.get("upload_task", [])
-                    
-                    if "[RESET_REQUIRED]" in last_line:
-                        # Defensive Fix: Read physical counter.json to double check the state
-                        physical_cnt = get_counter()
-                        # Increment reset only if memory AND physical counts indicate we are past the start phase
-                        if cur_total > 0 and physical_cnt.get('total_count', 0) > 0:
-                            cur_fail += 1
-                        update_counter(cur_total, cur_saved, cur_decline, cur_fail, offset + processed_count)
-                        save_json_file(TASK_FILE, {"action": "upload_test", "subject": disk_cfg.get('last_prompt', ""), "timestamp": time.time(), "attachments": task_list})
-                    else:
-                        save_json_file(TASK_FILE, {"action": "upload_test_redo", "subject": disk_cfg.get('last_prompt', ""), "timestamp": time.time()})
-                    
-                    st.session_state.last_processed_log_line = last_line
-
-                if "error" in last_line.lower() or "[FAIL]" in last_line: st.error(last_line)
-                elif "[SUCCESS]" in last_line: st.success(last_line)
-                elif "[END]" in last_line: st.warning(last_line)
-                else: st.info(last_line)
-        except Exception: pass
+    try:
+        # Counters are kept by the engine; the log is only tailed for the status line that drives the loop.
+        tailer = st.session_state.log_tailer
+        tailer.read_new_lines()
+        last_line = tailer.last_line
+        if not last_line: return
+
+        if "[END]" in last_line and last_line != st.session_state.last_processed_log_line:
+            st.session_state.loop_active = False
+            st.session_state.last_processed_log_line = last_line
+            st.rerun()
+            return
+
+        if st.session_state.loop_active and ("[SUCCESS]" in last_line or "[FAIL]" in last_line) and last_line != st.session_state.last_processed_log_line:
+            disk_cfg = config_store.load(CONFIG_FILE)
+            task_list = disk_cfg.get("upload_task", [])
+            
+            if "[RESET_REQUIRED]" in last_line:
+                save_json_file(TASK_FILE, {"action": "upload_test", "subject": disk_cfg.get('last_prompt', ""), "timestamp": time.time(), "attachments": task_list, "loop": True})
+            else:
+                save_json_file(TASK_FILE, {"action": "upload_test_redo", "subject": disk_cfg.get('last_prompt', ""), "timestamp": time.time(), "loop": True})
+            
+            st.session_state.last_processed_log_line = last_line
+
+        if "error" in last_line.lower() or "[FAIL]" in last_line: st.error(last_line)
+        elif "[SUCCESS]" in last_line: st.success(last_line)
+        elif "[END]" in last_line: st.warning(last_line)
+        else: st.info(last_line)
+    except Exception: pass
 
 render_live_status()
 
 # --- 6. MAIN UI ---
 input_prompt = st.text_area("Prompt Input", value=st.session_state.config.get('last_prompt', ""), height=120, label_visibility="collapsed")
 if input_prompt != st.session_state.config.get('last_prompt', ""):
-    cfg = load_json_file(CONFIG_FILE, st.session_state.config); cfg['last_prompt'] = input_prompt
-    save_json_file(CONFIG_FILE, cfg); st.session_state.config = cfg
+    patch_config({"last_prompt": input_prompt})
 
 uploaded_files = st.file_uploader("Upload", type=["png", "jpg", "jpeg", "webp"], accept_multiple_files=True, label_visibility="collapsed")
 if uploaded_files:
@@ -352,8 +336,7 @@ if uploaded_files:
         t_path = os.path.join(TEMP_UPLOAD_DIR, f.name)
         with open(t_path, "wb") as buf: buf.write(f.getbuffer())
         if t_path not in current_tasks: current_tasks.append(t_path)
-    cfg = load_json_file(CONFIG_FILE, st.session_state.config); cfg["upload_task"] = current_tasks
-    save_json_file(CONFIG_FILE, cfg); st.session_state.config = cfg; st.rerun()
+    patch_config({"upload_task": current_tasks}); st.rerun()
 
 task_list = st.session_state.config.get("upload_task", [])
 if task_list:
@@ -364,10 +347,7 @@ if task_list:
                 file_name = os.path.basename(img_path) 
                 st.image(img_path, width='stretch', caption=file_name) 
                 if st.button("X", key=f"del_{i}", width='stretch'):
-                    task_list.remove(img_path)
-                    cfg = load_json_file(CONFIG_FILE, st.session_state.config)
-                    cfg["upload_task"] = task_list
-                    save_json_file(CONFIG_FILE, cfg)
+                    patch_config({"upload_task": [p for p in task_list if p != img_path]})
                     st.rerun()
 
 btn_col1, btn_col2 = st.columns(2)
@@ -379,13 +359,8 @@ with btn_col2:
     is_active = st.session_state.loop_active
     if st.button("Stop Loop" if is_active else "Start Loop", disabled=not get_engine_info()[0], width='stretch', type="secondary" if is_active else "primary"):
         if not is_active:
-            start_off = 0
-            if os.path.exists(LOG_FILE):
-                with open(LOG_FILE, "r", encoding="utf-8", errors="ignore") as f:
-                    lines = f.readlines()
-                    if lines: start_off = len(lines)
-            update_counter(0, 0, 0, 0, start_off); st.session_state.is_first_run = True 
-            save_json_file(TASK_FILE, {"action": "upload_test", "subject": input_prompt, "timestamp": time.time(), "attachments": task_list})
+            counter_store.start_session(); st.session_state.is_first_run = True 
+            save_json_file(TASK_FILE, {"action": "upload_test", "subject": input_prompt, "timestamp": time.time(), "attachments": task_list, "loop": True})
             st.session_state.loop_active = True
         else:
             st.session_state.loop_active = False
@@ -394,20 +369,35 @@ with btn_col2:
 @st.fragment(run_every="5s")
 def render_gallery():
     target_path = st.session_state.config.get('save_dir', DEFAULT_OUTPUT_DIR)
-    if os.path.exists(target_path):
-        files = glob.glob(os.path.join(target_path, "*.png"))
-        files.sort(key=os.path.getmtime, reverse=True)
-        if files:
-            grid = st.columns(4)
-            for i, fpath in enumerate(files):
-                with grid[i % 4]:
-                    has_meta = False
-                    try:
-                        with Image.open(fpath) as img:
-                            if "Prompt" in img.info: has_meta = True
-                    except: pass
-                    st.image(fpath, width='stretch')
-                    if st.button(f"🔍 {os.path.basename(fpath)}{' 📝' if has_meta else ''}", key=f"gal_btn_{i}", width='stretch'):
-                        os.startfile(os.path.normpath(fpath))
+    if not os.path.exists(target_path): return
+    try:
+        library_index.sync(target_path)
+    except Exception as e:
+        st.warning(f"Gallery index unavailable: {e}")
+        return
+
+    g_col1, g_col2, g_col3 = st.columns([3, 1, 1])
+    search = g_col1.text_input("Search", placeholder="File name or prompt text", key="gal_search", label_visibility="collapsed")
+    prompt_only = g_col2.checkbox("📝 only", key="gal_prompt_only")
+    page_size = g_col3.selectbox("Per page", GALLERY_PAGE_SIZES, key="gal_page_size", label_visibility="collapsed")
+
+    total = library_index.count(target_path, search, prompt_only)
+    if total == 0:
+        st.caption("No images.")
+        return
+    pages = (total + page_size - 1) // page_size
+    if st.session_state.get("gal_page", 1) > pages: st.session_state.gal_page = pages
+    p_col1, p_col2 = st.columns([1, 4])
+    page_no = p_col1.number_input("Page", min_value=1, max_value=pages, step=1, key="gal_page", label_visibility="collapsed")
+    p_col2.caption(f"Page {page_no} / {pages} · {total} images")
+
+    rows = library_index.page(target_path, (page_no - 1) * page_size, page_size, search, prompt_only)
+    grid = st.columns(4)
+    for i, row in enumerate(rows):
+        fpath = os.path.join(target_path, row["name"])
+        with grid[i % 4]:
+            st.image(thumbnails.thumbnail_path(fpath), width='stretch')
+            if st.button(f"🔍 {row['name']}{' 📝' if row['has_prompt'] else ''}", key=f"gal_btn_{row['name']}", width='stretch'):
+                os.startfile(os.path.normpath(fpath))
 
 render_gallery()
\ No newline at end of file
@@ -0,0 +1,197 @@
+# benchmarks/bench_engine.py
+# Version: V1.0.0
+# Description: End-to-end throughput benchmark of the engine against the local mock Gemini (no quota, no network).
+# Launches a real GemiWatcher browser on the mock, then drives dispatch_action() the way the HOME loop does:
+# 'upload_test' first, then 'upload_test_redo' until a job logs [RESET_REQUIRED] (-> fresh upload_test) or [END].
+# Everything the engine writes (config, counters, outputs, browser profile, log) goes to a temporary workspace;
+# the real config.json / counters.db / engine.log / library cache / sign-in files are not touched.
+# Reports jobs/hour, images/hour and per-action latency percentiles; --json writes the full result.
+#
+#   python -m benchmarks.bench_engine --jobs 20 --latency 3 --refusal-rate 0.1 --fanout 2
+#   python -m benchmarks.bench_engine --jobs 10 --network-detection --headed
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import mock_gemini
+
+END_MARKERS = ("[SUCCESS]", "[FAIL]", "[END]")
+# Satisfies auth_check's cookie pre-check for the dispatcher's sign-in gate.
+SESSION_COOKIES = ("SID", "__Secure-1PSID", "__Secure-3PSID", "SAPISID")
+
+class MarkerHandler(logging.Handler):
+    """Remembers the last scheduling line ([SUCCESS]/[FAIL]/[END]) the engine logged, like HOME's log tail."""
+    def __init__(self):
+        super().__init__()
+        self.last_marker = None
+
+    def emit(self, record):
+        msg = record.getMessage()
+        if any(m in msg for m in END_MARKERS):
+            self.last_marker = msg
+
+def percentile(values, p):
+    if not values: return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def write_config(path, base_url, save_dir, args):
+    cfg = {
+        "url": f"{base_url}/app",
+        "save_dir": save_dir,
+        "last_prompt": args.prompt,
+        "upload_task": [],
+        "name_prefix": "bench_",
+        "name_padding": 4,
+        "name_start": 1,
+        "dedup_mode": "skip",
+        "dedup_phash_distance": 6,
+        "output_format": args.output_format,
+        "output_quality": 90,
+        "redo_fanout": args.fanout,
+        "network_detection": args.network_detection,
+        "declined_msg": [],
+        "quota_exceeded_msg": [],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, indent=4, ensure_ascii=False)
+
+def setup_workspace(workdir):
+    """Point the engine's file locations into the workspace before watcher is imported (it logs on import)."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler(os.path.join(workdir, "engine.log"), encoding="utf-8")])
+    from watcher_engine.actions_lib import counter_store, library_index, auth_check, provenance
+    counter_store.DB_FILE = os.path.join(workdir, "counters.db")
+    library_index.CACHE_DIR = os.path.join(workdir, "library_cache")
+    auth_check.STATE_FILE = os.path.join(workdir, "state.json")
+    auth_check.DEBUG_DIR = os.path.join(workdir, "debug")
+    provenance.SIGNIN_FILE = os.path.join(workdir, "signin_state.json")
+    from watcher_engine import watcher
+    watcher.CONFIG_FILE = os.path.join(workdir, "config.json")
+    watcher.USER_DATA_DIR = os.path.join(workdir, "browser_profile")
+    watcher.STATE_FILE = os.path.join(workdir, "state.json")
+    watcher.TASK_FILE = os.path.join(workdir, "task.json")
+    return watcher, counter_store
+
+async def run_benchmark(args, base_url, workdir):
+    watcher, counter_store = setup_workspace(workdir)
+    write_config(watcher.CONFIG_FILE, base_url, os.path.join(workdir, "outputs"), args)
+    markers = MarkerHandler()
+    watcher.logger.addHandler(markers)
+    if args.verbose:
+        watcher.logger.addHandler(logging.StreamHandler())
+
+    engine = watcher.GemiWatcher()
+    t0 = time.perf_counter()
+    await engine.launch_browser(headless=not args.headed)
+    if not engine.page:
+        raise RuntimeError("Browser launch failed (see engine.log in the workspace).")
+    launch_s = time.perf_counter() - t0
+    expires = time.time() + 3600
+    await engine.browser_context.add_cookies([
+        {"name": n, "value": "bench", "domain": ".google.com", "path": "/", "expires": expires} for n in SESSION_COOKIES])
+
+    session_id = counter_store.start_session()
+    jobs, action = [], "upload_test"
+    bench_start = time.perf_counter()
+    try:
+        for i in range(args.jobs):
+            markers.last_marker, engine.last_job = None, None
+            started = time.perf_counter()
+            await engine.dispatch_action(action, {"action": action, "loop": True})
+            elapsed = time.perf_counter() - started
+            line = markers.last_marker or ""
+            ok = bool(engine.last_job and engine.last_job.get("ok"))
+            jobs.append({"action": action, "seconds": round(elapsed, 3), "ok": ok, "line": line})
+            print(f"[{i + 1}/{args.jobs}] {action:<17} {elapsed:7.2f}s  {'ok ' if ok else 'bad'}  {line[:70]}")
+            if "[END]" in line: break
+            action = "upload_test" if "[RESET_REQUIRED]" in line or not line else "upload_test_redo"
+    finally:
+        wall = time.perf_counter() - bench_start
+        if engine.browser_context:
+            await engine.browser_context.close()
+            await engine.playwright.stop()
+
+    per_job = counter_store.session_jobs(session_id, limit=len(jobs) + 10)
+    saved = sum(j.get("saved", 0) for j in per_job)
+    declined = sum(j.get("declined", 0) for j in per_job)
+    return {"launch_seconds": round(launch_s, 2), "wall_seconds": round(wall, 2), "jobs": jobs,
+            "saved": saved, "declined": declined}
+
+def summarize(result, mock_stats, args):
+    jobs, wall = result["jobs"], max(result["wall_seconds"], 1e-9)
+    summary = {
+        "jobs": len(jobs),
+        "ok_jobs": sum(j["ok"] for j in jobs),
+        "images_saved": result["saved"],
+        "declined": result["declined"],
+        "wall_seconds": result["wall_seconds"],
+        "launch_seconds": result["launch_seconds"],
+        "jobs_per_hour": round(len(jobs) * 3600 / wall, 1),
+        "images_per_hour": round(result["saved"] * 3600 / wall, 1),
+        "latency": {},
+        "mock": mock_stats,
+        "settings": {k: v for k, v in vars(args).items() if k not in ("json",)},
+    }
+    for action in sorted({j["action"] for j in jobs}):
+        secs = [j["seconds"] for j in jobs if j["action"] == action]
+        summary["latency"][action] = {"n": len(secs), **{f"p{p}": round(percentile(secs, p), 2) for p in (50, 90, 95, 99)},
+                                      "max": round(max(secs), 2)}
+    return summary
+
+def print_summary(s):
+    print()
+    print(f"Jobs: {s['jobs']} ({s['ok_jobs']} ok)   Images saved: {s['images_saved']}   Declined: {s['declined']}")
+    print(f"Wall: {s['wall_seconds']}s (+{s['launch_seconds']}s launch)   "
+          f"Throughput: {s['jobs_per_hour']} jobs/h, {s['images_per_hour']} images/h")
+    print(f"{'action':<18}{'n':>4}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for action, lat in s["latency"].items():
+        print(f"{action:<18}{lat['n']:>4}" + "".join(f"{lat[k]:>9.2f}" for k in ("p50", "p90", "p95", "p99", "max")))
+    print(f"Mock backend: {s['mock']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine throughput benchmark against the local mock Gemini.")
+    parser.add_argument("--jobs", type=int, default=10, help="number of jobs to dispatch")
+    parser.add_argument("--fanout", type=int, default=1, help="redo_fanout for upload_test_redo jobs")
+    parser.add_argument("--network-detection", action="store_true", help="enable network_monitor")
+    parser.add_argument("--output-format", default="png", choices=["png", "webp", "jpeg", "avif"])
+    parser.add_argument("--prompt", default="benchmark prompt: a lighthouse at dusk")
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary workspace")
+    parser.add_argument("--verbose", action="store_true", help="echo the engine log")
+    parser.add_argument("--json", help="write the summary to this file")
+    mock_gemini.add_mock_args(parser)
+    args = parser.parse_args(argv)
+
+    mock = mock_gemini.mock_from_args(args)
+    server, base_url = mock_gemini.serve(mock)
+    workdir = tempfile.mkdtemp(prefix="gemi_bench_")
+    print(f"Mock Gemini: {base_url}   Workspace: {workdir}")
+    try:
+        result = asyncio.run(run_benchmark(args, base_url, workdir))
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    summary = summarize(result, dict(mock.stats), args)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**summary, "job_log": result["jobs"]}, f, indent=4, ensure_ascii=False)
+    return 0 if summary["ok_jobs"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+# benchmarks/mock_gemini.py
+# Version: V1.0.0
+# Description: Local stand-in for the Gemini web app (stdlib http.server, no network access needed).
+# Serves one page implementing the DOM contracts the engine actions rely on:
+#   [role="textbox"] (handles 'paste' itself, since synthetic paste events have no default action; Enter
+#   submits), 'Create image' tool button, upload menu (mat-icon add_2 -> 'Upload files' -> file chooser),
+#   <model-response> turns with <mat-progress-bar> while generating, Regenerate button -> .cdk-overlay-pane
+#   'Try again', image lightbox with a 'Download' button, refusal / quota texts.
+# Each generation POSTs to a fake '.../BardFrontendService/StreamGenerate' endpoint answering in Gemini's framing
+# (")]}'" + a '["wrb.fr", null, "<json>"]' envelope with the echoed prompt and the reply candidate), so
+# network_monitor is exercised too. Latency, images per response and refusal / failure / quota behaviour are
+# configurable.
+#
+# Manual use:  python -m benchmarks.mock_gemini --port 8765 --latency 3 --refusal-rate 0.1
+# then browse http://127.0.0.1:8765/app
+
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STREAM_PATH = "/_/BardChatUi/data/assistant.lamda.BardFrontendService/StreamGenerate"
+IMAGE_SIZE = 256
+# Texts matched by browser_crtl_logic.load_status_keywords (built-in keyword lists).
+REFUSAL_TEXT = "这个请求违反了我们的内容规范，换个点子试试吧。"
+QUOTA_TEXT = "You've reached your limit for image generation today. Daily limit resets tomorrow."
+ERROR_TEXT = "Something went wrong. Please try again later."
+
+PAGE_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Gemini</title>
+<style>
+body { font-family: sans-serif; margin: 0; padding: 16px 16px 120px; }
+#chat { max-width: 1100px; }
+user-query { display: block; margin: 12px 0 4px; font-weight: bold; }
+model-response { display: block; min-height: 40px; padding: 8px; border: 1px solid #ddd; border-radius: 8px; }
+model-response img { width: 256px; height: 256px; margin: 4px; cursor: pointer; }
+mat-progress-bar { display: block; height: 4px; background: linear-gradient(90deg, #4285f4, #ddd); }
+#composer { position: fixed; bottom: 0; left: 0; right: 0; background: #fff; padding: 8px; border-top: 1px solid #ccc; }
+[role="textbox"] { min-height: 32px; border: 1px solid #888; padding: 6px; }
+.cdk-overlay-pane, #upload-menu { position: fixed; top: 40%; left: 40%; background: #fff; border: 1px solid #333; padding: 4px; z-index: 10; }
+#lightbox { position: fixed; inset: 0; background: rgba(0,0,0,.85); display: none; z-index: 20; }
+#lightbox.open { display: block; }
+#lightbox img { width: 512px; margin: 32px; }
+#attachments span { margin-right: 8px; font-size: 12px; }
+</style></head>
+<body>
+<div id="chat"></div>
+<div id="composer">
+  <button id="add-btn"><mat-icon data-mat-icon-name="add_2">add_2</mat-icon></button>
+  <button id="tool-btn">Create image</button>
+  <span id="attachments"></span>
+  <div role="textbox" contenteditable="true" aria-label="Prompt"></div>
+  <input type="file" id="file-input" multiple style="display:none">
+</div>
+<div id="lightbox"><img id="lb-img"><button aria-label="Download" id="dl-btn">Download</button></div>
+<script>
+const chat = document.getElementById('chat');
+const tb = document.querySelector('[role="textbox"]');
+const fileInput = document.getElementById('file-input');
+let lastPrompt = "", lightboxUrl = null;
+
+function closeMenus() { document.querySelectorAll('.cdk-overlay-pane, #upload-menu').forEach(m => m.remove()); }
+
+tb.addEventListener('paste', (e) => {
+  e.preventDefault();
+  document.execCommand('insertText', false, e.clipboardData.getData('text/plain'));
+});
+
+tb.addEventListener('keydown', (e) => {
+  if (e.key !== 'Enter' || e.shiftKey) return;
+  e.preventDefault();
+  const text = tb.innerText.trim();
+  if (!text) return;
+  lastPrompt = text;
+  tb.innerText = '';
+  const q = document.createElement('user-query');
+  q.innerText = text;
+  chat.appendChild(q);
+  const resp = document.createElement('model-response');
+  chat.appendChild(resp);
+  generate(resp, false);
+});
+
+function generate(resp, redo) {
+  document.querySelectorAll('button[aria-label="Regenerate"]').forEach(b => b.remove());
+  resp.innerHTML = '';
+  resp.appendChild(document.createElement('mat-progress-bar'));
+  fetch(STREAM, { method: 'POST', body: JSON.stringify({ prompt: lastPrompt, redo }) })
+    .then(r => r.text())
+    .then(t => render(resp, parseStream(t)))
+    .catch(() => render(resp, { outcome: 'error', text: 'Network error' }));
+}
+
+function parseStream(body) {
+  // Last envelope line -> inner payload -> first reply candidate: [id, [text], null, [marker, image urls]].
+  const line = body.split('\n').filter(l => l.startsWith('[')).pop();
+  const cand = JSON.parse(JSON.parse(line)[0][2])[4][0];
+  return { text: cand[1][0], images: cand[3] ? cand[3][1] : [] };
+}
+
+function render(resp, d) {
+  resp.innerHTML = '';
+  const text = document.createElement('div');
+  text.className = 'markdown';
+  text.innerText = d.text;
+  resp.appendChild(text);
+  for (const url of (d.images || [])) {
+    const img = document.createElement('img');
+    img.src = url;
+    img.addEventListener('click', () => openLightbox(url));
+    resp.appendChild(img);
+  }
+  const regen = document.createElement('button');
+  regen.setAttribute('aria-label', 'Regenerate');
+  regen.innerHTML = '<mat-icon data-mat-icon-name="refresh">refresh</mat-icon>';
+  regen.addEventListener('click', () => openRedoMenu(resp));
+  resp.appendChild(regen);
+}
+
+function openRedoMenu(resp) {
+  closeMenus();
+  const pane = document.createElement('div');
+  pane.className = 'cdk-overlay-pane';
+  for (const label of ['Try again', 'Shorter', 'Longer']) {
+    const item = document.createElement('button');
+    item.setAttribute('role', 'menuitem');
+    item.className = 'mat-mdc-menu-item';
+    item.innerText = label;
+    item.addEventListener('click', () => { closeMenus(); generate(resp, true); });
+    pane.appendChild(item);
+  }
+  document.body.appendChild(pane);
+}
+
+document.getElementById('add-btn').addEventListener('click', () => {
+  closeMenus();
+  const menu = document.createElement('div');
+  menu.id = 'upload-menu';
+  menu.innerHTML = '<span class="menu-text">Upload files</span>';
+  menu.firstChild.addEventListener('click', () => { closeMenus(); fileInput.click(); });
+  document.body.appendChild(menu);
+});
+
+fileInput.addEventListener('change', () => {
+  for (const f of fileInput.files) {
+    const chip = document.createElement('span');
+    chip.innerText = f.name;
+    document.getElementById('attachments').appendChild(chip);
+  }
+});
+
+document.getElementById('tool-btn').addEventListener('click', (e) => e.target.classList.add('selected'));
+
+function openLightbox(url) {
+  lightboxUrl = url;
+  document.getElementById('lb-img').src = url;
+  document.getElementById('lightbox').classList.add('open');
+}
+
+document.getElementById('dl-btn').addEventListener('click', () => {
+  const a = document.createElement('a');
+  a.href = lightboxUrl + '?download=1';
+  a.download = lightboxUrl.split('/').pop();
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+});
+
+document.addEventListener('keydown', (e) => {
+  if (e.key === 'Escape') { document.getElementById('lightbox').classList.remove('open'); closeMenus(); }
+});
+
+const STREAM = "%STREAM_PATH%";
+</script>
+</body></html>
+""".replace("%STREAM_PATH%", STREAM_PATH)
+
+def make_png(seed, size=IMAGE_SIZE):
+    """Deterministic, visually distinct RGB PNG (so dedup neither skips nor near-flags the outputs)."""
+    rng = random.Random(seed)
+    a, b, c = rng.randrange(1, 255), rng.randrange(1, 255), rng.randrange(1, 255)
+    rows = []
+    for y in range(size):
+        row = bytearray(b"\x00")
+        for x in range(size):
+            row += bytes(((x * a) >> 3 & 255, (y * b) >> 3 & 255, ((x ^ y) * c) >> 4 & 255))
+        rows.append(bytes(row))
+
+    def chunk(ctype, body):
+        return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b""))
+
+class MockGemini:
+    """
+    Behaviour of the fake backend. latency/jitter in seconds per generation; refusal_rate and failure_rate are
+    probabilities per generation (a failure renders an error text and never an image, i.e. the engine times out);
+    quota_after ends every generation after that many with the quota text (0 = never).
+    """
+    def __init__(self, latency=2.0, jitter=0.5, images=1, refusal_rate=0.0, failure_rate=0.0, quota_after=0, seed=0):
+        self.latency, self.jitter, self.images = latency, jitter, images
+        self.refusal_rate, self.failure_rate, self.quota_after = refusal_rate, failure_rate, quota_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"generations": 0, "success": 0, "refused": 0, "error": 0, "quota": 0, "downloads": 0}
+        self._png_cache = {}
+        self._next_image = 0
+
+    def next_outcome(self):
+        with self.lock:
+            self.stats["generations"] += 1
+            n = self.stats["generations"]
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter))
+            roll = self.rng.random()
+            if self.quota_after and n > self.quota_after:
+                outcome = "quota"
+            elif roll < self.refusal_rate:
+                outcome = "refused"
+            elif roll < self.refusal_rate + self.failure_rate:
+                outcome = "error"
+            else:
+                outcome = "success"
+            self.stats[outcome] += 1
+            ids = []
+            if outcome == "success":
+                ids = list(range(self._next_image, self._next_image + self.images))
+                self._next_image += self.images
+        return outcome, delay, ids
+
+    def payload(self, outcome, ids, prompt=""):
+        """StreamGenerate body: the prompt is echoed beside the reply, as in Gemini's own stream."""
+        if outcome == "success":
+            # 'image_generation_content' is one of network_monitor.IMAGE_MARKERS.
+            candidate = ["rc_mock", ["Here are your images."], None,
+                         ["image_generation_content", [f"/img/{i}.png" for i in ids]]]
+        else:
+            candidate = ["rc_mock", [{"refused": REFUSAL_TEXT, "quota": QUOTA_TEXT}.get(outcome, ERROR_TEXT)]]
+        inner = json.dumps([None, ["c_mock", "r_mock"], [[prompt]], None, [candidate]], ensure_ascii=False)
+        envelope = json.dumps([["wrb.fr", None, inner]], ensure_ascii=False)
+        return f")]}}'\n\n{len(envelope)}\n{envelope}\n"
+
+    def png(self, image_id):
+        with self.lock:
+            if image_id not in self._png_cache:
+                self._png_cache[image_id] = make_png(image_id)
+            return self._png_cache[image_id]
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, code, body, ctype, extra=None):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path.startswith("/img/") and path.endswith(".png"):
+                try:
+                    image_id = int(path[5:-4])
+                except ValueError:
+                    return self._send(404, b"not found", "text/plain")
+                extra = None
+                if "download=1" in query:
+                    with mock.lock: mock.stats["downloads"] += 1
+                    extra = {"Content-Disposition": f'attachment; filename="gemini_{image_id}.png"'}
+                return self._send(200, mock.png(image_id), "image/png", extra)
+            if path == "/stats":
+                with mock.lock: body = json.dumps(mock.stats).encode()
+                return self._send(200, body, "application/json")
+            if path == "/favicon.ico":
+                return self._send(404, b"", "text/plain")
+            return self._send(200, PAGE_HTML.encode("utf-8"), "text/html; charset=utf-8")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = self.rfile.read(length) if length else b""
+            if self.path.split("?")[0] != STREAM_PATH:
+                return self._send(404, b"not found", "text/plain")
+            outcome, delay, ids = mock.next_outcome()
+            time.sleep(delay)
+            try:
+                prompt = json.loads(request or b"{}").get("prompt", "")
+            except ValueError:
+                prompt = ""
+            return self._send(200, mock.payload(outcome, ids, prompt).encode("utf-8"), "application/json; charset=utf-8")
+    return Handler
+
+def serve(mock, host="127.0.0.1", port=0):
+    """Start the server in a daemon thread; returns (server, base_url). Stop with server.shutdown()."""
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-gemini", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def add_mock_args(parser):
+    parser.add_argument("--latency", type=float, default=2.0, help="mean generation latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency standard deviation in seconds")
+    parser.add_argument("--images", type=int, default=1, help="images per successful response")
+    parser.add_argument("--refusal-rate", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--quota-after", type=int, default=0, help="quota text after N generations (0 = never)")
+    parser.add_argument("--seed", type=int, default=0)
+
+def mock_from_args(args):
+    return MockGemini(args.latency, args.jitter, args.images, args.refusal_rate, args.failure_rate,
+                      args.quota_after, args.seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Gemini web UI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_args(parser)
+    args = parser.parse_args()
+    server, url = serve(mock_from_args(args), args.host, args.port)
+    print(f"Mock Gemini at {url}/app  (stats: {url}/stats). Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,445 @@
+# benchmarks/replay_harness.py
+# Version: V1.0.0
+# Description: Record-and-replay fixtures of real Gemini sessions for detection / download regression and timing.
+# record  Runs engine actions on the real signed-in profile while Playwright writes a HAR (session.har.zip) and
+#         the engine's own log lines trigger DOM snapshots at key phases (ready, submitted, generating, refused,
+#         images, done...). Each snapshot stores the detector verdict (check_response_status) and selector probe
+#         counts in manifest.json. Cookie / auth headers are scrubbed from the HAR afterwards.
+# replay  --mode dom: loads each snapshot (scripts stripped, sub-resources from the HAR) and re-runs detection,
+#         reporting verdict matches and load / detection latency. No account, no network.
+#         --mode har: runs the recorded actions again on a HAR-routed page. StreamGenerate responses are served
+#         in recorded order (their request bodies carry per-request tokens, so route_from_har cannot match them);
+#         other unmatched requests are aborted. Phase timings are compared against the recording.
+# diff    Compares the phases of two fixtures or replay results (--json) to spot UI changes: verdicts, selector
+#         counts and timing shifts.
+# Fixtures default to benchmarks/fixtures/<name> (git-ignored: they contain account content).
+#
+#   python -m benchmarks.replay_harness record lighthouse --actions upload_test,upload_test_redo
+#   python -m benchmarks.replay_harness replay lighthouse --mode dom --runs 5
+#   python -m benchmarks.replay_harness replay lighthouse --mode har --json replay.json
+#   python -m benchmarks.replay_harness diff lighthouse replay.json
+
+import os
+import re
+import sys
+import json
+import time
+import base64
+import shutil
+import asyncio
+import logging
+import zipfile
+import argparse
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import bench_engine
+from watcher_engine.actions_lib import auth_check
+
+FIXTURES_DIR = os.path.join(ROOT_DIR, "benchmarks", "fixtures")
+HAR_NAME = "session.har.zip"
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_DIR = "snapshots"
+VIEWPORT = {'width': 2560, 'height': 1440}
+STREAM_URL = re.compile(r"StreamGenerate")
+SCRIPT_TAG = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
+SECRET_HEADERS = {"cookie", "set-cookie", "authorization", "x-goog-authuser", "x-client-data"}
+
+# Engine log fragment -> phase name (first match wins).
+PHASES = (
+    ("[SIGNAL] Textbox detected", "ready"),
+    ("[SIGNAL] Prompt submitted", "submitted"),
+    ("Redo triggered successfully", "redo_triggered"),
+    ("Status: generating", "generating"),
+    ("[DETECTION] Blocked", "refused"),
+    ("[DETECTION] Quota Limit", "quota_exceeded"),
+    ("[SIGNAL] Images detected", "images"),
+    ("[SUCCESS]", "done"),
+    ("[FAIL]", "done"),
+    ("[END]", "done"),
+)
+
+# Selectors the actions and auth_check depend on; counted in every snapshot.
+PROBES = {
+    "textbox": '[role="textbox"], [contenteditable="true"], textarea[aria-label="Prompt"]',
+    "model_response": "model-response",
+    "response_img": "model-response:last-of-type img",
+    "progress_bar": "mat-progress-bar",
+    "regenerate": 'button[aria-label*="Regenerate"], mat-icon[data-mat-icon-name="refresh"], '
+                  'button .google-symbols[fonticon="refresh"]',
+    "overlay_menu": '.cdk-overlay-pane button[role="menuitem"], .cdk-overlay-pane .mat-mdc-menu-item',
+    "upload_menu": 'mat-icon[data-mat-icon-name="add_2"], mat-icon[fonticon="add"]',
+    "avatar": auth_check.AVATAR,
+    "signin": auth_check.SIGNIN,
+    "sidebar": auth_check.SIDEBAR,
+}
+PROBE_JS = """(sels) => Object.fromEntries(Object.entries(sels).map(([k, s]) => {
+    try { return [k, document.querySelectorAll(s).length]; } catch (e) { return [k, -1]; }
+}))"""
+
+def resolve_fixture(name):
+    return name if os.path.isdir(name) else os.path.join(FIXTURES_DIR, name)
+
+def load_phases(path):
+    """Phases of a fixture directory (manifest.json) or of a replay result file."""
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("phases", [])
+
+def count_files(folder):
+    try:
+        return sum(1 for e in os.scandir(folder) if e.is_file())
+    except OSError:
+        return 0
+
+async def probe(page):
+    return await page.evaluate(PROBE_JS, PROBES)
+
+class PhaseRecorder(logging.Handler):
+    """Snapshots the page whenever the engine logs one of the PHASES lines (captured without blocking the action)."""
+    def __init__(self, snap_dir):
+        super().__init__()
+        self.snap_dir = snap_dir
+        self.page = None
+        self.action = None
+        self.t0 = time.perf_counter()
+        self.phases, self.tasks = [], []
+
+    def start_job(self, action):
+        self.action, self.t0 = action, time.perf_counter()
+
+    def mark(self, phase, line=""):
+        if not self.page: return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        entry = {"action": self.action, "phase": phase, "line": line[:200],
+                 "t": round(time.perf_counter() - self.t0, 3)}
+        self.phases.append(entry)
+        self.tasks.append(loop.create_task(self._capture(entry, len(self.phases))))
+
+    def emit(self, record):
+        msg = record.getMessage()
+        phase = next((p for fragment, p in PHASES if fragment in msg), None)
+        if phase: self.mark(phase, msg)
+
+    async def _capture(self, entry, index):
+        # Imported late: the engine modules must load after the harness has set up logging.
+        from watcher_engine.actions_lib import browser_crtl_logic as bcl
+        try:
+            html = await self.page.content()
+            entry["captured"] = round(time.perf_counter() - self.t0, 3)
+            entry["url"] = self.page.url
+            entry["status"] = await bcl.check_response_status(self.page)
+            entry["probes"] = await probe(self.page)
+            entry["file"] = f"{index:02d}_{entry['phase']}.html"
+            os.makedirs(self.snap_dir, exist_ok=True)
+            with open(os.path.join(self.snap_dir, entry["file"]), "w", encoding="utf-8") as f:
+                f.write(html)
+        except Exception as e:
+            entry["error"] = str(e)
+
+    async def flush(self):
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+# --- HAR helpers ---
+
+def scrub_har(har_path):
+    """Removes cookies and auth headers from a recorded HAR zip (in place)."""
+    with zipfile.ZipFile(har_path) as zf:
+        items = {n: zf.read(n) for n in zf.namelist()}
+    har_name = next(n for n in items if n.endswith(".har"))
+    har = json.loads(items[har_name])
+    for entry in har["log"]["entries"]:
+        for part in (entry["request"], entry["response"]):
+            part["headers"] = [h for h in part.get("headers", []) if h["name"].lower() not in SECRET_HEADERS]
+            part["cookies"] = []
+    items[har_name] = json.dumps(har, ensure_ascii=False).encode("utf-8")
+    tmp_path = f"{har_path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in items.items():
+            zf.writestr(name, data)
+    os.replace(tmp_path, har_path)
+
+def _har_body(zf, content):
+    if "_file" in content: return zf.read(content["_file"])
+    text = content.get("text", "")
+    return base64.b64decode(text) if content.get("encoding") == "base64" else text.encode("utf-8")
+
+def stream_entries(har_path):
+    """Recorded StreamGenerate responses in request order: [{"status", "content_type", "body"}]."""
+    out = []
+    with zipfile.ZipFile(har_path) as zf:
+        har = json.loads(zf.read(next(n for n in zf.namelist() if n.endswith(".har"))))
+        for entry in har["log"]["entries"]:
+            if entry["request"]["method"] != "POST" or not STREAM_URL.search(entry["request"]["url"]): continue
+            content = entry["response"].get("content", {})
+            out.append({"status": entry["response"].get("status", 200),
+                        "content_type": content.get("mimeType") or "application/json",
+                        "body": _har_body(zf, content)})
+    return out
+
+class StreamReplay:
+    """Route handler serving the recorded StreamGenerate responses one after another."""
+    def __init__(self, entries):
+        self.entries, self.served = entries, 0
+
+    async def handle(self, route):
+        if self.served >= len(self.entries):
+            await route.abort()
+            return
+        entry = self.entries[self.served]
+        self.served += 1
+        await route.fulfill(status=entry["status"], content_type=entry["content_type"], body=entry["body"])
+
+# --- record ---
+
+async def record(args):
+    out_dir = resolve_fixture(args.name)
+    if os.path.exists(os.path.join(out_dir, MANIFEST_NAME)):
+        raise SystemExit(f"Fixture already exists: {out_dir}")
+    os.makedirs(out_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="gemi_record_")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler(os.path.join(out_dir, "record.log"), encoding="utf-8"),
+                                  logging.StreamHandler()])
+    from watcher_engine.actions_lib import counter_store, config_store, engine_status, library_index
+    if engine_status.read_status():
+        raise SystemExit("The engine is running; stop it first (the browser profile is in use).")
+    counter_store.DB_FILE = os.path.join(workdir, "counters.db")
+    library_index.CACHE_DIR = os.path.join(workdir, "library_cache")
+    from watcher_engine import watcher
+
+    # Real profile and settings; outputs, counters, library index and config writes stay out of the user's files.
+    cfg = config_store.load(watcher.CONFIG_FILE)
+    cfg.update(save_dir=os.path.join(workdir, "outputs"), upload_task=[],
+               url=args.url or cfg.get("url") or watcher.DEFAULT_URL,
+               last_prompt=args.prompt or cfg.get("last_prompt", ""))
+    watcher.CONFIG_FILE = os.path.join(workdir, "config.json")
+    with open(watcher.CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, indent=4, ensure_ascii=False)
+
+    recorder = PhaseRecorder(os.path.join(out_dir, SNAPSHOT_DIR))
+    watcher.logger.addHandler(recorder)
+    har_path = os.path.join(out_dir, HAR_NAME)
+    engine = watcher.GemiWatcher()
+    jobs = []
+    try:
+        await engine.launch_browser(headless=args.headless, record_har_path=har_path, record_har_content="attach")
+        if not engine.page:
+            raise SystemExit("Browser launch failed (see record.log).")
+        engine.last_action_url = None  # first action navigates under the recorder
+        recorder.page = engine.page
+        recorder.start_job("launch")
+        recorder.mark("ready", "after launch")
+        for action in args.actions.split(","):
+            recorder.start_job(action)
+            engine.last_job = None
+            before = count_files(cfg["save_dir"])
+            started = time.perf_counter()
+            await engine.dispatch_action(action, {"action": action})
+            await recorder.flush()
+            jobs.append({"action": action, "ok": bool(engine.last_job and engine.last_job.get("ok")),
+                         "seconds": round(time.perf_counter() - started, 3),
+                         "saved": count_files(cfg["save_dir"]) - before})
+    finally:
+        await recorder.flush()
+        watcher.logger.removeHandler(recorder)
+        if engine.browser_context:
+            await engine.browser_context.close()  # HAR is written on close
+            await engine.playwright.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    scrub_har(har_path)
+    manifest = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "engine_version": watcher.ENGINE_VERSION,
+        "url": cfg["url"],
+        "prompt": cfg["last_prompt"],
+        "settings": {k: cfg.get(k) for k in ("network_detection", "redo_fanout", "output_format")},
+        "jobs": jobs,
+        "phases": recorder.phases,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    print(f"Recorded {len(recorder.phases)} phases, {len(jobs)} jobs -> {out_dir}")
+    return 0
+
+# --- replay ---
+
+async def replay_dom(fixture, manifest, args):
+    from playwright.async_api import async_playwright
+    from watcher_engine.actions_lib import browser_crtl_logic as bcl
+    har_path = os.path.join(fixture, HAR_NAME)
+    results = []
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=not args.headed)
+        context = await browser.new_context(viewport=VIEWPORT)
+        await context.route_from_har(har_path, not_found="abort")  # styles and images from the recording
+        page = await context.new_page()
+        for entry in manifest["phases"]:
+            if not entry.get("file"): continue
+            with open(os.path.join(fixture, SNAPSHOT_DIR, entry["file"]), "r", encoding="utf-8") as f:
+                html = SCRIPT_TAG.sub("", f.read())
+
+            async def serve(route, html=html):
+                await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=html)
+
+            await page.route(entry["url"], serve)
+            load_ms, detect_ms, status = [], [], None
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                await page.goto(entry["url"], wait_until="domcontentloaded")
+                t1 = time.perf_counter()
+                status = await bcl.check_response_status(page)
+                load_ms.append((t1 - t0) * 1000)
+                detect_ms.append((time.perf_counter() - t1) * 1000)
+            probes = await probe(page)
+            await page.unroute(entry["url"], serve)
+            results.append({**entry, "recorded_status": entry.get("status"), "status": status,
+                            "recorded_probes": entry.get("probes"), "probes": probes,
+                            "match": status == entry.get("status"),
+                            "load_ms": round(statistics.median(load_ms), 1),
+                            "detect_ms": round(statistics.median(detect_ms), 1)})
+        await browser.close()
+
+    print(f"{'snapshot':<24}{'recorded':<16}{'replayed':<16}{'load ms':>9}{'detect ms':>11}")
+    for r in results:
+        flag = "" if r["match"] else "  <-- verdict changed"
+        print(f"{r['file']:<24}{str(r['recorded_status']):<16}{str(r['status']):<16}"
+              f"{r['load_ms']:>9.1f}{r['detect_ms']:>11.1f}{flag}")
+    return {"mode": "dom", "phases": results, "ok": all(r["match"] for r in results)}
+
+async def replay_har(fixture, manifest, args):
+    from playwright.async_api import async_playwright
+    workdir = tempfile.mkdtemp(prefix="gemi_replay_")
+    try:
+        watcher, counter_store = bench_engine.setup_workspace(workdir)
+        cfg = {**manifest.get("settings", {}), "url": manifest["url"], "last_prompt": manifest["prompt"],
+               "save_dir": os.path.join(workdir, "outputs"), "upload_task": [],
+               "declined_msg": [], "quota_exceeded_msg": []}
+        with open(watcher.CONFIG_FILE, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=4, ensure_ascii=False)
+        recorder = PhaseRecorder(os.path.join(workdir, SNAPSHOT_DIR))
+        watcher.logger.addHandler(recorder)
+        har_path = os.path.join(fixture, HAR_NAME)
+        streams = StreamReplay(stream_entries(har_path))
+
+        jobs = []
+        async with async_playwright() as pw:
+            browser = await pw.chromium.launch(headless=not args.headed)
+            context = await browser.new_context(viewport=VIEWPORT, accept_downloads=True)
+            await context.route_from_har(har_path, not_found="abort")
+            await context.route(STREAM_URL, streams.handle)  # registered last, so it is consulted first
+            expires = time.time() + 3600
+            await context.add_cookies([{"name": n, "value": "replay", "domain": ".google.com", "path": "/",
+                                        "expires": expires} for n in bench_engine.SESSION_COOKIES])
+            # A plain context stands in for the persistent profile; the first action navigates to the URL.
+            engine = watcher.GemiWatcher()
+            engine.playwright, engine.browser_context, engine.is_headless = pw, context, True
+            engine.page = await context.new_page()
+            recorder.page = engine.page
+            counter_store.start_session()
+            for job in manifest["jobs"]:
+                recorder.start_job(job["action"])
+                engine.last_job = None
+                started = time.perf_counter()
+                await engine.dispatch_action(job["action"], {"action": job["action"]})
+                await recorder.flush()
+                jobs.append({"action": job["action"], "ok": bool(engine.last_job and engine.last_job.get("ok")),
+                             "seconds": round(time.perf_counter() - started, 3), "recorded_ok": job["ok"]})
+            await browser.close()
+        watcher.logger.removeHandler(recorder)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"StreamGenerate responses served: {streams.served}/{len(streams.entries)}")
+    print_phase_diff(manifest["phases"], recorder.phases)
+    for job in jobs:
+        print(f"{job['action']:<18} ok={job['ok']} (recorded {job['recorded_ok']})  {job['seconds']:.2f}s")
+    same = [p["phase"] for p in manifest["phases"]] == [p["phase"] for p in recorder.phases]
+    return {"mode": "har", "phases": recorder.phases, "jobs": jobs,
+            "ok": same and all(j["ok"] == j["recorded_ok"] for j in jobs)}
+
+async def replay(args):
+    fixture = resolve_fixture(args.fixture)
+    with open(os.path.join(fixture, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    result = await (replay_dom if args.mode == "dom" else replay_har)(fixture, manifest, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+    return 0 if result["ok"] else 1
+
+# --- diff ---
+
+def print_phase_diff(old, new):
+    """Pairs phases by (action, phase, occurrence) and prints verdict, selector and timing changes."""
+    def keyed(phases):
+        seen, out = {}, {}
+        for p in phases:
+            key = (p.get("action"), p["phase"])
+            seen[key] = seen.get(key, 0) + 1
+            out[key + (seen[key],)] = p
+        return out
+    a, b = keyed(old), keyed(new)
+    changes = 0
+    print(f"{'action':<18}{'phase':<16}{'t old':>8}{'t new':>8}  changes")
+    for key in list(a) + [k for k in b if k not in a]:
+        pa, pb = a.get(key), b.get(key)
+        notes = []
+        if not pa or not pb:
+            notes.append("only in " + ("new" if pb else "old"))
+        else:
+            if pa.get("status") != pb.get("status"):
+                notes.append(f"verdict {pa.get('status')} -> {pb.get('status')}")
+            probes_a, probes_b = pa.get("probes", {}), pb.get("probes", {})
+            notes += [f"{k} {probes_a.get(k)} -> {probes_b.get(k)}" for k in PROBES if probes_a.get(k) != probes_b.get(k)]
+        changes += bool(notes)
+        t_old = f"{pa['t']:.2f}" if pa else "-"
+        t_new = f"{pb['t']:.2f}" if pb else "-"
+        print(f"{str(key[0]):<18}{key[1]:<16}{t_old:>8}{t_new:>8}  {'; '.join(notes) or 'same'}")
+    return changes
+
+def diff(args):
+    return 1 if print_phase_diff(load_phases(resolve_fixture(args.old)), load_phases(resolve_fixture(args.new))) else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay Gemini sessions (HAR + DOM snapshots).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="record a real session with the engine's browser profile")
+    rec.add_argument("name", help="fixture name (under benchmarks/fixtures) or directory")
+    rec.add_argument("--actions", default="upload_test", help="comma-separated actions to run")
+    rec.add_argument("--prompt", help="prompt to send (default: last_prompt from config.json)")
+    rec.add_argument("--url", help="page to record (default: url from config.json)")
+    rec.add_argument("--headless", action="store_true", help="headless, with cookies from state.json")
+
+    rep = sub.add_parser("replay", help="replay a fixture without an account or network")
+    rep.add_argument("fixture")
+    rep.add_argument("--mode", choices=["dom", "har"], default="dom")
+    rep.add_argument("--runs", type=int, default=3, help="loads per snapshot in dom mode")
+    rep.add_argument("--headed", action="store_true")
+    rep.add_argument("--keep", action="store_true", help="keep the har-mode workspace")
+    rep.add_argument("--json", help="write the replay result (usable with 'diff')")
+
+    dif = sub.add_parser("diff", help="compare phases of two fixtures or replay results")
+    dif.add_argument("old")
+    dif.add_argument("new")
+
+    args = parser.parse_args(argv)
+    if args.command == "record": return asyncio.run(record(args))
+    if args.command == "replay": return asyncio.run(replay(args))
+    return diff(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
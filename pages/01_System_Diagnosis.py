@@ -4,11 +4,27 @@ import os
 import time
 import json
 import subprocess
+import sys
+import altair as alt
+import pandas as pd
 
 # --- CONFIG & PATHS ---
 # Updated to V1.4.4: Added list detection for upload_task and width='stretch'
-DIAG_PAGE_VERSION = "V1.4.4" 
+# Updated to V1.5.0: Engine/browser discovery from the engine heartbeat; full process scan is an explicit fallback
+# Updated to V1.5.1: Config writes via config_store (locked, atomic field patch)
+# Updated to V1.6.0: Resource history (ring-buffer sampler) charts with job markers
+# Updated to V1.7.0: Log viewer reads the last N lines by seeking back from EOF, with level/keyword filters
+# Updated to V1.8.0: On-demand engine profiling (profile_engine task) with summary of the latest artifacts
+DIAG_PAGE_VERSION = "V1.8.0" 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import engine_status
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import counter_store
+from watcher_engine.actions_lib import resource_sampler
+from watcher_engine.actions_lib.log_tail import read_last_lines
+from watcher_engine.actions_lib import engine_profiler
 WATCHER_SCRIPT = os.path.normpath(os.path.join(ROOT_DIR, "watcher_engine", "watcher.py"))
 VENV_PYTHON = os.path.normpath(os.path.join(ROOT_DIR, ".venv", "Scripts", "python.exe"))
 CONFIG_PATH = os.path.join(ROOT_DIR, "config.json")
@@ -17,7 +33,16 @@ LOG_FILE = os.path.join(ROOT_DIR, "engine.log")
 
 st.set_page_config(page_title=f"Diagnosis {DIAG_PAGE_VERSION}", layout="wide")
 
+LOG_LEVELS = ["INFO", "WARNING", "ERROR", "CRITICAL"]
+HISTORY_WINDOWS = {"15 min": 900, "1 hour": 3600, "3 hours": 10800}
+HISTORY_METRICS = {"RSS (MB)": "rss_mb", "CPU %": "cpu", "Handles / FDs": "handles", "Child processes": "children"}
+
 # --- UTILS ---
+@st.cache_resource
+def get_sampler():
+    """One background sampler per UI server; survives reruns and page switches."""
+    return resource_sampler.ResourceSampler(interval=5, hours=3).start()
+
 def get_mem_info(pid):
     """Get process memory usage"""
     try: 
@@ -26,14 +51,11 @@ def get_mem_info(pid):
     except: return "N/A"
 
 def get_engine_pid():
-    """Scan for running Watcher Engine process"""
-    for proc in psutil.process_iter(['pid', 'cmdline']):
-        try:
-            cmdline = " ".join(proc.info.get('cmdline') or []).lower()
-            if "watcher.py" in cmdline:
-                return proc.info['pid']
-        except: continue
-    return None
+    """Engine PID from its heartbeat; a full process scan only when explicitly requested"""
+    pid = engine_status.get_engine_info()[1]
+    if pid is None and st.session_state.get("full_scan"):
+        pid = engine_status.scan_engine_pid()
+    return pid
 
 def kill_safe():
     """Safely terminate all related processes"""
@@ -41,9 +63,8 @@ def kill_safe():
     for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
         try:
             if proc.pid == ui_pid: continue
-            cmd = " ".join(proc.info.get('cmdline') or []).lower()
             name = proc.info['name'].lower()
-            if "watcher.py" in cmd or any(k in name for k in ['chrome', 'playwright']):
+            if engine_status.is_engine_cmdline(proc.info.get('cmdline')) or any(k in name for k in ['chrome', 'playwright']):
                 proc.kill()
         except: continue
     time.sleep(0.5)
@@ -56,22 +77,13 @@ def send_task(action_name):
 def save_config_field(field_name, value):
     """Update specific field in config.json and notify user"""
     try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            cfg = json.load(f)
-        cfg[field_name] = value
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(cfg, f, indent=4, ensure_ascii=False)
+        config_store.set_field(field_name, value, CONFIG_PATH)
         st.toast(f"Config updated: {field_name}")
     except Exception as e:
         st.error(f"Save failed: {e}")
 
 # --- SIDEBAR UI ---
-config = {}
-if os.path.exists(CONFIG_PATH):
-    try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-    except: pass
+config = config_store.load(CONFIG_PATH)
 
 with st.sidebar:
     v_col1, v_col2 = st.columns(2)
@@ -89,6 +101,9 @@ with st.sidebar:
             subprocess.Popen([VENV_PYTHON, WATCHER_SCRIPT], creationflags=subprocess.CREATE_NO_WINDOW)
             st.rerun()
 
+    st.checkbox("🔎 Full process scan (fallback)", key="full_scan",
+                help="Walk the whole process table when the engine publishes no heartbeat (e.g. an older engine build).")
+
     st.divider()
     # Browser launch controls
     if st.button("🔍 Launch Browser (Visual)", type="secondary", width='stretch', disabled=not eng_pid):
@@ -123,6 +138,14 @@ with st.sidebar:
     if st.button("🧇 Sand Box", width='stretch', disabled=not eng_pid):
         send_task("sand_box")
         st.toast("For general testing...") 
+
+    st.number_input("Profile Window (s)", min_value=5, max_value=3600, step=5,
+                    value=int(config.get("profile_seconds", 60)), key="profile_seconds_input",
+                    on_change=lambda: save_config_field("profile_seconds", int(st.session_state.profile_seconds_input)))
+    if st.button("⏱️ Profile Engine (Start / Stop)", width='stretch', disabled=not eng_pid,
+                 help="cProfile of the engine's event loop + tracemalloc diff. Send again to stop early."):
+        send_task("profile_engine")
+        st.toast("Profiling command sent.")
     
     st.divider()
     
@@ -167,18 +190,28 @@ def render_status():
         status_text += "========================================\n\n"
         status_text += f"[ ENVIRONMENT (VENV) ]\n >> Status: {'READY' if os.path.exists(VENV_PYTHON) else 'MISSING'}\n >> Path: {VENV_PYTHON}\n\n"
         status_text += f"[ SYSTEM UI (STREAMLIT) ]\n >> PID: {ui_pid} | MEM: {get_mem_info(ui_pid)}\n\n"
-        status_text += f"[ LOCAL WATCHER ENGINE ]\n >> PID: {curr_pid if curr_pid else 'OFFLINE'} | MEM: {get_mem_info(curr_pid) if curr_pid else 'N/A'}\n\n"
+        status_text += f"[ LOCAL WATCHER ENGINE ]\n >> PID: {curr_pid if curr_pid else 'OFFLINE'} | MEM: {get_mem_info(curr_pid) if curr_pid else 'N/A'}\n"
+        hb = engine_status.read_status(max_age=None)
+        if hb:
+            last_job = hb.get("last_job") or {}
+            status_text += f" >> Heartbeat: {hb['age']:.1f}s ago | Status: {hb.get('status', '?')} | Queue: {hb.get('queue_depth', 0)}\n"
+            if last_job:
+                status_text += f" >> Last Job: {last_job.get('action')} ({'OK' if last_job.get('ok') else 'FAIL'}) at {time.strftime('%H:%M:%S', time.localtime(last_job.get('finished', 0)))}\n"
+        status_text += "\n"
         
         status_text += "[ BROWSER PROCESSES ]\n"
-        found = False
-        for proc in psutil.process_iter(['pid', 'cmdline']):
-            try:
-                cmd = " ".join(proc.info.get('cmdline') or []).lower()
-                if "chrome" in cmd and "gemini_user_data" in cmd:
-                    status_text += f" >> PID: {proc.pid} | MEM: {get_mem_info(proc.pid)}\n"
-                    found = True
-            except: continue
-        if not found: status_text += " >> STATUS: NO ACTIVE BROWSER\n"
+        if st.session_state.get("full_scan"):
+            browser_pids = []
+            for proc in psutil.process_iter(['pid', 'cmdline']):
+                try:
+                    cmd = " ".join(proc.info.get('cmdline') or []).lower()
+                    if "chrome" in cmd and "gemini_user_data" in cmd: browser_pids.append(proc.pid)
+                except: continue
+        else:
+            browser_pids = (hb or {}).get("browser_pids", []) if curr_pid else []
+        for pid in browser_pids:
+            status_text += f" >> PID: {pid} | MEM: {get_mem_info(pid)}\n"
+        if not browser_pids: status_text += " >> STATUS: NO ACTIVE BROWSER\n"
         
         st.code(status_text + "\n========================================", language="text")
 
@@ -197,14 +230,92 @@ def render_status():
                     except Exception as e:
                         st.error(f"Clear failed: {e}")
 
+        f_col1, f_col2, f_col3 = st.columns([2, 2, 1])
+        levels = f_col1.multiselect("Levels", LOG_LEVELS, default=LOG_LEVELS, key="log_levels", label_visibility="collapsed")
+        keyword = f_col2.text_input("Keyword", placeholder="Filter keyword", key="log_keyword", label_visibility="collapsed").strip().lower()
+        n_lines = f_col3.selectbox("Lines", [25, 50, 100, 200], key="log_lines", label_visibility="collapsed")
+
+        level_tags = [f" - {lvl} - " for lvl in levels]
+        def keep(line):
+            if keyword and keyword not in line.lower(): return False
+            # Lines without a level tag (tracebacks, separators) follow the keyword filter only.
+            if len(levels) < len(LOG_LEVELS) and " - " in line and any(f" - {lvl} - " in line for lvl in LOG_LEVELS):
+                return any(tag in line for tag in level_tags)
+            return True
+
         log_display = "Waiting for engine output...\n"
         if os.path.exists(LOG_FILE):
-            try:
-                with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    log_display += "".join(lines[-25:])
-            except: 
-                log_display += " >> Syncing log file..."
+            filtered = keyword or len(levels) < len(LOG_LEVELS)
+            lines = read_last_lines(LOG_FILE, n_lines, keep if filtered else None)
+            log_display += "\n".join(lines) if lines else " >> No matching lines."
         st.code(log_display , language="text")
 
-render_status()
\ No newline at end of file
+render_status()
+
+@st.fragment(run_every="5s")
+def render_resource_history():
+    st.subheader("Resource History")
+    h_col1, h_col2, h_col3 = st.columns([1, 1, 2])
+    window = h_col1.selectbox("Window", list(HISTORY_WINDOWS), key="hist_window")
+    metric_label = h_col2.selectbox("Metric", list(HISTORY_METRICS), key="hist_metric")
+    group_browser = h_col3.toggle("Sum Chromium processes", value=True, key="hist_group",
+                                  help="Off: one line per Chromium process (cost of each renderer/tab).")
+
+    since = time.time() - HISTORY_WINDOWS[window]
+    rows = get_sampler().rows(since)
+    if not rows:
+        st.caption("Collecting samples...")
+        return
+
+    metric = HISTORY_METRICS[metric_label]
+    df = pd.DataFrame(rows)
+    if group_browser:
+        df["process"] = df["process"].where(~df["process"].str.startswith("chrome"), "chromium (all)")
+        df = df.groupby(["ts", "process"], as_index=False)[metric].sum()
+    df["time"] = pd.to_datetime(df["ts"], unit="s", utc=True).dt.tz_convert(None)
+
+    lines = alt.Chart(df).mark_line().encode(
+        x=alt.X("time:T", title=None),
+        y=alt.Y(f"{metric}:Q", title=metric_label),
+        color=alt.Color("process:N", title="Process"),
+        tooltip=["process", alt.Tooltip(f"{metric}:Q", format=".1f"), alt.Tooltip("time:T", format="%H:%M:%S")],
+    )
+    chart = lines
+    try:
+        jobs = counter_store.jobs_since(since)
+    except Exception:
+        jobs = []
+    if jobs:
+        jdf = pd.DataFrame(jobs)
+        jdf["time"] = pd.to_datetime(jdf["started"], unit="s", utc=True).dt.tz_convert(None)
+        jdf["result"] = jdf["ok"].map({1: "ok", 0: "fail"}).fillna("running")
+        markers = alt.Chart(jdf).mark_rule(strokeDash=[3, 3], opacity=0.5).encode(
+            x="time:T",
+            color=alt.value("gray"),
+            tooltip=["action", "result", "saved", "declined", alt.Tooltip("time:T", format="%H:%M:%S")],
+        )
+        chart = lines + markers
+    st.altair_chart(chart, width='stretch')
+    st.caption(f"{len(rows)} samples · every {get_sampler().interval}s · dashed lines mark job starts")
+
+render_resource_history()
+
+@st.fragment(run_every="10s")
+def render_profile_summary():
+    summary = engine_profiler.latest_summary()
+    if not summary: return
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary.get("started", 0)))
+    with st.expander(f"⏱️ Latest Engine Profile · {started} · {summary.get('elapsed')}s"):
+        p_col1, p_col2 = st.columns(2)
+        with p_col1:
+            st.markdown("**Top functions (cumulative time)**")
+            st.dataframe(summary.get("top_functions", []), width='stretch', hide_index=True)
+        with p_col2:
+            st.markdown("**Top allocation sites (growth during window)**")
+            st.dataframe(summary.get("top_allocations", []), width='stretch', hide_index=True)
+        prof_path = os.path.join(engine_profiler.PROFILE_DIR, summary.get("prof_file", ""))
+        if os.path.isfile(prof_path):
+            with open(prof_path, "rb") as f:
+                st.download_button("⬇️ Download .prof (snakeviz / pstats)", f.read(), file_name=summary["prof_file"])
+
+render_profile_summary()
@@ -1,5 +1,7 @@
-# Version: 1.3.2
+# Version: 1.3.4
 # Add explanation
+# Update: config.json access goes through config_store (locked, atomic field patch).
+# Update: Album cards show cached thumbnails instead of the full uploads.
 # Description: Finalized startup logic. Ensures 'temp_uploads' is created non-destructively 
 # at the very beginning of execution without affecting existing files.
 
@@ -8,10 +10,16 @@ import json
 import os
 import subprocess
 import platform
-from PIL import Image
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import thumbnails
 
 # --- CONFIGURATION ---
-CONFIG_FILE = "config.json"
+CONFIG_FILE = config_store.CONFIG_FILE
 UPLOAD_DIR = "temp_uploads"
 
 def init_config():
@@ -25,7 +33,7 @@ def init_config():
     
     try:
         with open(CONFIG_FILE, "r", encoding='utf-8') as f:
-            data = json.load(f)
+            json.load(f)
     except json.JSONDecodeError:
         st.error(f"Error: '{CONFIG_FILE}' contains invalid JSON.")
         st.stop()
@@ -33,29 +41,15 @@ def init_config():
         st.error(f"Encoding Error: Failed to read '{CONFIG_FILE}'. Ensure it is UTF-8 encoded.")
         st.stop()
 
-    if "upload_task" not in data:
-        data["upload_task"] = []
-        with open(CONFIG_FILE, "w", encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
-    
-    return data
+    return config_store.patch({"upload_task": []}, CONFIG_FILE, only_missing=True)
 
 def save_config(file_paths):
     """Safely updates upload_task while preserving other keys with UTF-8 encoding."""
     if not os.path.exists(CONFIG_FILE):
         return
 
-    try:
-        with open(CONFIG_FILE, "r", encoding='utf-8') as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, UnicodeDecodeError):
-        data = {}
-
     # Store normalized absolute paths in config for consistency
-    data["upload_task"] = [os.path.abspath(p) for p in file_paths]
-    
-    with open(CONFIG_FILE, "w", encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    config_store.set_field("upload_task", [os.path.abspath(p) for p in file_paths], CONFIG_FILE)
 
 def open_folder(path):
     """Opens the local file explorer at the specified path (Cross-platform)."""
@@ -153,11 +147,11 @@ def file_preview_grid(task_list):
         with cols[idx % 5]:
             with st.container(border=True):
                 if "image" in file_data['type']:
-                    try:
-                        img = Image.open(file_data['path'])
-                        st.image(img, width='stretch')
-                    except Exception:
+                    thumb = thumbnails.thumbnail_path(file_data['path'])
+                    if thumb == file_data['path']:
                         st.error("Corrupted Image")
+                    else:
+                        st.image(thumb, width='stretch')
                 else:
                     ext = os.path.splitext(file_data['name'])[1].upper() or "FILE"
                     st.markdown(
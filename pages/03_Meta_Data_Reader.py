@@ -1,19 +1,29 @@
 import streamlit as st
-from PIL import Image
 from PIL.ExifTags import TAGS
-import json
 import base64
+import hashlib
 import os
-from io import BytesIO
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import provenance
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import thumbnails
+from watcher_engine.actions_lib import image_meta
 
 # --- Page Configuration ---
-# Version: 1.4.1
-# Update: Added a warning prompt and a reload button to switch to home.py after saving config.
+# Version: 1.6.0
+# Update: Reads WebP/JPEG/AVIF outputs (UTF-8 EXIF ImageDescription, XMP provenance).
+# Update: 'Apply Prompt to Config' writes through config_store (locked, atomic field patch).
+# Update: Previews are cached WebP thumbnails instead of full-size PNG re-encodes.
+# Update: Metadata comes from a header-only parse (no pixel decode), cached per file hash across reruns.
 # Ensure all UI components follow the 2026 'width=stretch' standard.
-st.set_page_config(page_title="Meta Data Reader v1.4.1", layout="wide")
+st.set_page_config(page_title="Meta Data Reader v1.6.0", layout="wide")
 
 # Constants
-CONFIG_FILE = "config.json"
+CONFIG_FILE = config_store.CONFIG_FILE
 HOME_PAGE = "home.py" # Ensure this matches your actual home file name
 
 # Initialize session state for uploader key and update status
@@ -22,12 +32,17 @@ if 'uploader_key' not in st.session_state:
 if 'config_updated' not in st.session_state:
     st.session_state['config_updated'] = False
 
-def get_image_base64(image):
-    """Convert PIL image to base64 string for direct HTML injection."""
-    buffered = BytesIO()
-    # Ensure it's saved as PNG to maintain metadata compatibility during preview
-    image.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+@st.cache_data(show_spinner=False, max_entries=1000)
+def parse_metadata(file_hash, _data):
+    """Header-only metadata of an upload; cached by content hash so reruns never re-parse."""
+    return image_meta.parse(_data)
+
+def get_thumbnail_base64(data):
+    """Base64 of the cached WebP thumbnail for direct HTML injection (None if the image cannot be read)."""
+    thumb_path = thumbnails.thumbnail_for_bytes(data)
+    if not thumb_path: return None
+    with open(thumb_path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
 
 def clear_gallery():
     """Increment the key to force-reset the file_uploader component."""
@@ -41,17 +56,7 @@ def update_config_json(new_prompt):
         return False
     
     try:
-        # Read existing config
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
-        
-        # Update field
-        config_data['last_prompt'] = new_prompt
-        
-        # Write back to file
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=4, ensure_ascii=False)
-        
+        config_store.set_field('last_prompt', new_prompt, CONFIG_FILE)
         st.session_state['config_updated'] = True
         return True
     except Exception as e:
@@ -61,11 +66,11 @@ def update_config_json(new_prompt):
 # --- Sidebar: Control Center ---
 with st.sidebar:
     st.markdown("### 📂 Control Center")
-    st.markdown("Version: 1.4.1")
+    st.markdown("Version: 1.6.0")
     
     # Using the dynamic key from session_state for resetting the uploader
     uploaded_files = st.file_uploader("Upload images to read metadata", 
-                                      type=["png", "jpg", "jpeg", "webp"], 
+                                      type=["png", "jpg", "jpeg", "webp", "avif"], 
                                       accept_multiple_files=True,
                                       key=f"uploader_{st.session_state['uploader_key']}")
     
@@ -90,17 +95,20 @@ if uploaded_files:
         col1, col2 = st.columns([1, 2])
         
         try:
-            # Open image using PIL
-            img = Image.open(uploaded_file)
+            data = uploaded_file.getvalue()
+            meta = parse_metadata(hashlib.sha256(data).hexdigest(), data)
             
             # --- Left Column: Image Preview ---
             with col1:
-                img_base64 = get_image_base64(img)
-                st.markdown(
-                    f'<img src="data:image/png;base64,{img_base64}" style="width:100%; border-radius: 12px; box-shadow: 0 4px 8px rgba(0,0,0,0.1);">',
-                    unsafe_allow_html=True
-                )
-                st.caption(f"File Name: {uploaded_file.name}")
+                img_base64 = get_thumbnail_base64(data)
+                if img_base64:
+                    st.markdown(
+                        f'<img src="data:image/webp;base64,{img_base64}" style="width:100%; border-radius: 12px; box-shadow: 0 4px 8px rgba(0,0,0,0.1);">',
+                        unsafe_allow_html=True
+                    )
+                else:
+                    st.caption("Preview unavailable")
+                st.caption(f"File Name: {uploaded_file.name}" + (f" · {meta['width']}×{meta['height']}" if meta["width"] else ""))
 
             # --- Right Column: Metadata Extraction ---
             with col2:
@@ -109,7 +117,7 @@ if uploaded_files:
                 detected_prompt = ""
                 
                 # 1. Read Textual Information (Common in PNG)
-                png_info = img.info
+                png_info = meta["info"]
                 if png_info:
                     with st.expander("✨ Key Information (Text/Prompt)", expanded=True):
                         # Detect common keys for AI generated prompts
@@ -123,8 +131,16 @@ if uploaded_files:
                         if len(png_info) > 1:
                             st.json(png_info)
                 
+                # 1b. Structured provenance (job, redo, attachments, account)
+                record = provenance.read_record(png_info) if png_info else None
+                if record:
+                    with st.expander("🧾 Provenance", expanded=True):
+                        st.json(record)
+                    if not detected_prompt:
+                        detected_prompt = record.get("prompt", "")
+                
                 # 2. Read Technical EXIF Data (Common in JPG/WebP)
-                exif_data = img._getexif()
+                exif_data = meta["exif"]
                 if exif_data:
                     with st.expander("📸 Technical Parameters (EXIF)"):
                         readable_exif = {}
@@ -135,6 +151,8 @@ if uploaded_files:
                                     readable_exif[tag] = v.decode(errors="ignore")
                                 except:
                                     readable_exif[tag] = str(v)
+                            elif isinstance(v, str):
+                                readable_exif[tag] = provenance.decode_exif_text(v)
                             else:
                                 readable_exif[tag] = v
                         st.json(readable_exif)
@@ -172,4 +190,4 @@ else:
 
 # --- Footer ---
 st.sidebar.markdown("---")
-st.sidebar.caption("Meta Data Reader - Version 1.4.1")
\ No newline at end of file
+st.sidebar.caption("Meta Data Reader - Version 1.6.0")
\ No newline at end of file
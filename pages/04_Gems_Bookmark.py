@@ -1,90 +1,155 @@
-# Version: v1.3.2
+# Version: v1.5.0
 # Description: Bookmark Gallery with optimized Edit-Fetch synchronization.
 # Changes: Fixed data display priority so Auto-Fetched data shows up during Editing.
+# Changes: URL updates go through config_store (locked, atomic field patch).
+# Changes v1.4.0: Bulk Fetch (refresh all / import URL list) scraped concurrently by the engine in the background;
+#                 bookmarks are read and written through gem_bookmarks (locked, atomic); the gallery reloads when it completes.
+#                 Edit / Delete are keyed by URL (gem_bookmarks.update / append / delete), so a save never overwrites
+#                 what the bulk fetch wrote since the page loaded.
+# Changes v1.5.0: Auto-Fetch answers from gem_cache instantly when fresh; a miss is queued as a one-URL background
+#                 fetch (no task.json) and returns as soon as the cache entry lands; a successful fetch
+#                 still sets config.json's url, as before. The engine serves it next to a running bulk fetch.
 
 import streamlit as st
-import json
 import os
+import sys
 import time
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import engine_status
+from watcher_engine.actions_lib import gem_bookmarks
+from watcher_engine.actions_lib import gem_cache
+
 # --- CONFIGURATION ---
-DB_FILE = "Gems_bookmark.json"
-CONFIG_FILE = "config.json"
-TASK_FILE = "task.json"
-SCRAPED_FILE = "scraped_info.json"
+DB_FILE = gem_bookmarks.BOOKMARK_FILE
+CONFIG_FILE = config_store.CONFIG_FILE
+FETCH_TIMEOUT = 25
+FETCH_POLL = 0.25
 
-def load_json(file_path):
-    if not os.path.exists(file_path): return None
+def update_config_url(new_url):
+    if not os.path.exists(CONFIG_FILE): return False
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        config_store.set_field("url", new_url, CONFIG_FILE)
+        return True
     except Exception as e:
-        st.error(f"Error reading {file_path}: {e}")
+        st.error(f"Error saving {CONFIG_FILE}: {e}")
+        return False
+
+def fetch_gem_info(url):
+    """Gem {name, description} from the cache, or from a background engine fetch (None on failure)."""
+    cached = gem_cache.get(url)
+    if cached: return cached
+    if not engine_status.read_status():
+        st.error("Engine is offline.")
         return None
+    requested = gem_bookmarks.request_fetch(url)
+    deadline = requested + FETCH_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(FETCH_POLL)
+        fresh = gem_cache.get(url, newer_than=requested)
+        if fresh: return fresh
+        if gem_bookmarks.fetch_finished(url, requested):
+            return gem_cache.get(url, newer_than=requested)  # the lookup ended; None unless it just landed
+    return None
 
-def save_json(file_path, data):
+def write_bookmarks(write, *args):
+    """Runs one gem_bookmarks write (update / append / delete); False on error or a vanished bookmark."""
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        if write(*args) is False:
+            st.warning("That bookmark no longer exists.")
+            return False
         return True
     except Exception as e:
-        st.error(f"Error saving {file_path}: {e}")
+        st.error(f"Error saving {DB_FILE}: {e}")
         return False
 
-def update_config_url(new_url):
-    if not os.path.exists(CONFIG_FILE): return False
-    config_content = load_json(CONFIG_FILE)
-    if isinstance(config_content, dict):
-        config_content["url"] = new_url
-        return save_json(CONFIG_FILE, config_content)
-    return False
-
-def trigger_watcher_fetch(url):
-    update_config_url(url)
-    task = {"action": "scrape_gem_info"}
-    save_json(TASK_FILE, task)
-    if os.path.exists(SCRAPED_FILE):
-        os.remove(SCRAPED_FILE)
+def reset_editor():
+    st.session_state.edit_url = None
+    st.session_state.temp_name = ""
+    st.session_state.temp_desc = ""
+
+def queue_bulk_fetch(urls, force=False):
+    gem_bookmarks.request_scrape(urls, force)
+    if not engine_status.read_status():
+        st.warning("Engine is offline: the fetch will start once the browser is launched.")
+    st.rerun()
+
+@st.fragment(run_every=2)
+def render_bulk_progress():
+    """Live progress of the engine's bulk fetch; reloads the gallery when it completes."""
+    status = gem_bookmarks.read_status()
+    if status.get("queued"):
+        st.info("Bulk fetch queued, waiting for the engine...")
+    elif status.get("running"):
+        done, total = status.get("done", 0), max(status.get("total", 1), 1)
+        st.progress(done / total, text=f"Fetching Gems: {done} / {total} ({status.get('failed', 0)} failed)")
+        st.session_state.bulk_seen_running = True
+    elif st.session_state.pop("bulk_seen_running", False):
+        # Results were written during the run; reload the whole page once to show them.
+        st.rerun(scope="app")
+    elif status.get("finished"):
+        elapsed = status["finished"] - status.get("started", status["finished"])
+        st.caption(f"Last bulk fetch: {status.get('done', 0) - status.get('failed', 0)} / {status.get('total', 0)} "
+                   f"Gems in {elapsed:.1f}s.")
+
+def render_bulk_fetch(bookmarks):
+    with st.expander("Bulk Fetch", expanded=False):
+        st.caption("The engine scrapes the Gems in separate background tabs; a running loop is not interrupted. "
+                   "Gems fetched within the cache TTL are answered from the cache.")
+        b_col1, b_col2 = st.columns([1, 2])
+        with b_col1:
+            force = st.checkbox("Ignore cache", key="bulk_force")
+            if st.button("🔄 Refresh All Bookmarks", width='stretch', disabled=not bookmarks):
+                queue_bulk_fetch([b["url"] for b in bookmarks if b.get("url")], force)
+        with b_col2:
+            pasted = st.text_area("Import Gem URLs (one per line)", height=120, key="bulk_urls",
+                                  placeholder="https://gemini.google.com/gem/...")
+            if st.button("📥 Import & Fetch", width='stretch'):
+                urls = [u.strip() for u in pasted.splitlines() if u.strip().startswith("http")]
+                if urls:
+                    added = gem_bookmarks.add_urls(urls)
+                    st.toast(f"{added} new bookmarks added.")
+                    queue_bulk_fetch(urls)
+                else:
+                    st.error("No URLs found.")
+        render_bulk_progress()
 
 def main():
     st.set_page_config(page_title="Gems Bookmark Gallery", layout="wide")
 
     # Initialize session states
-    if "edit_index" not in st.session_state: st.session_state.edit_index = None
+    if "edit_url" not in st.session_state: st.session_state.edit_url = None
     if "temp_name" not in st.session_state: st.session_state.temp_name = ""
     if "temp_desc" not in st.session_state: st.session_state.temp_desc = ""
 
     st.title("Gems Bookmark Gallery")
-    st.markdown("### Version: v1.3.2")
+    st.markdown("### Version: v1.5.0")
 
-    bookmarks = load_json(DB_FILE) or []
-    is_edit_mode = st.session_state.edit_index is not None
+    bookmarks = gem_bookmarks.load()
+    edit_index = gem_bookmarks.find(bookmarks, st.session_state.edit_url) if st.session_state.edit_url else None
+    is_edit_mode = edit_index is not None
 
     # --- EDITOR SECTION ---
     with st.expander("Bookmark Editor", expanded=True):
         st.subheader("Edit Bookmark" if is_edit_mode else "Add New Bookmark")
         
         # URL Input
-        default_url = bookmarks[st.session_state.edit_index]["url"] if is_edit_mode else ""
+        default_url = bookmarks[edit_index]["url"] if is_edit_mode else ""
         url = st.text_input("URL", value=default_url, placeholder="https://gemini.google.com/app/gems/...")
         
         # Auto-Fetch Button
         if st.button("🔍 Auto-Fetch via Engine", width='stretch'):
             if url:
-                trigger_watcher_fetch(url)
-                with st.status("Engine is scraping Gem info...", expanded=True) as status:
-                    found = False
-                    for _ in range(25):
-                        time.sleep(1)
-                        if os.path.exists(SCRAPED_FILE):
-                            res = load_json(SCRAPED_FILE)
-                            if res:
-                                # Update session state with new data
-                                st.session_state.temp_name = res.get("name", "")
-                                st.session_state.temp_desc = res.get("description", "")
-                                found = True
-                                break
-                    if found:
+                with st.status("Fetching Gem info...", expanded=True) as status:
+                    res = fetch_gem_info(url)
+                    if res:
+                        update_config_url(url)
+                        # Update session state with new data
+                        st.session_state.temp_name = res.get("name", "")
+                        st.session_state.temp_desc = res.get("description", "")
                         status.update(label="Fetch Successful!", state="complete")
                         st.rerun()
                     else:
@@ -94,8 +159,8 @@ def main():
 
         # Display Logic: Priority -> Temp Data > Existing Bookmark Data > Empty
         if is_edit_mode:
-            display_name = st.session_state.temp_name if st.session_state.temp_name else bookmarks[st.session_state.edit_index]["name"]
-            display_desc = st.session_state.temp_desc if st.session_state.temp_desc else bookmarks[st.session_state.edit_index]["description"]
+            display_name = st.session_state.temp_name if st.session_state.temp_name else bookmarks[edit_index]["name"]
+            display_desc = st.session_state.temp_desc if st.session_state.temp_desc else bookmarks[edit_index]["description"]
         else:
             display_name = st.session_state.temp_name
             display_desc = st.session_state.temp_desc
@@ -112,23 +177,21 @@ def main():
             if st.button("Save", type="primary", width='stretch'):
                 new_entry = {"name": name, "url": url, "description": description}
                 if is_edit_mode:
-                    bookmarks[st.session_state.edit_index] = new_entry
+                    saved = write_bookmarks(gem_bookmarks.update, st.session_state.edit_url, new_entry)
                 else:
-                    bookmarks.append(new_entry)
+                    saved = write_bookmarks(gem_bookmarks.append, new_entry)
                 
-                if save_json(DB_FILE, bookmarks):
+                if saved:
                     # Clear states after save
-                    st.session_state.edit_index = None
-                    st.session_state.temp_name = ""
-                    st.session_state.temp_desc = ""
+                    reset_editor()
                     st.rerun()
         with btn_col2:
             if is_edit_mode and st.button("Cancel"):
-                st.session_state.edit_index = None
-                st.session_state.temp_name = ""
-                st.session_state.temp_desc = ""
+                reset_editor()
                 st.rerun()
 
+    render_bulk_fetch(bookmarks)
+
     st.divider()
     # --- GALLERY SECTION ---
     if not bookmarks:
@@ -149,12 +212,11 @@ def main():
                             # Reset temp data when starting a fresh edit
                             st.session_state.temp_name = ""
                             st.session_state.temp_desc = ""
-                            st.session_state.edit_index = index
+                            st.session_state.edit_url = b['url']
                             st.rerun()
                     with d_col:
                         if st.button(f"Delete", key=f"de_{index}", width='stretch'):
-                            bookmarks.pop(index)
-                            save_json(DB_FILE, bookmarks)
+                            write_bookmarks(gem_bookmarks.delete, b['url'])
                             st.rerun()
 
 if __name__ == "__main__":
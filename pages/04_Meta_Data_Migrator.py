@@ -1,46 +1,74 @@
-# Version: v1.2.0
+# Version: v1.3.0
 # Description: UI Optimized Metadata Migrator with fixed-width previews and multi-line text areas.
+# Changes: WebP sources are read through their EXIF block (engine WebP outputs).
+# Changes v1.3.0: Lossless injection (PNG chunk splicing / piexif.insert, no re-encode) via meta_migrate;
+#                 new Batch tab pairs folders by name or CSV manifest and writes a folder or zip.
 
 import streamlit as st
-from PIL import Image
-from PIL.PngImagePlugin import PngInfo
-import piexif
-import io
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import meta_migrate
+from watcher_engine.actions_lib import thumbnails
 
 # Set page configuration
 st.set_page_config(layout="wide", page_title="Metadata Migrator Pro")
 
-def get_metadata(img, file_type):
-    """Extract metadata based on file type."""
-    metadata = {}
-    if file_type in ["jpg", "jpeg"]:
-        try:
-            exif_dict = piexif.load(img.info.get("exif", b""))
-            for ifd in ("0th", "Exif"):
-                for tag in exif_dict[ifd]:
-                    tag_name = piexif.TAGS[ifd][tag]["name"]
-                    value = exif_dict[ifd][tag]
-                    if isinstance(value, bytes):
-                        try:
-                            value = value.decode("utf-8")
-                        except:
-                            continue
-                    metadata[f"{ifd}:{tag_name}"] = str(value)
-        except Exception as e:
-            st.warning(f"Could not read JPEG EXIF: {e}")
-    elif file_type == "png":
-        for key, value in img.info.items():
-            if isinstance(value, (str, int)):
-                metadata[f"PNG:{key}"] = str(value)
-    return metadata
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
 
-def main():
-    # --- UI Header ---
-    st.title("Image Metadata Migrator v1.2.0")
-    st.markdown("Easily migrate and edit metadata between images with an optimized interface.")
-    
-    st.divider()
+def render_preview(data, caption):
+    thumb = thumbnails.thumbnail_for_bytes(data)
+    if thumb: st.image(thumb, caption=caption, width=300)
+    else: st.caption(f"{caption}: preview unavailable")
+
+def render_batch():
+    st.markdown("Copy metadata from a folder of sources onto a folder of targets. "
+                "Files are paired by name (extension ignored) or by a CSV manifest with `source,target` rows.")
+    b_col1, b_col2 = st.columns(2)
+    src_dir = b_col1.text_input("Source folder", key="batch_src")
+    dst_dir = b_col2.text_input("Target folder", key="batch_dst")
+    manifest = st.file_uploader("Manifest CSV (optional)", type=["csv"], key="batch_manifest")
+
+    o_col1, o_col2, o_col3 = st.columns([1, 2, 1])
+    mode = o_col1.radio("Output", ["Folder", "Zip archive"], key="batch_mode")
+    default_out = os.path.join(dst_dir, "migrated") if dst_dir else ""
+    out_path = o_col2.text_input("Output folder" if mode == "Folder" else "Zip file",
+                                 value=default_out if mode == "Folder" else f"{default_out}.zip" if default_out else "",
+                                 key=f"batch_out_{mode}")
+    workers = o_col3.slider("Workers", 1, 32, min(16, (os.cpu_count() or 4) * 2), key="batch_workers")
+
+    if not (src_dir and dst_dir): return
+    if not (os.path.isdir(src_dir) and os.path.isdir(dst_dir)):
+        st.warning("Both folders must exist.")
+        return
+    if manifest:
+        pairs = meta_migrate.pair_from_manifest(manifest.getvalue().decode("utf-8-sig"), src_dir, dst_dir)
+    else:
+        pairs = meta_migrate.pair_by_name(src_dir, dst_dir)
+    st.caption(f"{len(pairs)} pairs matched.")
+    if not pairs or not out_path: return
+    if os.path.abspath(out_path) == os.path.abspath(dst_dir):
+        st.warning("Choose an output location different from the target folder.")
+        return
+
+    if st.button("🚀 Migrate Batch", type="primary", width='stretch'):
+        progress = st.progress(0.0, text="Starting...")
+        t0 = time.time()
+        kwargs = {"out_dir": out_path} if mode == "Folder" else {"zip_path": out_path}
+        errors = []
+        for done, total, errors in meta_migrate.migrate_batch(pairs, workers=workers, **kwargs):
+            rate = done / max(time.time() - t0, 1e-6)
+            progress.progress(done / total, text=f"{done} / {total} files · {rate:.0f} files/s")
+        st.success(f"Migrated {len(pairs) - len(errors)} files to {out_path} in {time.time() - t0:.1f}s.")
+        if errors:
+            st.error(f"{len(errors)} files failed.")
+            st.dataframe([{"target": t, "error": e} for t, e in errors], width='stretch', hide_index=True)
 
+def render_single():
     col1, col2 = st.columns(2)
     
     source_metadata = {}
@@ -49,16 +77,16 @@ def main():
     # --- Step 1: Source Selection ---
     with col1:
         st.header("1. Source Image")
-        source_file = st.file_uploader("Upload Source (JPG/PNG)", type=["jpg", "jpeg", "png"], key="source")
+        source_file = st.file_uploader("Upload Source (JPG/PNG/WebP)", type=["jpg", "jpeg", "png", "webp"], key="source")
         
         if source_file:
-            source_type = source_file.name.split(".")[-1].lower()
-            source_img = Image.open(source_file)
+            source_type = meta_migrate.file_type(source_file.name)
+            source_data = source_file.getvalue()
             
             # Optimized Image Preview: Fixed width to prevent excessive scrolling
-            st.image(source_img, caption=f"Source Preview ({source_type.upper()})", width=300)
+            render_preview(source_data, f"Source Preview ({source_type.upper()})")
             
-            source_metadata = get_metadata(source_img, source_type)
+            source_metadata = meta_migrate.read_metadata(source_data, source_type)
             
             if source_metadata:
                 st.subheader("Edit Metadata Details")
@@ -77,57 +105,45 @@ def main():
     # --- Step 2: Target Selection & Processing ---
     with col2:
         st.header("2. Target Image")
-        target_file = st.file_uploader("Upload Target (JPG/PNG)", type=["jpg", "jpeg", "png"], key="target")
+        target_file = st.file_uploader("Upload Target (JPG/PNG/WebP)", type=["jpg", "jpeg", "png", "webp"], key="target")
         
         if target_file:
-            target_type = target_file.name.split(".")[-1].lower()
-            # Handle RGB conversion for JPEGs
-            target_img = Image.open(target_file)
-            if target_type in ["jpg", "jpeg"] and target_img.mode != "RGB":
-                target_img = target_img.convert("RGB")
+            target_type = meta_migrate.file_type(target_file.name)
+            target_data = target_file.getvalue()
                 
             # Optimized Image Preview
-            st.image(target_img, caption=f"Target Preview ({target_type.upper()})", width=300)
+            render_preview(target_data, f"Target Preview ({target_type.upper()})")
             
             st.divider()
             
-            if st.button("🚀 Process & Inject Metadata", use_container_width=True):
-                output_buffer = io.BytesIO()
-                
+            if st.button("🚀 Process & Inject Metadata", width='stretch'):
                 try:
-                    if target_type in ["jpg", "jpeg"]:
-                        # Construct EXIF structure
-                        new_exif = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}}
-                        for key, val in edited_metadata.items():
-                            if ":" in key:
-                                ifd, tag_name = key.split(":")
-                                if ifd in ["0th", "Exif"]:
-                                    tag_id = next(attr for attr in piexif.TAGS[ifd] if piexif.TAGS[ifd][attr]["name"] == tag_name)
-                                    # Encode back to bytes for EXIF
-                                    new_exif[ifd][tag_id] = val.encode("utf-8")
-                        
-                        exif_bytes = piexif.dump(new_exif)
-                        target_img.save(output_buffer, format="JPEG", exif=exif_bytes)
-                    
-                    elif target_type == "png":
-                        # Construct PNG chunks
-                        png_info = PngInfo()
-                        for key, val in edited_metadata.items():
-                            clean_key = key.split(":")[-1]
-                            png_info.add_text(clean_key, str(val))
-                        
-                        target_img.save(output_buffer, format="PNG", pnginfo=png_info)
+                    # Metadata is written into the container; the image data is copied byte for byte.
+                    result = meta_migrate.inject(target_data, target_type, edited_metadata)
                     
                     st.success("Success! Your image is ready.")
                     st.download_button(
                         label="📥 Download Resulting Image",
-                        data=output_buffer.getvalue(),
+                        data=result,
                         file_name=f"migrated_{target_file.name}",
-                        mime=f"image/{target_type}",
-                        use_container_width=True
+                        mime=MIME_TYPES[target_type],
+                        width='stretch'
                     )
                 except Exception as e:
                     st.error(f"Processing Error: {e}")
 
+def main():
+    # --- UI Header ---
+    st.title("Image Metadata Migrator v1.3.0")
+    st.markdown("Easily migrate and edit metadata between images with an optimized interface.")
+    
+    st.divider()
+
+    single_tab, batch_tab = st.tabs(["Single File", "Batch"])
+    with single_tab:
+        render_single()
+    with batch_tab:
+        render_batch()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+# Version: v1.0.0
+# Description: Bulk metadata scanner for save_dir or any folder tree.
+# Header-only parsing in a process pool; results stream into a table and are cached per folder,
+# so rescans only parse new or changed files. Export to CSV / Parquet.
+
+import streamlit as st
+import pandas as pd
+import os
+import io
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import library_scan
+
+st.set_page_config(page_title="Library Scanner v1.0.0", layout="wide")
+
+PREVIEW_ROWS = 2000
+
+def to_frame(rows):
+    df = pd.DataFrame(rows, columns=library_scan.COLUMNS)
+    df["mtime"] = pd.to_datetime(df["mtime"], unit="s")
+    return df
+
+# --- Sidebar ---
+with st.sidebar:
+    st.markdown("### 🗂️ Library Scanner")
+    st.markdown("Version: v1.0.0")
+    default_dir = config_store.load().get("save_dir", os.path.join(ROOT_DIR, "browser_outputs"))
+    root = st.text_input("Folder", value=default_dir, key="scan_root")
+    recursive = st.toggle("Include subfolders", value=True)
+    workers = st.slider("Worker processes", 1, max(1, os.cpu_count() or 1), max(1, (os.cpu_count() or 2) - 1))
+    force = st.checkbox("Full rescan (ignore cache)", value=False)
+    start = st.button("🔎 Scan", type="primary", width='stretch')
+
+st.title("Library Scanner")
+
+if not root or not os.path.isdir(root):
+    st.warning("Enter an existing folder to scan.")
+    st.stop()
+
+if start:
+    progress = st.progress(0.0, text="Listing files...")
+    live = st.empty()
+    streamed, t0 = [], time.time()
+    for done, total, rows in library_scan.scan(root, recursive, workers, force):
+        streamed.extend(rows)
+        if total == 0:
+            progress.progress(1.0, text="Nothing new to scan: all files are cached.")
+            continue
+        rate = done / max(time.time() - t0, 1e-6)
+        progress.progress(done / total, text=f"{done} / {total} files · {rate:.0f} files/s")
+        if rows:
+            live.dataframe(to_frame(streamed[-PREVIEW_ROWS:]), width='stretch', hide_index=True)
+    live.empty()
+    if streamed:
+        st.toast(f"Scanned {len(streamed)} files in {time.time() - t0:.1f}s")
+
+count, newest = library_scan.last_scan_info(root)
+if not count:
+    st.info("No cached results for this folder yet. Press **Scan**.")
+    st.stop()
+
+f_col1, f_col2 = st.columns([3, 1])
+search = f_col1.text_input("Filter", placeholder="File name or prompt text", label_visibility="collapsed")
+rows = library_scan.results(root, search)
+f_col2.caption(f"{len(rows)} / {count} files")
+df = to_frame(rows)
+st.dataframe(df.head(PREVIEW_ROWS), width='stretch', hide_index=True)
+if len(df) > PREVIEW_ROWS:
+    st.caption(f"Showing the newest {PREVIEW_ROWS} rows; exports contain all {len(df)}.")
+
+e_col1, e_col2 = st.columns(2)
+e_col1.download_button("⬇️ Export CSV", df.to_csv(index=False).encode("utf-8-sig"),
+                       file_name="library_scan.csv", mime="text/csv", width='stretch')
+try:
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False)
+    e_col2.download_button("⬇️ Export Parquet", buf.getvalue(), file_name="library_scan.parquet",
+                           mime="application/octet-stream", width='stretch')
+except ImportError:
+    e_col2.caption("Parquet export needs pyarrow.")
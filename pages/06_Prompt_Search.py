@@ -0,0 +1,84 @@
+# Version: v1.0.0
+# Description: Full-text search over the prompts embedded in save_dir outputs.
+# Backed by the FTS5 index in library_index (kept current by the save pipeline), so a query costs
+# milliseconds regardless of library size. Results show cached thumbnails and can load a prompt into config.
+
+import streamlit as st
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import library_index
+from watcher_engine.actions_lib import thumbnails
+
+st.set_page_config(page_title="Prompt Search v1.0.0", layout="wide")
+
+PAGE_SIZE = 48
+GRID_COLS = 4
+
+def load_prompt(prompt):
+    """Write the prompt into config.json's last_prompt field (same action as the Meta Data Reader)."""
+    try:
+        config_store.set_field('last_prompt', prompt)
+        st.toast("Config updated successfully!")
+    except Exception as e:
+        st.error(f"Failed to update config: {e}")
+
+# --- Sidebar ---
+with st.sidebar:
+    st.markdown("### 🔎 Prompt Search")
+    st.markdown("Version: v1.0.0")
+    save_dir = config_store.load().get("save_dir", os.path.join(ROOT_DIR, "browser_outputs"))
+    st.caption(f"Library: `{save_dir}`")
+    if st.button("🔄 Rebuild index", width='stretch'):
+        with st.spinner("Re-indexing library..."):
+            changed = library_index.sync(save_dir, force=True)
+        st.toast(f"Index updated ({changed} changes).")
+    st.markdown("""
+    **Query syntax**
+    - Words must all appear: `red dragon`
+    - The last word matches as a prefix: `drag`
+    - Exact phrase: `"oil painting"`
+    """)
+
+st.title("Prompt Search")
+
+if not os.path.isdir(save_dir):
+    st.warning("save_dir does not exist yet.")
+    st.stop()
+
+library_index.sync(save_dir)
+
+s_col1, s_col2 = st.columns([4, 1])
+query = s_col1.text_input("Search prompts", placeholder="e.g. cyberpunk city \"neon rain\"",
+                          key="ps_query", label_visibility="collapsed")
+if not query.strip():
+    st.info("Type words from a prompt to find the images generated from it.")
+    st.stop()
+
+t0 = time.perf_counter()
+total, _ = library_index.search_prompts(save_dir, query, 0, 0)
+pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+if st.session_state.get("ps_page", 1) > pages: st.session_state.ps_page = pages
+page_no = s_col2.number_input("Page", min_value=1, max_value=pages, step=1, key="ps_page", label_visibility="collapsed")
+_, rows = library_index.search_prompts(save_dir, query, (page_no - 1) * PAGE_SIZE, PAGE_SIZE)
+st.caption(f"{total} matches · page {page_no} / {pages} · {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+if not rows:
+    st.warning("No prompts match this query.")
+    st.stop()
+
+grid = st.columns(GRID_COLS)
+for i, row in enumerate(rows):
+    with grid[i % GRID_COLS]:
+        st.image(thumbnails.thumbnail_path(os.path.join(save_dir, row["name"])), width='stretch')
+        st.caption(f"`{row['name']}`")
+        st.markdown(row["snippet"])
+        with st.expander("Full prompt"):
+            st.code(row["prompt"], language="text")
+        if st.button("📥 Load Prompt to Config", key=f"ps_load_{row['name']}", width='stretch'):
+            load_prompt(row["prompt"])
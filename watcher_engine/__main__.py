@@ -0,0 +1,213 @@
+# watcher_engine/__main__.py
+# Version: V1.0.0
+# Description: Command-line entry point for unattended workers (no Streamlit UI, any OS).
+#   python -m watcher_engine batch --manifest prompts.json --redo 3      one upload_test (+ N redos) per entry
+#   python -m watcher_engine batch --max-images 200 --max-minutes 120     loop on config.json, like Start Loop
+#   python -m watcher_engine serve                                        task.json listener (same as watcher.py)
+# batch launches GemiWatcher itself (headless by default, cookies from state.json) and schedules jobs with the
+# HOME loop's rules: after [SUCCESS] / [FAIL] the next job is upload_test_redo, after [RESET_REQUIRED] a fresh
+# upload_test, and [END] (quota reached, signed out) stops the run.
+# Manifest: .json list of prompts or {"prompt", "url", "attachments", "redo"} objects; .txt one prompt per line.
+# Each entry is written into config.json (the actions read it from there); the previous last_prompt /
+# upload_task / url are put back when the run ends.
+# Exit status: 0 done / limit reached, 1 no job succeeded, 2 stopped by [END], 3 launch failed or engine
+# already running, 4 too many consecutive failures, 130 interrupted.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from watcher_engine import watcher
+from watcher_engine.actions_lib import counter_store
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import engine_status
+
+EXIT_OK, EXIT_NO_SUCCESS, EXIT_END, EXIT_LAUNCH, EXIT_FAILURES, EXIT_INTERRUPTED = 0, 1, 2, 3, 4, 130
+SCHEDULING_MARKERS = ("[SUCCESS]", "[FAIL]", "[END]")
+# config.json fields a manifest entry overrides (restored after the run).
+MANIFEST_FIELDS = ("last_prompt", "upload_task", "url")
+
+class MarkerHandler(logging.Handler):
+    """Keeps the last scheduling line the engine logged (what HOME reads from the end of engine.log)."""
+    def __init__(self):
+        super().__init__()
+        self.last_line = ""
+
+    def emit(self, record):
+        msg = record.getMessage()
+        if any(m in msg for m in SCHEDULING_MARKERS):
+            self.last_line = msg
+
+def load_manifest(path):
+    """[{"prompt", "url", "attachments", "redo"}] from a .json list or a .txt file (one prompt per line)."""
+    with open(path, "r", encoding="utf-8") as f:
+        if not path.lower().endswith(".json"):
+            return [{"prompt": line.strip()} for line in f if line.strip() and not line.lstrip().startswith("#")]
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("Manifest must be a JSON list.")
+    entries = []
+    for item in data:
+        entry = {"prompt": item} if isinstance(item, str) else dict(item)
+        if not entry.get("prompt"):
+            raise ValueError(f"Manifest entry without a prompt: {item}")
+        entries.append(entry)
+    return entries
+
+def next_action(line):
+    """The HOME loop's rule for the job after 'line'."""
+    return "upload_test" if "[RESET_REQUIRED]" in line or not line else "upload_test_redo"
+
+class BatchRun:
+    def __init__(self, engine, args):
+        self.engine, self.args = engine, args
+        self.markers = MarkerHandler()
+        self.started = time.time()
+        self.jobs = self.ok_jobs = self.saved = self.declined = 0
+        self.failures_in_row = 0
+
+    def limit_reached(self):
+        a = self.args
+        if a.max_jobs and self.jobs >= a.max_jobs: return f"max jobs ({a.max_jobs})"
+        if a.max_images and self.saved >= a.max_images: return f"max images ({a.max_images})"
+        if a.max_minutes and time.time() - self.started >= a.max_minutes * 60: return f"max minutes ({a.max_minutes})"
+        return None
+
+    async def job(self, action, label):
+        """Runs one job and prints a progress line; returns the scheduling line it ended with."""
+        self.markers.last_line = ""
+        before = counter_store.current()
+        t0 = time.perf_counter()
+        ok = await self.engine.dispatch_action(action, {"action": action, "loop": True})
+        after = counter_store.current()
+        same_session = after["session_id"] == before["session_id"]
+        saved = after["image_save"] - before["image_save"] if same_session else 0
+        self.jobs += 1
+        self.ok_jobs += bool(ok)
+        self.saved += saved
+        self.declined += after["image_decline"] - before["image_decline"] if same_session else 0
+        self.failures_in_row = 0 if ok else self.failures_in_row + 1
+        line = self.markers.last_line
+        print(f"[{self.jobs}] {label} {action:<17} {'ok  ' if ok else 'FAIL'} {time.perf_counter() - t0:6.1f}s  "
+              f"saved {saved} (total {self.saved})  {line[:60]}", flush=True)
+        return line
+
+    async def run(self, entries):
+        """entries: manifest entries, or [None] to loop on config.json as it is. Returns (exit status, reason)."""
+        if entries == [None]:
+            return await self.run_entries(entries)
+        cfg = config_store.load(watcher.CONFIG_FILE)
+        saved = {k: cfg[k] for k in MANIFEST_FIELDS if k in cfg}
+        try:
+            return await self.run_entries(entries)
+        finally:
+            config_store.patch(saved, watcher.CONFIG_FILE)
+
+    async def run_entries(self, entries):
+        for index, entry in enumerate(entries):
+            if entry is not None:
+                updates = {"last_prompt": entry["prompt"], "upload_task": entry.get("attachments", [])}
+                if entry.get("url"): updates["url"] = entry["url"]
+                config_store.patch(updates, watcher.CONFIG_FILE)
+                redo = int(entry.get("redo", self.args.redo))
+                label = f"{index + 1}/{len(entries)}"
+            else:
+                redo, label = None, "loop"
+
+            action, done = "upload_test", 0
+            while redo is None or done <= redo:
+                reason = self.limit_reached()
+                if reason: return self.finish(reason)
+                line = await self.job(action, label)
+                done += 1
+                if "[END]" in line: return EXIT_END, line
+                if self.args.max_failures and self.failures_in_row >= self.args.max_failures:
+                    return EXIT_FAILURES, f"{self.failures_in_row} consecutive failures"
+                action = next_action(line)
+        return self.finish("manifest complete")
+
+    def finish(self, reason):
+        return (EXIT_OK if self.ok_jobs else EXIT_NO_SUCCESS), reason
+
+    def summary(self, reason):
+        minutes = (time.time() - self.started) / 60
+        return (f"Jobs: {self.jobs} ({self.ok_jobs} ok)  Saved: {self.saved}  Declined: {self.declined}  "
+                f"Time: {minutes:.1f} min  Stopped: {reason}")
+
+async def batch(args):
+    entries = load_manifest(args.manifest) if args.manifest else [None]
+    if engine_status.read_status():
+        print("The engine is already running (it owns the browser profile); stop it first.", file=sys.stderr)
+        return EXIT_LAUNCH
+
+    engine = watcher.GemiWatcher()
+    runner = BatchRun(engine, args)
+    watcher.logger.addHandler(runner.markers)
+    watcher.safe_sync_version()
+    engine_status.write_pid()
+    heartbeat = asyncio.create_task(engine_status.heartbeat_loop(engine.heartbeat_state, watcher.logger))
+    reason = "launch failed"
+    try:
+        await engine.launch_browser(headless=not args.headed)
+        if not engine.page:
+            return EXIT_LAUNCH
+        counter_store.start_session()
+        status, reason = await runner.run(entries)
+        return status
+    except asyncio.CancelledError:
+        reason = "interrupted"
+        raise
+    finally:
+        print(runner.summary(reason), flush=True)
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        if engine.browser_context:
+            await engine.save_session_state()
+            await engine.browser_context.close()
+            await engine.playwright.stop()
+        engine_status.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m watcher_engine", description="GemiPersona engine without the UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("batch", help="launch the browser and run jobs until done or a limit is hit")
+    run.add_argument("--manifest", help=".json or .txt list of prompts (default: loop on config.json); each entry is "
+                     "written to config.json's last_prompt / upload_task / url, which are restored at the end")
+    run.add_argument("--redo", type=int, default=0, help="redo jobs after each manifest entry's first job")
+    run.add_argument("--max-jobs", type=int, default=0, help="stop after this many jobs (0 = no limit)")
+    run.add_argument("--max-images", type=int, default=0, help="stop once this many images are saved")
+    run.add_argument("--max-minutes", type=float, default=0, help="stop after this much time")
+    run.add_argument("--max-failures", type=int, default=5, help="stop after this many failed jobs in a row (0 = never)")
+    run.add_argument("--headed", action="store_true", help="show the browser (default: headless, cookies from state.json)")
+    run.add_argument("--quiet", action="store_true", help="progress lines only; the engine log still goes to engine.log")
+
+    sub.add_parser("serve", help="run the task.json listener used by the UI (same as watcher.py)")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "quiet", False):
+        root = logging.getLogger()
+        for handler in [h for h in root.handlers if type(h) is logging.StreamHandler]:
+            root.removeHandler(handler)
+    try:
+        if args.command == "batch":
+            return asyncio.run(batch(args))
+        try:
+            asyncio.run(watcher.GemiWatcher().run())
+        finally:
+            engine_status.clear()
+        return EXIT_OK
+    except KeyboardInterrupt:
+        watcher.logger.info("Stopped by user.")
+        return EXIT_INTERRUPTED
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# watcher_engine/actions_lib/auth_check.py
+# Version: V1.0.0
+# Description: Cheap sign-in check used by check_signin and by the dispatcher before every generation job.
+# 1. Cookie pre-check: Google session cookies in the browser context (state.json if the context cannot be read)
+#    are checked for presence and expiry; no page interaction. Missing or expired -> signed out, all present -> signed in.
+# 2. DOM check only when the cookies are inconclusive (partial set): one combined wait for the account avatar,
+#    sign-in button or conversation list instead of a network-idle wait and separate probes.
+# A positive result is cached for 'auth_check_ttl' seconds; a negative one is always re-checked.
+# On a signed-out or unknown DOM state a viewport-only JPEG is written to 'debug/'.
+
+import os
+import re
+import json
+import time
+
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import provenance
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STATE_FILE = os.path.join(ROOT_DIR, "watcher_engine", "state.json")
+DEBUG_DIR = os.path.join(ROOT_DIR, "debug")
+DEFAULT_TTL = 300
+DOM_TIMEOUT = 5000
+COOKIE_DOMAIN = "google.com"
+# All must be present and unexpired for a conclusive "signed in".
+SESSION_COOKIES = ("SID", "__Secure-1PSID", "__Secure-3PSID", "SAPISID")
+
+AVATAR = 'a[href*="accounts.google.com/SignOut"], button[aria-label*="Google Account"]'
+SIGNIN = 'a[href*="accounts.google.com/ServiceLogin"], button:has-text("Sign in")'
+SIDEBAR = 'div[data-test-id="conversations-list"]'
+
+_cache = {"ok": None, "checked": 0.0, "source": None}
+
+def invalidate():
+    _cache.update(ok=None, checked=0.0, source=None)
+
+def cached():
+    """Last result as {"ok", "checked", "source"} (ok None when never checked)."""
+    return dict(_cache)
+
+def _state_file_cookies():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("cookies", [])
+    except (OSError, json.JSONDecodeError):
+        return []
+
+def cookie_verdict(cookies, now=None):
+    """True / False when the session cookies decide it, None when inconclusive."""
+    now = now or time.time()
+    found = {}
+    lifetime = lambda c: float("inf") if c.get("expires", -1) <= 0 else c["expires"]  # -1 = session cookie
+    for c in cookies:
+        if c.get("name") in SESSION_COOKIES and c.get("domain", "").lstrip(".").endswith(COOKIE_DOMAIN):
+            if c["name"] not in found or lifetime(c) > lifetime(found[c["name"]]):
+                found[c["name"]] = c
+    if not found: return False
+    if any(0 < c.get("expires", -1) < now for c in found.values()): return False
+    if len(found) == len(SESSION_COOKIES): return True
+    return None
+
+async def _screenshot(page, name, logger):
+    try:
+        os.makedirs(DEBUG_DIR, exist_ok=True)
+        path = os.path.join(DEBUG_DIR, f"{name}.jpg")
+        await page.screenshot(path=path, full_page=False, type="jpeg", quality=70)
+        return path
+    except Exception as e:
+        logger.warning(f"⚠️ Debug screenshot failed: {e}")
+        return None
+
+def _user_from_label(aria_label):
+    if not aria_label: return "Unknown User"
+    # "Google Account: Name (email@gmail.com)"
+    match = re.search(r"Google Account:\s*(.*?)\s*\(", aria_label)
+    return match.group(1) if match else aria_label.replace("Google Account:", "").strip()
+
+async def dom_check(page, logger):
+    """(ok, user_name) from the page; waits only until one of the known markers is attached."""
+    try:
+        await page.wait_for_selector(f"{AVATAR}, {SIGNIN}, {SIDEBAR}", state="attached", timeout=DOM_TIMEOUT)
+    except Exception:
+        pass
+    avatar = page.locator(AVATAR).first
+    if await avatar.is_visible():
+        user_name = _user_from_label(await avatar.get_attribute("aria-label"))
+        provenance.remember_account(user_name)
+        return True, user_name
+    if await page.locator(SIGNIN).first.is_visible():
+        path = await _screenshot(page, "signin_detected", logger)
+        logger.warning(f"❌ Status: Not Logged In. Screenshot saved to {path}")
+        return False, None
+    if await page.locator(SIDEBAR).first.is_visible():
+        return True, None
+    path = await _screenshot(page, "unknown_state", logger)
+    logger.warning(f"❌ Status: Unknown. Screenshot saved to {path}")
+    return False, None
+
+async def check(page, logger, config_path=config_store.CONFIG_FILE, force=False, want_user=False):
+    """
+    Signed in? Returns (ok, source) with source 'cache', 'cookies' or 'dom'.
+    config_path: the config the running action was given ('auth_check_ttl').
+    want_user runs the DOM check when no account name is known yet (for provenance records).
+    """
+    ttl = float(config_store.load(config_path).get("auth_check_ttl", DEFAULT_TTL))
+    if not force and _cache["ok"] and time.time() - _cache["checked"] < ttl:
+        return True, "cache"
+
+    try:
+        cookies = await page.context.cookies()
+    except Exception as e:
+        # Context unusable (e.g. closing): fall back to the last saved session.
+        logger.warning(f"⚠️ Context cookies unavailable, using state.json: {e}")
+        cookies = _state_file_cookies()
+    verdict = cookie_verdict(cookies)
+    source = "cookies"
+    if verdict is None or (verdict and want_user and not provenance.current_account()):
+        verdict, _ = await dom_check(page, logger)
+        source = "dom"
+
+    _cache.update(ok=bool(verdict), checked=time.time(), source=source)
+    return bool(verdict), source
@@ -4,9 +4,12 @@ import json
 import re
 from playwright.async_api import TimeoutError
 
-# Version: V5.4.3 (Post-Log Signal Injection)
-# Update: Added a secondary explicit log entry for [RESET_REQUIRED] after any exception 
-#         to ensure it's the final line, bypassing Playwright's multi-line debug logs.
+from watcher_engine.actions_lib import network_monitor
+
+# Version: V5.6.0 (Network-Assisted Detection)
+# Update: monitor_generation consults the optional network_monitor verdict first and waits on it
+#         instead of sleeping; DOM polling remains the fallback. A 'success' verdict still waits for an image
+#         that was not on the page when the monitor was armed (a redo's previous images are still there).
 # Update: Maintained English comments and UI per user instructions.
 
 async def start_new_chat(page, logger, config_path):
@@ -81,11 +84,10 @@ async def handle_file_upload(page, logger, upload_tasks):
             return False
     return True
 
-async def check_response_status(page, logger=None):
+def load_status_keywords(logger=None, config_path="config.json"):
     """
-    Monitors Gemini's response status.
+    Built-in refusal/quota keywords extended with declined_msg / quota_exceeded_msg from config.
     """
-    config_path = "config.json"
     declined_kws = ["违反", "规范", "点子", "协助你将想法化为现实"] 
     quota_kws = ["quota exceeded", "daily limit", "reached your limit"]
     
@@ -97,7 +99,13 @@ async def check_response_status(page, logger=None):
                 quota_kws.extend(cfg.get("quota_exceeded_msg", []))
         except Exception as e:
             if logger: logger.error(f">> [ERROR] Config load failed: {e}")
+    return declined_kws, quota_kws
 
+async def check_response_status(page, logger=None):
+    """
+    Monitors Gemini's response status.
+    """
+    declined_kws, quota_kws = load_status_keywords(logger)
     eval_data = {"declined": declined_kws, "quota": quota_kws}
 
     data = await page.evaluate('''(args) => {
@@ -147,4 +155,128 @@ async def ensure_tool_selected(page, logger, tool_keyword="create image"):
         }}''', tool_keyword)
         if visible: logger.info(f">> Tool selected: {tool_keyword}")
         return visible
-    except Exception: return False
\ No newline at end of file
+    except Exception: return False
+
+RESPONSE_IMAGES_JS = "() => Array.from(document.querySelectorAll('model-response img')).map(i => i.src)"
+NEW_IMAGE_JS = """(known) => {
+    const responses = document.querySelectorAll('model-response');
+    const last = responses[responses.length - 1];
+    return !!last && Array.from(last.querySelectorAll('img')).some(i => i.src && !known.includes(i.src));
+}"""
+
+async def arm_network_monitor(page, logger, cfg):
+    """
+    Arms the network detector right before a prompt/redo is sent. None when disabled in config.
+    The response images already on the page are remembered, so only new ones count as rendered.
+    """
+    declined_kws, quota_kws = load_status_keywords(logger)
+    monitor = network_monitor.arm(page, logger, cfg, declined_kws, quota_kws)
+    if monitor:
+        monitor.known_images = await page.evaluate(RESPONSE_IMAGES_JS)
+    return monitor
+
+async def monitor_generation(page, logger, max_polls=20, interval=2, monitor=None):
+    """
+    Polls check_response_status until a terminal state or max_polls is reached.
+    With an armed network monitor, its verdict wins and the wait between polls ends as soon as it arrives.
+    Returns "success", "refused", "quota_exceeded" or the last non-terminal status.
+    """
+    status = "waiting"
+    for i in range(max_polls):
+        net_status = monitor.status if monitor else None
+        if net_status in ("refused", "quota_exceeded"):
+            return net_status
+        if net_status == "success":
+            try:
+                # Stream says images exist; downloads still need them rendered (not the previous variant's).
+                await page.wait_for_function(NEW_IMAGE_JS, arg=monitor.known_images, timeout=30000)
+                return "success"
+            except TimeoutError:
+                logger.warning(">> [NETWORK] Images reported but not rendered. Falling back to DOM polling.")
+                monitor = None
+
+        # Always pass logger to ensure check_response_status can print text the moment it appears
+        status = await check_response_status(page, logger)
+        if status in ("success", "refused", "quota_exceeded"):
+            return status
+
+        # Heartbeat info every 10 seconds if still waiting
+        if i % 5 == 0 and status in ["waiting", "generating"]:
+            logger.info(f">> [MONITOR] Status: {status} (Attempt {i+1}/{max_polls})")
+
+        if monitor: await monitor.wait(interval)
+        else: await asyncio.sleep(interval)
+    return status
+
+REDO_MENU_MISSING = "Redo menu trigger not found."
+REDO_TRY_AGAIN_MISSING = "'Try again' button not found in overlay."
+
+async def trigger_redo(page, logger):
+    """
+    Opens the regenerate menu of the last response and clicks 'Try again'.
+    Returns None on success, else REDO_MENU_MISSING / REDO_TRY_AGAIN_MISSING. Nothing is logged here:
+    a [FAIL] line mid fan-out would make HOME schedule the next task while the batch is still saving.
+    """
+    menu_triggered = await page.evaluate('''async () => {
+        const findTrigger = () => {
+            return document.querySelector('button[aria-label*="Regenerate"]') || 
+                   document.querySelector('mat-icon[data-mat-icon-name="refresh"]')?.closest('button') ||
+                   document.querySelector('button .google-symbols[fonticon="refresh"]')?.closest('button');
+        };
+        const trigger = findTrigger();
+        if (trigger) {
+            trigger.scrollIntoView({behavior: "smooth", block: "center"});
+            trigger.click();
+            return true;
+        }
+        return false;
+    }''')
+
+    if not menu_triggered:
+        return REDO_MENU_MISSING
+
+    await asyncio.sleep(1.5)
+
+    redo_clicked = await page.evaluate('''async () => {
+        const overlay = document.querySelector('.cdk-overlay-pane');
+        if (!overlay) return false;
+        const items = Array.from(overlay.querySelectorAll('button[role="menuitem"], .mat-mdc-menu-item'));
+        const btn = items.find(b => b.innerText.toLowerCase().includes("try again"));
+        if (btn) { btn.click(); return true; }
+        return false;
+    }''')
+
+    if not redo_clicked:
+        return REDO_TRY_AGAIN_MISSING
+    return None
+
+async def collect_response_downloads(page, logger):
+    """
+    Downloads every large image of the last response through Gemini's Download button.
+    Returns the browser temp paths (valid until the context closes); saving is left to image_ingest.
+    """
+    last_response = await page.query_selector('model-response:last-of-type')
+    imgs = await last_response.query_selector_all('img') if last_response else []
+    temp_paths = []
+
+    for img in imgs:
+        box = await img.bounding_box()
+        if box and box['width'] > 150:
+            try:
+                await img.evaluate('(el) => el.click()')
+                await asyncio.sleep(3)
+                async with page.expect_download(timeout=15000) as dl_info:
+                    await page.evaluate('''() => {
+                        const btn = Array.from(document.querySelectorAll('button'))
+                                         .find(b => (b.ariaLabel?.includes("Download") || b.innerText.includes("Download")) && b.offsetParent !== null);
+                        if (btn) btn.click();
+                    }''')
+                    download = await dl_info.value
+                    temp_paths.append(await download.path())
+
+                await page.keyboard.press("Escape")
+                await asyncio.sleep(1.0)
+            except Exception as e:
+                logger.error(f">> Download failed: {e}")
+                await page.keyboard.press("Escape")
+    return temp_paths
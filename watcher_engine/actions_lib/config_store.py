@@ -0,0 +1,87 @@
+# watcher_engine/actions_lib/config_store.py
+# Version: V1.0.0
+# Description: The one way to read and write config.json (UI pages and engine alike).
+# Writes take a FileLock, re-read the file, apply a field-level patch, bump 'config_version' and replace
+# the file atomically (temp file + os.replace), so concurrent writers never lose each other's fields and
+# readers never see a half-written file. Reads are cached by (mtime, size): an unchanged file costs one stat().
+
+import os
+import json
+import copy
+
+from watcher_engine.actions_lib.file_lock import FileLock, write_json_atomic
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONFIG_FILE = os.path.join(ROOT_DIR, "config.json")
+VERSION_KEY = "config_version"
+
+_cache = {}  # path -> (stat signature, parsed dict)
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _read(path):
+    sig = _signature(path)
+    if sig is None: return None, {}
+    cached = _cache.get(path)
+    if cached and cached[0] == sig:
+        return sig, cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _cache[path] = (sig, data)
+    return sig, data
+
+def load(path=CONFIG_FILE, default=None):
+    """Current config as a fresh dict; 'default' (or {}) when the file is missing or unreadable."""
+    try:
+        sig, data = _read(path)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError):
+        sig, data = None, None
+    if sig is None or data is None:
+        return copy.deepcopy(default) if default is not None else {}
+    return copy.deepcopy(data)
+
+def version(path=CONFIG_FILE):
+    """config_version of the file on disk (cheap while the file is unchanged)."""
+    try:
+        return _read(path)[1].get(VERSION_KEY, 0)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError):
+        return 0
+
+def load_if_changed(known_version, path=CONFIG_FILE):
+    """Return the config only when its version differs from known_version, else None (no copy, no parse)."""
+    return None if version(path) == known_version else load(path)
+
+def _write_atomic(path, data):
+    write_json_atomic(path, data, fsync=True)
+    _cache[path] = (_signature(path), data)
+
+def patch(updates, path=CONFIG_FILE, only_missing=False):
+    """
+    Apply a field-level update under the lock and return the resulting config.
+    only_missing: add keys that are absent and leave existing values alone (used to seed defaults).
+    Nothing is written when the patch changes no value.
+    """
+    with FileLock(path):
+        try:
+            current = copy.deepcopy(_read(path)[1])
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError):
+            current = {}
+        if only_missing:
+            changes = {k: v for k, v in updates.items() if k not in current}
+        else:
+            changes = {k: v for k, v in updates.items() if k not in current or current[k] != v}
+        changes.pop(VERSION_KEY, None)
+        if not changes:
+            return current
+        current.update(copy.deepcopy(changes))
+        current[VERSION_KEY] = current.get(VERSION_KEY, 0) + 1
+        _write_atomic(path, current)
+        return copy.deepcopy(current)
+
+def set_field(key, value, path=CONFIG_FILE):
+    return patch({key: value}, path)
@@ -0,0 +1,169 @@
+# watcher_engine/actions_lib/counter_store.py
+# Version: V1.1.0
+# Description: Transactional run counters in SQLite (WAL), replacing counter.json.
+# A session is one Start Loop (or the implicit session of single sends); each dispatched action is a job.
+# The engine increments counters as events are logged (CounterHandler), so the UI only reads them and
+# the values survive engine/UI restarts and are safe with several UI tabs open.
+# A job keeps one connection from begin_job() to end_job(), so counting a log line is a single UPDATE
+# transaction rather than a new connection and schema check.
+
+import os
+import time
+import sqlite3
+import logging
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_FILE = os.path.join(ROOT_DIR, "counters.db")
+
+# counter column -> log text that signals it (the same markers the UI used to count in engine.log)
+EVENT_MARKERS = {
+    "saved": "Saved:",
+    "declined": "Declined",
+    "resets": "[RESET_REQUIRED]",
+}
+
+# job id -> its open connection (begin_job .. end_job). Log records may come from ingest worker threads;
+# the handler's lock serialises them.
+_job_conns = {}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    ended REAL,
+    total INTEGER NOT NULL DEFAULT 0,
+    saved INTEGER NOT NULL DEFAULT 0,
+    declined INTEGER NOT NULL DEFAULT 0,
+    resets INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    loop INTEGER NOT NULL DEFAULT 0,
+    started REAL NOT NULL,
+    finished REAL,
+    saved INTEGER NOT NULL DEFAULT 0,
+    declined INTEGER NOT NULL DEFAULT 0,
+    resets INTEGER NOT NULL DEFAULT 0,
+    ok INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs(session_id);
+"""
+
+def connect(db_file=None, check_same_thread=True):
+    conn = sqlite3.connect(db_file or DB_FILE, timeout=10, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _active_session(conn):
+    row = conn.execute("SELECT id FROM sessions WHERE ended IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+    return row[0] if row else None
+
+def start_session():
+    """Close any open session and open a fresh one with all counters at zero (Start Loop)."""
+    conn = connect()
+    try:
+        with conn:
+            now = time.time()
+            conn.execute("UPDATE sessions SET ended = ? WHERE ended IS NULL", (now,))
+            return conn.execute("INSERT INTO sessions (started) VALUES (?)", (now,)).lastrowid
+    finally:
+        conn.close()
+
+def current():
+    """Counters of the open session, in the key names the UI has always used."""
+    conn = connect()
+    try:
+        row = conn.execute(
+            "SELECT id, total, saved, declined, resets FROM sessions WHERE ended IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return {"session_id": None, "total_count": 0, "image_save": 0, "image_decline": 0, "fail_count": 0}
+    return {"session_id": row[0], "total_count": row[1], "image_save": row[2], "image_decline": row[3], "fail_count": row[4]}
+
+def begin_job(action, loop=False):
+    """
+    Open a job row in the current session (creating the session if none is open); returns the job id.
+    The job's connection stays open until end_job().
+    """
+    conn = connect(check_same_thread=False)
+    try:
+        with conn:
+            session_id = _active_session(conn)
+            if session_id is None:
+                session_id = conn.execute("INSERT INTO sessions (started) VALUES (?)", (time.time(),)).lastrowid
+            if loop:
+                conn.execute("UPDATE sessions SET total = total + 1 WHERE id = ?", (session_id,))
+            job_id = conn.execute("INSERT INTO jobs (session_id, action, loop, started) VALUES (?, ?, ?, ?)",
+                                  (session_id, action, 1 if loop else 0, time.time())).lastrowid
+    except Exception:
+        conn.close()
+        raise
+    _job_conns[job_id] = conn
+    return job_id
+
+def end_job(job_id, ok):
+    conn = _job_conns.pop(job_id, None) or connect()
+    try:
+        with conn:
+            conn.execute("UPDATE jobs SET finished = ?, ok = ? WHERE id = ?", (time.time(), 1 if ok else 0, job_id))
+    finally:
+        conn.close()
+
+def increment(job_id, column, n=1):
+    """Atomically add n to a counter ('saved' / 'declined' / 'resets') of a job and its session."""
+    if column not in EVENT_MARKERS: raise ValueError(f"Unknown counter: {column}")
+    conn = _job_conns.get(job_id)
+    own = conn is None
+    if own: conn = connect()
+    try:
+        with conn:
+            conn.execute(f"UPDATE jobs SET {column} = {column} + ? WHERE id = ?", (n, job_id))
+            conn.execute(f"UPDATE sessions SET {column} = {column} + ? WHERE id = (SELECT session_id FROM jobs WHERE id = ?)",
+                         (n, job_id))
+    finally:
+        if own: conn.close()
+
+def session_jobs(session_id, limit=50):
+    """Most recent jobs of a session as dicts (newest first)."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute("SELECT * FROM jobs WHERE session_id = ? ORDER BY id DESC LIMIT ?", (session_id, limit))
+        return [dict(r) for r in cur]
+    finally:
+        conn.close()
+
+def jobs_since(ts, limit=500):
+    """Jobs started after 'ts' across all sessions (oldest first), e.g. for chart markers."""
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute("SELECT * FROM jobs WHERE started >= ? ORDER BY id LIMIT ?", (ts, limit))
+        return [dict(r) for r in cur]
+    finally:
+        conn.close()
+
+class CounterHandler(logging.Handler):
+    """
+    Logging handler installed by the engine: counts events of the running job from its log records.
+    Resets are only counted for loop jobs, as the UI did before.
+    """
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.job_id = None
+        self.loop = False
+
+    def emit(self, record):
+        if self.job_id is None: return
+        try:
+            msg = record.getMessage()
+            for column, marker in EVENT_MARKERS.items():
+                if marker in msg and (column != "resets" or self.loop):
+                    increment(self.job_id, column)
+        except Exception:
+            self.handleError(record)
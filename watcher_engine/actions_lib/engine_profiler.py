@@ -0,0 +1,113 @@
+# watcher_engine/actions_lib/engine_profiler.py
+# Version: V1.0.0
+# Description: On-demand profiling of the running engine (started by the 'profile_engine' action).
+# cProfile is enabled on the event-loop thread for a fixed window and tracemalloc snapshots are taken at
+# both ends; when the window closes (loop.call_later) the raw .prof, a text report and a JSON summary
+# (top functions, top allocation sites) are written to 'profiles/'. Jobs keep running while it is active.
+# The session lives in this module; profile_engine imports it by package name so every run shares it.
+
+import os
+import io
+import json
+import time
+import pstats
+import asyncio
+import cProfile
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILE_DIR = os.path.join(ROOT_DIR, "profiles")
+TOP_N = 25
+
+_active = {}
+
+def is_active():
+    return bool(_active)
+
+def start(logger, duration=60):
+    """Begin a profiling window of 'duration' seconds; returns False if one is already running."""
+    if _active: return False
+    owns_tracemalloc = not tracemalloc.is_tracing()
+    if owns_tracemalloc:
+        tracemalloc.start(10)
+    profiler = cProfile.Profile()
+    _active.update(
+        profiler=profiler,
+        started=time.time(),
+        duration=duration,
+        owns_tracemalloc=owns_tracemalloc,
+        snapshot=tracemalloc.take_snapshot(),
+        logger=logger,
+    )
+    _active["timer"] = asyncio.get_running_loop().call_later(duration, stop)
+    profiler.enable()
+    logger.info(f">> [PROFILE] Started: {duration}s window (cProfile + tracemalloc).")
+    return True
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({"function": f"{func} ({os.path.basename(filename)}:{line})", "ncalls": nc,
+                     "tottime": round(tt, 4), "cumtime": round(ct, 4)})
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:TOP_N]
+
+def _top_allocations(before, after):
+    rows = []
+    for diff in after.compare_to(before, "lineno")[:TOP_N]:
+        frame = diff.traceback[0]
+        rows.append({"site": f"{os.path.relpath(frame.filename, ROOT_DIR) if frame.filename.startswith(ROOT_DIR) else frame.filename}:{frame.lineno}",
+                     "size_diff_kb": round(diff.size_diff / 1024, 1), "size_kb": round(diff.size / 1024, 1),
+                     "count_diff": diff.count_diff})
+    return rows
+
+def stop():
+    """Close the window (early or on timer) and write the artifacts; returns the summary path or None."""
+    if not _active: return None
+    state = dict(_active)
+    _active.clear()
+    state["profiler"].disable()
+    state["timer"].cancel()
+    logger = state["logger"]
+    try:
+        after = tracemalloc.take_snapshot()
+        if state["owns_tracemalloc"]:
+            tracemalloc.stop()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(state["started"]))
+        base = os.path.join(PROFILE_DIR, f"engine_{stamp}")
+        state["profiler"].dump_stats(f"{base}.prof")
+
+        report = io.StringIO()
+        pstats.Stats(state["profiler"], stream=report).sort_stats("cumulative").print_stats(TOP_N)
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+
+        summary = {
+            "started": state["started"],
+            "elapsed": round(time.time() - state["started"], 1),
+            "window": state["duration"],
+            "prof_file": os.path.basename(f"{base}.prof"),
+            "top_functions": _top_functions(state["profiler"]),
+            "top_allocations": _top_allocations(state["snapshot"], after),
+        }
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        logger.info(f">> [PROFILE] Finished after {summary['elapsed']}s. Artifacts: profiles/{os.path.basename(base)}.*")
+        return f"{base}.json"
+    except Exception as e:
+        logger.error(f">> [PROFILE] Writing artifacts failed: {e}")
+        return None
+
+def latest_summary():
+    """Newest JSON summary in profiles/ as a dict (for the UI), or None."""
+    if not os.path.isdir(PROFILE_DIR): return None
+    files = sorted(f for f in os.listdir(PROFILE_DIR) if f.startswith("engine_") and f.endswith(".json"))
+    if not files: return None
+    try:
+        with open(os.path.join(PROFILE_DIR, files[-1]), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
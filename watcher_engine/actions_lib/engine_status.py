@@ -0,0 +1,131 @@
+# watcher_engine/actions_lib/engine_status.py
+# Version: V1.0.1
+# Description: Engine discovery without process-table scans.
+# The engine writes 'engine.pid' at start-up and refreshes 'engine_status.json' every few seconds from a
+# background task (status, browser PIDs, task queue depth, last job). The UI reads that one file:
+# the engine is online while the heartbeat is fresh. scan_engine_pid() walks the whole process table
+# and is meant only as an explicit fallback (e.g. an engine started by an older version).
+# Update V1.0.1: An engine started as 'python -m watcher_engine' (CLI runner) is recognised as well.
+
+import os
+import json
+import time
+import asyncio
+import psutil
+
+from watcher_engine.actions_lib.file_lock import write_json_atomic
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PID_FILE = os.path.join(ROOT_DIR, "engine.pid")
+STATUS_FILE = os.path.join(ROOT_DIR, "engine_status.json")
+
+HEARTBEAT_INTERVAL = 2
+# A heartbeat older than this means the engine is gone (or its event loop is stuck).
+HEARTBEAT_STALE = 10
+# Listing child processes is the only non-trivial part of a beat; refresh it less often.
+CHILD_REFRESH = 10
+# Command-line fragments of an engine process: the UI-launched script and the CLI runner.
+ENGINE_CMDLINE_MARKERS = ("watcher.py", "-m watcher_engine")
+
+# --- Engine side ---
+
+def write_pid():
+    with open(PID_FILE, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+
+def clear():
+    """Remove the PID file and mark the heartbeat as stopped (clean shutdown)."""
+    try: os.remove(PID_FILE)
+    except OSError: pass
+    try:
+        status = read_status(max_age=None) or {}
+        status.update(status="stopped", ts=time.time())
+        write_json_atomic(STATUS_FILE, status, indent=None)
+    except OSError:
+        pass
+
+def browser_pids():
+    """PIDs of the Chrome processes spawned by this engine (children only, no global scan)."""
+    pids = []
+    try:
+        for child in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                if any(k in child.name().lower() for k in ("chrome", "chromium", "headless_shell")):
+                    pids.append(child.pid)
+            except psutil.Error:
+                continue
+    except psutil.Error:
+        pass
+    return pids
+
+async def heartbeat_loop(get_state, logger=None, interval=HEARTBEAT_INTERVAL):
+    """
+    Run as a background task in the engine. get_state() returns the engine's own fields
+    (status, last_job, engine_version, ...); PID, timestamp, browser PIDs and queue depth are added here.
+    """
+    started = time.time()
+    children, children_ts = [], 0
+    while True:
+        try:
+            now = time.time()
+            if now - children_ts >= CHILD_REFRESH:
+                children, children_ts = await asyncio.to_thread(browser_pids), now
+            status = dict(get_state())
+            status.update(pid=os.getpid(), ts=now, started=started, browser_pids=children)
+            write_json_atomic(STATUS_FILE, status, indent=None)
+        except Exception as e:
+            if logger: logger.warning(f"⚠️ Heartbeat write failed: {e}")
+        await asyncio.sleep(interval)
+
+# --- UI side ---
+
+def read_status(max_age=HEARTBEAT_STALE):
+    """The last heartbeat as a dict (with 'age' in seconds), or None when missing or older than max_age."""
+    try:
+        with open(STATUS_FILE, "r", encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    status["age"] = time.time() - status.get("ts", 0)
+    if max_age is not None and (status.get("status") == "stopped" or status["age"] > max_age):
+        return None
+    return status
+
+def read_pid():
+    try:
+        with open(PID_FILE, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def get_engine_info():
+    """(online, pid) from the heartbeat alone: one small file read."""
+    status = read_status()
+    return (True, status.get("pid")) if status else (False, None)
+
+def is_engine_cmdline(cmdline):
+    """True for the argv of 'watcher.py' or 'python -m watcher_engine ...'."""
+    joined = " ".join(cmdline or []).lower()
+    return any(m in joined for m in ENGINE_CMDLINE_MARKERS)
+
+def scan_engine_pid():
+    """Explicit fallback: walk the whole process table for an engine process."""
+    for proc in psutil.process_iter(['pid', 'cmdline']):
+        try:
+            if is_engine_cmdline(proc.info.get('cmdline')):
+                return proc.info['pid']
+        except psutil.Error:
+            continue
+    return None
+
+def terminate_engine(pid=None):
+    """Terminate the engine by PID (heartbeat / PID file); returns True if a process was signalled."""
+    pid = pid or get_engine_info()[1] or read_pid()
+    if not pid: return False
+    try:
+        proc = psutil.Process(pid)
+        if not is_engine_cmdline(proc.cmdline()): return False
+        proc.terminate()
+        return True
+    except psutil.Error:
+        return False
@@ -0,0 +1,72 @@
+# watcher_engine/actions_lib/file_lock.py
+# Version: V1.0.0
+# Description: Cross-process lock based on an O_EXCL lock file (works on Windows and POSIX).
+# write_json_atomic() is the one temp file + os.replace writer used by every JSON store.
+
+import os
+import json
+import time
+
+class FileLock:
+    """
+    Context manager holding '<path>.lock' for the duration of a short critical section.
+    A lock file older than 'stale_after' seconds is considered abandoned and removed.
+    """
+    def __init__(self, path, timeout=10.0, stale_after=30.0):
+        self.lock_path = f"{path}.lock"
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.fd = None
+
+    def acquire(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self.fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self.fd, str(os.getpid()).encode())
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > self.stale_after:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Lock busy: {self.lock_path}")
+                time.sleep(0.02)
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            try: os.remove(self.lock_path)
+            except OSError: pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+def write_json_atomic(path, data, indent=4, fsync=False):
+    """
+    Write 'data' as JSON to a per-process temp file and os.replace() it over 'path', so readers never see a
+    partial file. Callers that read-modify-write hold a FileLock around the whole sequence.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    # On Windows the replace fails while another process has the file open for a read; retry briefly.
+    for attempt in range(10):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == 9: raise
+            time.sleep(0.05)
@@ -0,0 +1,153 @@
+# watcher_engine/actions_lib/gem_bookmarks.py
+# Version: V1.0.1
+# Description: Shared store for the Gems bookmark gallery ('Gems_bookmark.json', a list of {name, url, description}).
+# Read by the 04_Gems_Bookmark page and written by both the page and the engine's bulk scraper, so every write
+# is a locked read-modify-write with an atomic replace. Also holds the bulk-scrape request/status files that
+# connect the page to the engine without going through the single-slot task.json.
+# Page edits go through update() / append() / delete() keyed by URL, so they never overwrite results the
+# scraper wrote meanwhile.
+# Update V1.0.1: Requests carry a 'force' flag (bypass gem_cache); take_request() returns the request dict.
+#                One-URL lookups (Auto-Fetch) use their own request file and are served by the engine even
+#                while a bulk batch runs.
+
+import os
+import json
+import time
+
+from watcher_engine.actions_lib.file_lock import FileLock, write_json_atomic
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BOOKMARK_FILE = os.path.join(ROOT_DIR, "Gems_bookmark.json")
+REQUEST_FILE = os.path.join(ROOT_DIR, "gem_scrape_request.json")
+STATUS_FILE = os.path.join(ROOT_DIR, "gem_scrape_status.json")
+FETCH_FILE = os.path.join(ROOT_DIR, "gem_fetch_request.json")
+FETCH_KEEP = 600  # finished one-URL lookups are dropped from FETCH_FILE after this many seconds
+PLACEHOLDER_NAME = "New Gem (Pending Fetch)"
+
+def _read(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError):
+        return default
+
+def load():
+    return _read(BOOKMARK_FILE, [])
+
+def find(bookmarks, url):
+    """Index of the first bookmark with 'url', or None."""
+    return next((i for i, b in enumerate(bookmarks) if b.get("url") == url), None)
+
+def update(url, fields):
+    """Merge 'fields' into the first bookmark with 'url' (fields may change the URL); False if it is gone."""
+    with FileLock(BOOKMARK_FILE):
+        bookmarks = load()
+        index = find(bookmarks, url)
+        if index is None: return False
+        bookmarks[index] = {**bookmarks[index], **fields}
+        write_json_atomic(BOOKMARK_FILE, bookmarks)
+    return True
+
+def append(entry):
+    with FileLock(BOOKMARK_FILE):
+        write_json_atomic(BOOKMARK_FILE, load() + [entry])
+
+def delete(url):
+    """Remove the first bookmark with 'url'; False if it is already gone."""
+    with FileLock(BOOKMARK_FILE):
+        bookmarks = load()
+        index = find(bookmarks, url)
+        if index is None: return False
+        bookmarks.pop(index)
+        write_json_atomic(BOOKMARK_FILE, bookmarks)
+    return True
+
+def add_urls(urls):
+    """Append bookmarks for URLs not in the store yet (placeholder name); returns the number added."""
+    with FileLock(BOOKMARK_FILE):
+        bookmarks = load()
+        known = {b.get("url") for b in bookmarks}
+        new = [u for u in dict.fromkeys(urls) if u and u not in known]
+        bookmarks += [{"name": PLACEHOLDER_NAME, "url": u, "description": ""} for u in new]
+        if new: write_json_atomic(BOOKMARK_FILE, bookmarks)
+    return len(new)
+
+def apply_results(results):
+    """Write scraped {url: {name, description}} into every bookmark with that URL; returns rows changed."""
+    with FileLock(BOOKMARK_FILE):
+        bookmarks, changed = load(), 0
+        for b in bookmarks:
+            info = results.get(b.get("url"))
+            if not info: continue
+            b["name"] = info.get("name") or b.get("name")
+            b["description"] = info.get("description") or b.get("description", "")
+            changed += 1
+        if changed: write_json_atomic(BOOKMARK_FILE, bookmarks)
+    return changed
+
+# --- bulk scrape request / status (page -> engine -> page) ---
+
+def request_scrape(urls, force=False):
+    """Queue a bulk scrape for the engine; a pending request is extended rather than replaced."""
+    with FileLock(REQUEST_FILE):
+        pending = _read(REQUEST_FILE, {})
+        write_json_atomic(REQUEST_FILE, {
+            "urls": list(dict.fromkeys(pending.get("urls", []) + list(urls))),
+            "force": bool(force or pending.get("force")),
+            "requested": time.time(),
+        })
+
+def take_request():
+    """Engine side: consume the pending request, returning {"urls", "force", ...} (or None)."""
+    if not os.path.exists(REQUEST_FILE): return None
+    with FileLock(REQUEST_FILE):
+        request = _read(REQUEST_FILE, {})
+        try: os.remove(REQUEST_FILE)
+        except OSError: pass
+    return request if request.get("urls") else None
+
+def write_status(status):
+    write_json_atomic(STATUS_FILE, status)
+
+def read_status():
+    """{"running", "total", "done", "failed", "started", "finished"} of the last bulk scrape, or {}."""
+    status = _read(STATUS_FILE, {})
+    if not status.get("running") and os.path.exists(REQUEST_FILE):
+        status = {**status, "running": True, "queued": True}
+    return status
+
+# --- one-URL lookups (Auto-Fetch): not queued behind a running bulk batch ---
+
+def request_fetch(url):
+    """Queue a one-URL lookup; returns the request time (the page waits for a cache entry newer than it)."""
+    now = time.time()
+    with FileLock(FETCH_FILE):
+        fetches = {u: f for u, f in _read(FETCH_FILE, {}).items()
+                   if not f.get("finished") or now - f["finished"] < FETCH_KEEP}
+        fetches[url] = {"requested": now, "taken": None, "finished": None}
+        write_json_atomic(FETCH_FILE, fetches)
+    return now
+
+def take_fetches():
+    """Engine side: URLs requested but not picked up yet (they are marked as taken)."""
+    if not os.path.exists(FETCH_FILE): return []
+    with FileLock(FETCH_FILE):
+        fetches = _read(FETCH_FILE, {})
+        pending = [u for u, f in fetches.items() if not f.get("taken")]
+        if pending:
+            now = time.time()
+            for u in pending: fetches[u]["taken"] = now
+            write_json_atomic(FETCH_FILE, fetches)
+    return pending
+
+def finish_fetch(url):
+    with FileLock(FETCH_FILE):
+        fetches = _read(FETCH_FILE, {})
+        if url not in fetches: return
+        fetches[url]["finished"] = time.time()
+        write_json_atomic(FETCH_FILE, fetches)
+
+def fetch_finished(url, requested):
+    """True once the engine has finished the lookup of 'url' requested at 'requested'."""
+    entry = _read(FETCH_FILE, {}).get(url) or {}
+    return (entry.get("finished") or 0) > requested
@@ -0,0 +1,72 @@
+# watcher_engine/actions_lib/gem_cache.py
+# Version: V1.0.0
+# Description: Keyed cache of scraped Gem info ('gem_cache.json': url -> {name, description, fetched}).
+# Shared by the engine (scrape_gem_info, gem_scraper) and the bookmark page. An entry younger than the TTL
+# (config 'gem_cache_ttl_hours') is served without touching the browser; older entries are refreshed, and
+# kept as a fallback if the refresh fails. Reads are cached by file signature; writes are locked and atomic.
+
+import os
+import json
+import time
+
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib.file_lock import FileLock, write_json_atomic
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_FILE = os.path.join(ROOT_DIR, "gem_cache.json")
+DEFAULT_TTL_HOURS = 24
+
+_memo = {}  # (mtime_ns, size) -> parsed cache
+
+def key(url):
+    """Cache key: the URL without query string, fragment or trailing slash."""
+    return url.split("#", 1)[0].split("?", 1)[0].rstrip("/")
+
+def ttl_seconds(config_path=config_store.CONFIG_FILE):
+    return float(config_store.load(config_path).get("gem_cache_ttl_hours", DEFAULT_TTL_HOURS)) * 3600
+
+def _load():
+    try:
+        st = os.stat(CACHE_FILE)
+    except OSError:
+        return {}
+    sig = (st.st_mtime_ns, st.st_size)
+    if sig not in _memo:
+        try:
+            with open(CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError):
+            return {}
+        _memo.clear()
+        _memo[sig] = data
+    return _memo[sig]
+
+def get(url, max_age=None, newer_than=None, config_path=config_store.CONFIG_FILE):
+    """
+    Cached {name, description, fetched} for url, or None when missing or older than max_age seconds
+    (default: the TTL in config_path). newer_than (epoch seconds) only accepts entries fetched after it.
+    """
+    entry = _load().get(key(url))
+    if not entry: return None
+    age = time.time() - entry.get("fetched", 0)
+    if age > (ttl_seconds(config_path) if max_age is None else max_age): return None
+    if newer_than is not None and entry.get("fetched", 0) <= newer_than: return None
+    return dict(entry)
+
+def get_any(url):
+    """Entry regardless of age (stale fallback), or None."""
+    entry = _load().get(key(url))
+    return dict(entry) if entry else None
+
+def put_many(results):
+    """Store {url: {name, description}} with the current time as 'fetched'."""
+    if not results: return
+    now = time.time()
+    with FileLock(CACHE_FILE):
+        data = dict(_load())
+        for url, info in results.items():
+            data[key(url)] = {"name": info.get("name", ""), "description": info.get("description", ""), "fetched": now}
+        write_json_atomic(CACHE_FILE, data)
+
+def put(url, info):
+    put_many({url: info})
@@ -0,0 +1,165 @@
+# watcher_engine/actions_lib/gem_scraper.py
+# Version: V1.1.0
+# Description: Concurrent bulk scraper for Gem name/description.
+# Each URL is opened in its own throwaway page of the shared browser context (the working chat page is never
+# navigated), with images/media/fonts blocked, and at most 'gem_scrape_concurrency' pages open at once.
+# The engine runs request_loop() as a background task: it picks up gem_scrape_request.json (written by the
+# bookmark page) and scrapes in the background, so an active generation loop keeps running undisturbed.
+# Every result is written into the bookmark store as soon as it arrives.
+# Update V1.1.0: Content is awaited with one in-page wait_for_function condition (no evaluate polling, no DOM
+#                cloning); results go through gem_cache, so Gems fetched within the TTL are not scraped again.
+#                One-URL lookups (Auto-Fetch) are started on every tick in their own task, next to a running
+#                bulk batch instead of after it.
+
+import time
+import asyncio
+
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import gem_bookmarks
+from watcher_engine.actions_lib import gem_cache
+
+DEFAULT_CONCURRENCY = 6
+PAGE_TIMEOUT = 20.0
+WAIT_POLL_MS = 100
+BLOCKED_RESOURCES = {"image", "media", "font"}
+
+# Returns {name, description} once the Gem header has rendered, null before. The name is read as the container
+# text minus the badge text, so nothing is cloned per check.
+READY_JS = '''() => {
+    const clean = (t) => t ? t.trim().replace(/\\n/g, ' ') : "";
+    const nameContainer = document.querySelector('.bot-name-container');
+    if (!nameContainer) return null;
+    let name = nameContainer.innerText || "";
+    const badge = nameContainer.querySelector('bot-experiment-badge, .bot-name-container-animation-box');
+    if (badge && badge.innerText) name = name.replace(badge.innerText, "");
+    name = clean(name);
+    if (!name || name === "Gemini") return null;
+    const descContainer = document.querySelector('.bot-description');
+    return { name, description: descContainer ? clean(descContainer.innerText) : "" };
+}'''
+
+# Background batch state.
+_state = {"task": None, "fetches": set()}
+
+def is_running():
+    return _state["task"] is not None and not _state["task"].done()
+
+async def _block_heavy(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def extract(page, timeout=PAGE_TIMEOUT):
+    """Wait (in the page) until the Gem header renders; falls back to the tab title when it never does."""
+    try:
+        handle = await page.wait_for_function(READY_JS, polling=WAIT_POLL_MS, timeout=timeout * 1000)
+        return await handle.json_value()
+    except Exception:
+        name = (await page.title()).replace(" - Gemini", "").strip()
+        return {"name": "" if name == "Gemini" else name, "description": ""}
+
+async def scrape_url(context, url, timeout=PAGE_TIMEOUT):
+    """Scrape one Gem in a fresh page of 'context'; returns {"name", "description"} (name "" on failure)."""
+    page = await context.new_page()
+    try:
+        await page.route("**/*", _block_heavy)
+        await page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+        return await extract(page, timeout)
+    finally:
+        await page.close()
+
+async def fetch(context, url, logger, force=False, config_path=config_store.CONFIG_FILE):
+    """Cached Gem info when fresh (unless force), else a scrape stored in the cache; stale entry as fallback."""
+    if not force:
+        cached = gem_cache.get(url, config_path=config_path)
+        if cached: return cached
+    try:
+        data = await scrape_url(context, url)
+    except Exception as e:
+        logger.warning(f">> [GEMS] Fetch failed for {url}: {e}")
+        data = None
+    if data and data["name"]:
+        gem_cache.put(url, data)
+        return data
+    return gem_cache.get_any(url)
+
+async def scrape_many(context, urls, logger, concurrency=DEFAULT_CONCURRENCY, on_result=None, force=False,
+                      config_path=config_store.CONFIG_FILE):
+    """Fetch all URLs with at most 'concurrency' pages open; on_result(url, data_or_None) per finished URL."""
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def one(url):
+        async with semaphore:
+            data = await fetch(context, url, logger, force, config_path)
+        if on_result: on_result(url, data)
+        return url, data
+
+    return dict(await asyncio.gather(*(one(u) for u in urls)))
+
+async def run_batch(context, urls, logger, concurrency=DEFAULT_CONCURRENCY, force=False,
+                    config_path=config_store.CONFIG_FILE):
+    """Fetch a URL list and write each result into the bookmark store as it arrives."""
+    status = {"running": True, "total": len(urls), "done": 0, "failed": 0, "started": time.time(), "finished": None}
+    gem_bookmarks.write_status(status)
+    # Fresh cache entries need no browser work: apply them in one write before scraping the rest.
+    cached = {} if force else {u: c for u in urls if (c := gem_cache.get(u, config_path=config_path))}
+    if cached:
+        gem_bookmarks.apply_results(cached)
+        status["done"] = len(cached)
+        urls = [u for u in urls if u not in cached]
+    logger.info(f">> [GEMS] Bulk fetch started: {len(urls)} to scrape, {len(cached)} from cache, concurrency {concurrency}.")
+
+    def on_result(url, data):
+        status["done"] += 1
+        if data and data["name"]:
+            try:
+                gem_bookmarks.apply_results({url: data})
+            except Exception as e:
+                logger.warning(f">> [GEMS] Bookmark update failed for {url}: {e}")
+        else:
+            status["failed"] += 1
+        gem_bookmarks.write_status(status)
+
+    try:
+        await scrape_many(context, urls, logger, concurrency, on_result, force, config_path)
+    finally:
+        status.update(running=False, finished=time.time())
+        gem_bookmarks.write_status(status)
+        logger.info(f">> [GEMS] Bulk fetch finished: {status['done'] - status['failed']}/{status['total']} "
+                    f"in {status['finished'] - status['started']:.1f}s.")
+
+async def fetch_one(context, url, logger, config_path=config_store.CONFIG_FILE):
+    """One-URL lookup for the bookmark page: the result lands in gem_cache, then the request is marked finished."""
+    try:
+        await fetch(context, url, logger, config_path=config_path)
+    finally:
+        gem_bookmarks.finish_fetch(url)
+
+async def request_loop(get_context, logger, config_path=config_store.CONFIG_FILE, interval=1.0):
+    """Engine background task: serve one-URL lookups at once and start a batch whenever a bulk request is
+    pending and the browser is up. Cancelling it also cancels (and awaits) the running work.
+    config_path is the engine's config ('gem_scrape_concurrency', 'gem_cache_ttl_hours')."""
+    fetches = _state["fetches"]
+    try:
+        while True:
+            try:
+                context = get_context()
+                if context is not None:
+                    for url in gem_bookmarks.take_fetches():
+                        task = asyncio.create_task(fetch_one(context, url, logger, config_path))
+                        fetches.add(task)
+                        task.add_done_callback(fetches.discard)
+                if context is not None and not is_running():
+                    request = gem_bookmarks.take_request()
+                    if request:
+                        concurrency = config_store.load(config_path).get("gem_scrape_concurrency", DEFAULT_CONCURRENCY)
+                        _state["task"] = asyncio.create_task(run_batch(
+                            context, request["urls"], logger, concurrency, request.get("force", False), config_path))
+            except Exception as e:
+                logger.warning(f">> [GEMS] Request check failed: {e}")
+            await asyncio.sleep(interval)
+    finally:
+        tasks = list(fetches) + ([_state["task"]] if is_running() else [])
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,126 @@
+# watcher_engine/actions_lib/image_dedup.py
+# Version: V1.0.0
+# Description: Content hash (exact) and dHash (perceptual) index of the images in an output folder.
+# One SQLite DB per save_dir under '.library_cache/' (kept out of the folder itself): table 'hashes' with an
+# indexed sha column and the 64-bit dHash split into eight indexed 8-bit bands. claim() runs lookup, filename
+# allocation and record in one write transaction, so two writers cannot both miss and save the same image.
+# Near-duplicate lookup: two hashes within 7 bits share at least one band (pigeonhole), so only rows matching
+# a band are compared bit by bit; distances of 8+ bits fall back to comparing every row.
+
+import os
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from PIL import Image
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(ROOT_DIR, ".library_cache")
+BANDS = 8
+BAND_BITS = 64 // BANDS
+BAND_COLUMNS = [f"b{i}" for i in range(BANDS)]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS hashes (name TEXT PRIMARY KEY, sha TEXT NOT NULL, phash TEXT,
+                                   {", ".join(f"{c} INTEGER" for c in BAND_COLUMNS)});
+CREATE INDEX IF NOT EXISTS idx_hashes_sha ON hashes(sha);
+""" + "".join(f"CREATE INDEX IF NOT EXISTS idx_hashes_{c} ON hashes({c});\n" for c in BAND_COLUMNS)
+
+def content_hash(pil_img):
+    """SHA-256 of the decoded pixels, so re-encoded copies of the same image still match."""
+    h = hashlib.sha256()
+    h.update(f"{pil_img.mode}|{pil_img.size[0]}x{pil_img.size[1]}|".encode())
+    h.update(pil_img.tobytes())
+    return h.hexdigest()
+
+def perceptual_hash(pil_img):
+    """64-bit difference hash (dHash) as a 16-char hex string."""
+    small = pil_img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    px = small.tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (1 if px[row * 9 + col] > px[row * 9 + col + 1] else 0)
+    return f"{bits:016x}"
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+def bands(phash):
+    """The hash's eight 8-bit bands, most significant first."""
+    value = int(phash, 16)
+    return [(value >> (64 - BAND_BITS * (i + 1))) & ((1 << BAND_BITS) - 1) for i in range(BANDS)]
+
+def _db_path(save_dir):
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(save_dir)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"hashes_{key}.db")
+
+def _connect(save_dir):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(_db_path(save_dir), timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class HashIndex:
+    """Lookups and records inside one claim() transaction."""
+    def __init__(self, conn, save_dir):
+        self.conn, self.save_dir = conn, save_dir
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.save_dir, name))
+
+    def lookup(self, sha, phash, max_distance=6):
+        """
+        Return (exact_name, near_name) for an incoming image.
+        Entries whose file was deleted from the folder are ignored.
+        'max_distance' <= 0 disables near-duplicate matching.
+        """
+        exact = next((name for (name,) in self.conn.execute(
+            "SELECT name FROM hashes WHERE sha = ? ORDER BY rowid", (sha,)) if self._exists(name)), None)
+
+        near = None
+        if phash and max_distance > 0:
+            if max_distance < BANDS:
+                where = " OR ".join(f"{c} = ?" for c in BAND_COLUMNS)
+                rows = self.conn.execute(f"SELECT name, phash FROM hashes WHERE {where}", bands(phash))
+            else:
+                rows = self.conn.execute("SELECT name, phash FROM hashes WHERE phash IS NOT NULL")
+            # Distances first; only the closest candidates are checked on disk.
+            candidates = sorted((d, name) for name, other in rows
+                                for d in (hamming(phash, other),) if d <= max_distance)
+            near = next((name for _, name in candidates if self._exists(name)), None)
+        return exact, near
+
+    def record(self, save_name, sha, phash):
+        """Add a saved (or reserved) file to the index."""
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO hashes (name, sha, phash, {', '.join(BAND_COLUMNS)}) "
+            f"VALUES (?, ?, ?, {', '.join('?' * BANDS)})",
+            (save_name, sha, phash, *(bands(phash) if phash else [None] * BANDS)))
+
+@contextmanager
+def claim(save_dir):
+    """
+    Write transaction on the folder's hash index: lookup -> allocate a name -> record it, then commit.
+    Other writers wait on the DB lock, so they see the claimed image as a duplicate.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    conn = _connect(save_dir)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield HashIndex(conn, save_dir)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+def forget(save_dir, save_name):
+    """Drop a claimed name whose file was never written."""
+    conn = _connect(save_dir)
+    try:
+        conn.execute("DELETE FROM hashes WHERE name = ?", (save_name,))
+    finally:
+        conn.close()
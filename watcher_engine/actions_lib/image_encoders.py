@@ -0,0 +1,67 @@
+# watcher_engine/actions_lib/image_encoders.py
+# Version: V1.0.0
+# Description: Output encoders (PNG / WebP / JPEG / AVIF) with the matching metadata container.
+# PNG  -> tEXt 'Prompt' + iTXt 'Provenance' (+ optional XMP iTXt)
+# WebP / JPEG / AVIF -> EXIF ImageDescription (UTF-8 prompt) + XMP packet carrying the provenance record
+# Config keys: output_format ("png" | "webp" | "jpeg" | "avif"), output_quality (1-100, lossy formats only).
+
+import piexif
+from PIL import PngImagePlugin, features
+
+from watcher_engine.actions_lib import provenance
+
+# format key -> (PIL format name, file extension)
+FORMATS = {
+    "png": ("PNG", "png"),
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+    "avif": ("AVIF", "avif"),
+}
+
+def resolve_format(cfg, logger=None):
+    """Return the configured format key, falling back to WebP when AVIF is not available."""
+    fmt = str(cfg.get("output_format", "png")).lower()
+    if fmt == "jpg": fmt = "jpeg"
+    if fmt not in FORMATS:
+        if logger: logger.warning(f">> Unknown output_format '{fmt}', using png.")
+        return "png"
+    if fmt == "avif" and not features.check("avif"):
+        if logger: logger.warning(">> AVIF encoder not available in this Pillow build, using webp.")
+        return "webp"
+    return fmt
+
+def extension(fmt):
+    return FORMATS[fmt][1]
+
+def encode(pil_img, final_path, fmt, prompt_text, record=None, near=None, quality=90, with_xmp=False):
+    """Write pil_img to final_path in the given format with embedded prompt/provenance metadata."""
+    if fmt == "png":
+        meta = PngImagePlugin.PngInfo()
+        meta.add_text("Prompt", prompt_text)
+        if near:
+            meta.add_text("NearDuplicateOf", near)
+        if record:
+            provenance.add_to_pnginfo(meta, record, with_xmp)
+        pil_img.save(final_path, "PNG", pnginfo=meta)
+        return
+
+    zeroth = {piexif.ImageIFD.ImageDescription: prompt_text.encode("utf-8")}
+    if near:
+        zeroth[piexif.ImageIFD.DocumentName] = near.encode("utf-8")
+    params = {
+        "quality": int(quality),
+        "exif": piexif.dump({"0th": zeroth, "Exif": {}, "GPS": {}, "1st": {}}),
+    }
+    if record:
+        params["xmp"] = provenance.to_xmp(record).encode("utf-8")
+
+    img = pil_img
+    if fmt == "jpeg":
+        if img.mode != "RGB": img = img.convert("RGB")
+        params.update(optimize=True, progressive=True)
+    elif fmt == "webp":
+        params["method"] = 4
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    img.save(final_path, FORMATS[fmt][0], **params)
@@ -0,0 +1,100 @@
+# watcher_engine/actions_lib/image_ingest.py
+# Version: V1.3.0
+# Description: Shared save pipeline for downloaded images (dedup check -> filename -> encode + metadata).
+# Blocking (hashing/encoding): actions call it through asyncio.to_thread.
+# Config keys: dedup_mode ("skip" | "link" | "off"), dedup_phash_distance (0 disables near-dup flagging),
+#              embed_xmp (PNG only: also write the provenance record as an XMP packet),
+#              output_format / output_quality (see image_encoders).
+# Duplicate lookup, name allocation and hash record run in one image_dedup.claim() transaction; the image is
+# then encoded to a '.part' file and moved over its reserved name.
+# Every saved file is pushed into the gallery index (library_index) so the UI never has to rescan for it.
+
+import os
+import shutil
+from PIL import Image
+
+from watcher_engine.actions_lib import name_allocator as na
+from watcher_engine.actions_lib import image_dedup as dedup
+from watcher_engine.actions_lib import image_encoders as enc
+from watcher_engine.actions_lib import library_index
+
+def _allocate(cfg, fmt, link_to):
+    # A hard link keeps the existing file's format, so it also keeps its extension.
+    ext = os.path.splitext(link_to)[1].lstrip(".") if link_to else enc.extension(fmt)
+    return na.allocate(cfg.get("save_dir", "browser_outputs"), cfg.get("name_prefix", ""),
+                       cfg.get("name_padding", 2), cfg.get("name_start", 1), ext)
+
+def ingest_download(temp_path, cfg, prompt_text, logger, record=None):
+    """
+    Save one downloaded image into cfg['save_dir'].
+    'record' is the provenance dict from provenance.build_record(), embedded alongside 'Prompt'.
+    Returns the saved file name, or None when the image was skipped as an exact duplicate.
+    """
+    save_dir = cfg.get("save_dir", "browser_outputs")
+    dedup_mode = cfg.get("dedup_mode", "skip")
+    max_distance = cfg.get("dedup_phash_distance", 6)
+    fmt = enc.resolve_format(cfg, logger)
+
+    with Image.open(temp_path) as pil_img:
+        sha, phash, exact, near = None, None, None, None
+        if dedup_mode != "off":
+            pil_img.load()
+            sha = dedup.content_hash(pil_img)
+            phash = dedup.perceptual_hash(pil_img) if max_distance > 0 else None
+            # Lookup, name reservation and record are one transaction; encoding happens after it.
+            with dedup.claim(save_dir) as index:
+                exact, near = index.lookup(sha, phash, max_distance)
+                if exact and dedup_mode == "skip":
+                    logger.info(f">> Duplicate skipped: identical to {exact}")
+                    return None
+                save_name, final_path = _allocate(cfg, fmt, exact if dedup_mode == "link" else None)
+                index.record(save_name, sha, phash)
+        else:
+            save_name, final_path = _allocate(cfg, fmt, None)
+
+        try:
+            if exact and dedup_mode == "link":
+                os.remove(final_path)
+                try:
+                    os.link(os.path.join(save_dir, exact), final_path)
+                except OSError:
+                    shutil.copy2(os.path.join(save_dir, exact), final_path)
+                logger.info(f">> Saved: {save_name} (hard link to {exact})")
+            else:
+                if record and near:
+                    record = dict(record, near_duplicate_of=near)
+                # Encode next to the reservation and swap it in whole, so the final name never holds a partial file.
+                part_path = os.path.join(os.path.dirname(final_path), f".{save_name}.part")
+                try:
+                    enc.encode(pil_img, part_path, fmt, prompt_text, record, near,
+                               cfg.get("output_quality", 90), cfg.get("embed_xmp", False))
+                    os.replace(part_path, final_path)
+                except BaseException:
+                    try: os.remove(part_path)
+                    except OSError: pass
+                    raise
+                logger.info(f">> Saved: {save_name}" + (f" (near-duplicate of {near})" if near else ""))
+        except Exception:
+            na.release(final_path)
+            if sha: dedup.forget(save_dir, save_name)
+            raise
+
+    try:
+        library_index.upsert(save_dir, save_name)
+    except Exception as e:
+        logger.warning(f">> Gallery index update failed: {e}")
+    return save_name
+
+def ingest_batch(items, cfg, prompt_text, logger):
+    """
+    Save a batch of downloads: items is a list of (temp_path, record).
+    Returns the number of files written; one failed image does not stop the batch.
+    """
+    saved = 0
+    for temp_path, record in items:
+        try:
+            if ingest_download(temp_path, cfg, prompt_text, logger, record):
+                saved += 1
+        except Exception as e:
+            logger.error(f">> Save failed: {e}")
+    return saved
@@ -0,0 +1,314 @@
+# watcher_engine/actions_lib/image_meta.py
+# Version: V1.1.0
+# Description: Header-only metadata parser for PNG / JPEG / WebP / AVIF byte streams.
+# Walks the container structure (PNG chunks, JPEG markers, RIFF chunks, ISOBMFF boxes) of a seekable stream and collects
+# text chunks, EXIF and XMP without reading any pixel data: image payload chunks are skipped with seek(),
+# and JPEG parsing stops at the start-of-scan marker.
+# Result: {"format", "width", "height", "info": {text key -> str, "xmp" -> str}, "exif": {tag id -> value}}
+# AVIF (ISOBMFF): the 'meta' box is read (iinf/iloc for the Exif and XMP items, ispe of the primary item for
+# the size); only those items' extents are read, 'mdat' pixel data is skipped.
+
+import io
+import zlib
+import struct
+from PIL import Image
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+XMP_JPEG_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+EXIF_IFD_POINTER = 0x8769
+# JPEG SOF markers carrying the frame size (SOF0-SOF15 minus DHT/JPG/DAC).
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+AVIF_BRANDS = {b"avif", b"avis"}
+XMP_MIME = b"application/rdf+xml"
+
+def _latin1(b):
+    return b.decode("latin-1", errors="replace")
+
+def _parse_exif(raw):
+    """EXIF TIFF block -> {tag: value}, base IFD merged with the Exif sub-IFD (like PIL's _getexif)."""
+    if raw.startswith(b"Exif\x00\x00"):
+        raw = raw[6:]
+    try:
+        exif = Image.Exif()
+        exif.load(raw)
+        tags = dict(exif)
+        tags.update(exif.get_ifd(EXIF_IFD_POINTER))
+        tags.pop(EXIF_IFD_POINTER, None)
+        return tags
+    except Exception:
+        return {}
+
+def _png(f, meta):
+    f.seek(len(PNG_SIGNATURE))
+    while True:
+        head = f.read(8)
+        if len(head) < 8: break
+        length, ctype = struct.unpack(">I4s", head)
+        if ctype in (b"IDAT", b"fdAT"):
+            # Image data is skipped by offset: text chunks may legally follow it.
+            f.seek(length + 4, 1)
+            continue
+        body = f.read(length)
+        f.seek(4, 1)  # CRC
+        if ctype == b"IHDR":
+            meta["width"], meta["height"] = struct.unpack(">II", body[:8])
+        elif ctype == b"tEXt":
+            key, _, value = body.partition(b"\x00")
+            meta["info"][_latin1(key)] = _latin1(value)
+        elif ctype == b"zTXt":
+            key, _, rest = body.partition(b"\x00")
+            try:
+                meta["info"][_latin1(key)] = _latin1(zlib.decompress(rest[1:]))
+            except zlib.error:
+                pass
+        elif ctype == b"iTXt":
+            key, _, rest = body.partition(b"\x00")
+            if len(rest) < 2: continue
+            compressed = rest[0]
+            _lang, _, rest = rest[2:].partition(b"\x00")
+            _tkey, _, text = rest.partition(b"\x00")
+            try:
+                if compressed: text = zlib.decompress(text)
+                meta["info"][_latin1(key)] = text.decode("utf-8", errors="replace")
+            except zlib.error:
+                pass
+        elif ctype == b"eXIf":
+            meta["exif"] = _parse_exif(body)
+        elif ctype == b"IEND":
+            break
+
+def _jpeg(f, meta):
+    f.seek(2)
+    while True:
+        head = f.read(2)
+        if len(head) < 2 or head[0] != 0xFF: break
+        marker = head[1]
+        if marker == 0xFF:
+            f.seek(-1, 1)
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker in (0xDA, 0xD9):  # start of scan / end of image: pixel data follows
+            break
+        size = f.read(2)
+        if len(size) < 2: break
+        length = struct.unpack(">H", size)[0]
+        if marker in (0xE1, 0xFE) or marker in JPEG_SOF:
+            body = f.read(length - 2)
+        else:
+            f.seek(length - 2, 1)
+            continue
+        if marker == 0xE1 and body.startswith(b"Exif\x00\x00"):
+            meta["exif"] = _parse_exif(body)
+        elif marker == 0xE1 and body.startswith(XMP_JPEG_HEADER):
+            meta["info"]["xmp"] = body[len(XMP_JPEG_HEADER):].decode("utf-8", errors="replace")
+        elif marker == 0xFE:
+            meta["info"]["comment"] = body.decode("utf-8", errors="replace")
+        elif marker in JPEG_SOF and len(body) >= 5:
+            meta["height"], meta["width"] = struct.unpack(">HH", body[1:5])
+
+def _webp(f, meta):
+    f.seek(12)
+    while True:
+        head = f.read(8)
+        if len(head) < 8: break
+        ctype, length = struct.unpack("<4sI", head)
+        padded = length + (length & 1)
+        if ctype in (b"VP8 ", b"VP8L"):
+            # Only the frame header is needed for the size; skip the bitstream.
+            body = f.read(min(length, 10))
+            f.seek(padded - len(body), 1)
+        elif ctype in (b"VP8X", b"EXIF", b"XMP "):
+            body = f.read(length)
+            f.seek(padded - length, 1)
+        else:
+            f.seek(padded, 1)
+            continue
+        if ctype == b"VP8X" and len(body) >= 10:
+            meta["width"] = 1 + int.from_bytes(body[4:7], "little")
+            meta["height"] = 1 + int.from_bytes(body[7:10], "little")
+        elif ctype == b"VP8 " and len(body) >= 10 and meta["width"] is None:
+            w, h = struct.unpack("<HH", body[6:10])
+            meta["width"], meta["height"] = w & 0x3FFF, h & 0x3FFF
+        elif ctype == b"VP8L" and len(body) >= 5 and meta["width"] is None:
+            bits = int.from_bytes(body[1:5], "little")
+            meta["width"], meta["height"] = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        elif ctype == b"EXIF":
+            meta["exif"] = _parse_exif(body)
+        elif ctype == b"XMP ":
+            meta["info"]["xmp"] = body.decode("utf-8", errors="replace")
+
+def _boxes(data, start=0, end=None):
+    """(type, body_start, body_end) of the ISOBMFF boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, btype = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end: break
+            size, header = struct.unpack(">Q", data[pos + 8:pos + 16])[0], 16
+        elif size == 0:
+            size = end - pos
+        if size < header: break
+        yield btype, pos + header, min(pos + size, end)
+        pos += size
+
+def _uint(data, pos, n):
+    return (int.from_bytes(data[pos:pos + n], "big") if n else 0), pos + n
+
+def _iinf(data, start, end):
+    """item id -> (item type, content type) from the item info entries."""
+    items = {}
+    version = data[start]
+    first = start + (6 if version == 0 else 8)
+    for btype, b0, b1 in _boxes(data, first, end):
+        if btype != b"infe" or data[b0] < 2: continue
+        id_size = 2 if data[b0] == 2 else 4
+        item_id, pos = _uint(data, b0 + 4, id_size)
+        item_type = data[pos + 2:pos + 6]
+        pos += 6
+        name_end = data.find(b"\x00", pos, b1)
+        content_type = b""
+        if item_type == b"mime" and name_end >= 0:
+            ct_end = data.find(b"\x00", name_end + 1, b1)
+            content_type = data[name_end + 1:ct_end if ct_end >= 0 else b1]
+        items[item_id] = (item_type, content_type)
+    return items
+
+def _iloc(data, start, end):
+    """item id -> (construction method, [(offset, length)]) from the item location box."""
+    version = data[start]
+    offset_size, length_size = data[start + 4] >> 4, data[start + 4] & 15
+    base_offset_size, index_size = data[start + 5] >> 4, (data[start + 5] & 15 if version in (1, 2) else 0)
+    pos = start + 6
+    count, pos = _uint(data, pos, 2 if version < 2 else 4)
+    locations = {}
+    for _ in range(count):
+        item_id, pos = _uint(data, pos, 2 if version < 2 else 4)
+        method = 0
+        if version in (1, 2):
+            method, pos = _uint(data, pos, 2)
+            method &= 15
+        pos += 2  # data_reference_index
+        base, pos = _uint(data, pos, base_offset_size)
+        extent_count, pos = _uint(data, pos, 2)
+        extents = []
+        for _ in range(extent_count):
+            pos += index_size
+            offset, pos = _uint(data, pos, offset_size)
+            length, pos = _uint(data, pos, length_size)
+            extents.append((base + offset, length))
+        if pos > end: break
+        locations[item_id] = (method, extents)
+    return locations
+
+def _primary_size(data, iprp, primary):
+    """(width, height) from the ispe property of the primary item (else the largest ispe)."""
+    props, assoc = [], {}
+    for btype, b0, b1 in _boxes(data, *iprp):
+        if btype == b"ipco":
+            props = [(t, p0) for t, p0, _ in _boxes(data, b0, b1)]
+        elif btype == b"ipma":
+            version, flags = data[b0], int.from_bytes(data[b0 + 1:b0 + 4], "big")
+            count, pos = _uint(data, b0 + 4, 4)
+            for _ in range(count):
+                item_id, pos = _uint(data, pos, 2 if version < 1 else 4)
+                n, pos = data[pos], pos + 1
+                entries = []
+                for _ in range(n):
+                    if flags & 1:
+                        value, pos = _uint(data, pos, 2)
+                        entries.append(value & 0x7FFF)
+                    else:
+                        entries.append(data[pos] & 0x7F)
+                        pos += 1
+                assoc[item_id] = entries
+    sizes = [struct.unpack(">II", data[p0 + 4:p0 + 12]) for t, p0 in props if t == b"ispe"]
+    for index in assoc.get(primary, []):
+        if 0 < index <= len(props) and props[index - 1][0] == b"ispe":
+            return struct.unpack(">II", data[props[index - 1][1] + 4:props[index - 1][1] + 12])
+    return max(sizes, key=lambda wh: wh[0] * wh[1]) if sizes else (None, None)
+
+def _isobmff(f, meta):
+    """AVIF: top-level boxes are walked with seek(); only 'meta' and the Exif/XMP item extents are read."""
+    f.seek(0)
+    meta_box = None
+    while True:
+        head = f.read(8)
+        if len(head) < 8: break
+        size, btype = struct.unpack(">I4s", head)
+        header = 8
+        if size == 1:
+            size, header = struct.unpack(">Q", f.read(8))[0], 16
+        if btype == b"meta":
+            meta_box = f.read(size - header) if size else f.read()
+            break
+        if size == 0: break
+        f.seek(size - header, 1)
+    if not meta_box: return
+
+    children = {t: (b0, b1) for t, b0, b1 in _boxes(meta_box, 4)}  # meta is a full box
+    items = _iinf(meta_box, *children[b"iinf"]) if b"iinf" in children else {}
+    locations = _iloc(meta_box, *children[b"iloc"]) if b"iloc" in children else {}
+    primary = None
+    if b"pitm" in children:
+        b0 = children[b"pitm"][0]
+        primary, _ = _uint(meta_box, b0 + 4, 2 if meta_box[b0] == 0 else 4)
+    if b"iprp" in children:
+        meta["width"], meta["height"] = _primary_size(meta_box, children[b"iprp"], primary)
+
+    def payload(item_id):
+        method, extents = locations.get(item_id, (None, []))
+        if method == 0:
+            chunks = []
+            for offset, length in extents:
+                f.seek(offset)
+                chunks.append(f.read(length))
+            return b"".join(chunks)
+        if method == 1 and b"idat" in children:
+            idat = children[b"idat"][0]
+            return b"".join(meta_box[idat + o:idat + o + n] for o, n in extents)
+        return b""
+
+    for item_id, (item_type, content_type) in items.items():
+        if item_type == b"Exif":
+            body = payload(item_id)
+            if len(body) >= 4:
+                # Exif items start with the offset of the TIFF header.
+                meta["exif"] = _parse_exif(body[4 + struct.unpack(">I", body[:4])[0]:])
+        elif item_type == b"mime" and content_type == XMP_MIME:
+            meta["info"]["xmp"] = payload(item_id).decode("utf-8", errors="replace")
+
+def parse_stream(f):
+    """Parse metadata from a seekable binary file object; only header/metadata bytes are read."""
+    meta = {"format": None, "width": None, "height": None, "info": {}, "exif": {}}
+    sig = f.read(12)
+    if sig.startswith(PNG_SIGNATURE):
+        meta["format"] = "PNG"
+        _png(f, meta)
+    elif sig.startswith(b"\xff\xd8"):
+        meta["format"] = "JPEG"
+        _jpeg(f, meta)
+    elif sig[:4] == b"RIFF" and sig[8:12] == b"WEBP":
+        meta["format"] = "WEBP"
+        _webp(f, meta)
+    elif sig[4:8] == b"ftyp" and (sig[8:12] in AVIF_BRANDS or _has_avif_brand(f, sig)):
+        meta["format"] = "AVIF"
+        _isobmff(f, meta)
+    return meta
+
+def _has_avif_brand(f, sig):
+    size = struct.unpack(">I", sig[:4])[0]
+    f.seek(16)
+    compatible = f.read(max(0, min(size, 256) - 16))
+    return any(compatible[i:i + 4] in AVIF_BRANDS for i in range(0, len(compatible) - 3, 4))
+
+def parse(data):
+    """Parse metadata from the raw bytes of an image file. Unknown formats return format None."""
+    return parse_stream(io.BytesIO(data))
+
+def parse_file(path):
+    """Parse a file on disk, seeking past pixel data instead of reading it."""
+    with open(path, "rb") as f:
+        return parse_stream(f)
@@ -0,0 +1,214 @@
+# watcher_engine/actions_lib/library_index.py
+# Version: V1.1.0
+# Description: Persistent SQLite index of the output folder (one DB per save_dir under '.library_cache/'; kept
+# out of the folder because its WAL/SHM files would change the folder's mtime on every connection).
+# One row per image: name, mtime, size, width, height, has_prompt, prompt.
+# Kept current two ways: image_ingest pushes every saved file (upsert), and the UI calls sync(), which
+# only rescans the folder when its directory mtime has changed. Freshness comes from polling that mtime
+# (one stat() per call), not from filesystem change events, so no watcher thread or extra dependency is
+# needed. Queries are paginated in SQL, so the gallery's refresh cost follows the page size, not the library size.
+# Update V1.1.0: FTS5 full-text index over prompts ('prompts_fts', external content on 'images'), kept in
+# step by triggers; search_prompts() answers word/prefix/phrase queries ranked by bm25.
+
+import os
+import time
+import hashlib
+import sqlite3
+from PIL import Image
+
+from watcher_engine.actions_lib import provenance
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(ROOT_DIR, ".library_cache")
+IMAGE_EXTS = (".png", ".webp", ".jpg", ".jpeg", ".avif")
+# A directory mtime this recent may still change within the same timestamp tick; don't trust it yet.
+MTIME_SETTLE = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    name TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    has_prompt INTEGER NOT NULL DEFAULT 0,
+    prompt TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_mtime ON images(mtime);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# External-content FTS table: the prompt text lives once in 'images', the triggers keep the token index in step.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(
+    prompt, content='images', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS images_fts_ai AFTER INSERT ON images BEGIN
+    INSERT INTO prompts_fts(rowid, prompt) VALUES (new.rowid, new.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS images_fts_ad AFTER DELETE ON images BEGIN
+    INSERT INTO prompts_fts(prompts_fts, rowid, prompt) VALUES ('delete', old.rowid, old.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS images_fts_au AFTER UPDATE OF prompt ON images BEGIN
+    INSERT INTO prompts_fts(prompts_fts, rowid, prompt) VALUES ('delete', old.rowid, old.prompt);
+    INSERT INTO prompts_fts(rowid, prompt) VALUES (new.rowid, new.prompt);
+END;
+"""
+
+def _db_path(save_dir):
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(save_dir)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"library_{key}.db")
+
+def connect(save_dir):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(_db_path(save_dir), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'prompts_fts'").fetchone()
+    conn.executescript(FTS_SCHEMA)
+    if not has_fts:
+        # Index created on an existing library: fill it from the rows already there.
+        with conn:
+            conn.execute("INSERT INTO prompts_fts(prompts_fts) VALUES ('rebuild')")
+    return conn
+
+def _probe(path):
+    """(width, height, prompt) from the header/metadata only; pixel data is never decoded."""
+    with Image.open(path) as img:
+        width, height = img.size
+        prompt = img.info.get("Prompt")
+        if not prompt:
+            prompt = provenance.decode_exif_text(img.getexif().get(0x010E)) or None
+    return width, height, prompt
+
+def _row(save_dir, name, st):
+    try:
+        width, height, prompt = _probe(os.path.join(save_dir, name))
+    except Exception:
+        width, height, prompt = None, None, None
+    return (name, st.st_mtime, st.st_size, width, height, 1 if prompt else 0, prompt)
+
+def _write_rows(conn, rows):
+    # Upsert rather than INSERT OR REPLACE: a REPLACE delete does not fire the FTS delete trigger.
+    conn.executemany(
+        "INSERT INTO images (name, mtime, size, width, height, has_prompt, prompt) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET mtime = excluded.mtime, size = excluded.size, width = excluded.width, "
+        "height = excluded.height, has_prompt = excluded.has_prompt, prompt = excluded.prompt",
+        rows)
+
+def upsert(save_dir, name):
+    """Index (or re-index) one file; called by the save pipeline right after writing it."""
+    st = os.stat(os.path.join(save_dir, name))
+    conn = connect(save_dir)
+    try:
+        with conn:
+            _write_rows(conn, [_row(save_dir, name, st)])
+    finally:
+        conn.close()
+
+def sync(save_dir, force=False):
+    """
+    Bring the index in line with the folder. Returns the number of rows added, updated or removed.
+    Without 'force' this is a single stat() when the folder has not changed since the last sync.
+    """
+    if not os.path.isdir(save_dir): return 0
+    dir_mtime = os.stat(save_dir).st_mtime
+    conn = connect(save_dir)
+    try:
+        stored = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime'").fetchone()
+        if not force and stored and float(stored[0]) == dir_mtime:
+            return 0
+
+        known = {name: (mtime, size) for name, mtime, size in conn.execute("SELECT name, mtime, size FROM images")}
+        rows, seen, pending = [], set(), False
+        with os.scandir(save_dir) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(IMAGE_EXTS) or not entry.is_file(): continue
+                st = entry.stat()
+                if st.st_size == 0:
+                    # Name reserved by the allocator but not written yet: pick it up on a later sync.
+                    pending = True
+                    continue
+                seen.add(entry.name)
+                if known.get(entry.name) != (st.st_mtime, st.st_size):
+                    rows.append(_row(save_dir, entry.name, st))
+
+        gone = [(name,) for name in known if name not in seen]
+        with conn:
+            if rows: _write_rows(conn, rows)
+            if gone: conn.executemany("DELETE FROM images WHERE name = ?", gone)
+            if not pending and time.time() - dir_mtime > MTIME_SETTLE:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime', ?)", (str(dir_mtime),))
+        return len(rows) + len(gone)
+    finally:
+        conn.close()
+
+def _where(search, prompt_only):
+    clauses, args = [], []
+    if prompt_only:
+        clauses.append("has_prompt = 1")
+    if search:
+        clauses.append("(name LIKE ? OR prompt LIKE ?)")
+        args += [f"%{search}%"] * 2
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+def count(save_dir, search="", prompt_only=False):
+    if not os.path.isdir(save_dir): return 0
+    where, args = _where(search, prompt_only)
+    conn = connect(save_dir)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM images{where}", args).fetchone()[0]
+    finally:
+        conn.close()
+
+def page(save_dir, offset=0, limit=24, search="", prompt_only=False, newest_first=True):
+    """One page of rows as dicts, newest first by default."""
+    if not os.path.isdir(save_dir): return []
+    where, args = _where(search, prompt_only)
+    order = "DESC" if newest_first else "ASC"
+    conn = connect(save_dir)
+    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute(f"SELECT * FROM images{where} ORDER BY mtime {order}, name {order} LIMIT ? OFFSET ?",
+                           args + [int(limit), int(offset)])
+        return [dict(r) for r in cur]
+    finally:
+        conn.close()
+
+def fts_query(text):
+    """
+    Plain search text -> FTS5 MATCH expression: every word must occur, the last one as a prefix
+    (search-as-you-type); "quoted phrases" are kept as phrases. Returns '' when nothing is searchable.
+    """
+    terms, phrases = [], text.split('"')
+    for i, part in enumerate(phrases):
+        if i % 2:
+            words = part.split()
+            if words: terms.append('"' + " ".join(words) + '"')
+        else:
+            terms += ['"' + w.replace('"', "") + '"' for w in part.split()]
+    if not terms: return ""
+    if not text.rstrip().endswith('"'):
+        terms[-1] += "*"
+    return " AND ".join(terms)
+
+def search_prompts(save_dir, text, offset=0, limit=48):
+    """
+    Full-text prompt search: (total matches, rows as dicts with a highlighted 'snippet'), best match first.
+    Latency follows the number of matches, not the library size.
+    """
+    query = fts_query(text)
+    if not query or not os.path.isdir(save_dir): return 0, []
+    conn = connect(save_dir)
+    conn.row_factory = sqlite3.Row
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM prompts_fts WHERE prompts_fts MATCH ?", (query,)).fetchone()[0]
+        cur = conn.execute(
+            "SELECT images.*, snippet(prompts_fts, 0, '**', '**', ' … ', 24) AS snippet "
+            "FROM prompts_fts JOIN images ON images.rowid = prompts_fts.rowid "
+            "WHERE prompts_fts MATCH ? ORDER BY bm25(prompts_fts), images.mtime DESC LIMIT ? OFFSET ?",
+            (query, int(limit), int(offset)))
+        return total, [dict(r) for r in cur]
+    finally:
+        conn.close()
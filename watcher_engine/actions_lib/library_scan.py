@@ -0,0 +1,141 @@
+# watcher_engine/actions_lib/library_scan.py
+# Version: V1.0.0
+# Description: Bulk metadata scanner for a directory tree (save_dir or any folder).
+# Files are parsed header-only (image_meta) in a process pool and results stream back in completion
+# order. Every batch is committed to a per-root SQLite cache under '.scan_cache/', so a rescan only
+# parses new or changed files (mtime/size) and an interrupted scan resumes where it stopped.
+
+import os
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from watcher_engine.actions_lib import image_meta
+from watcher_engine.actions_lib import provenance
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(ROOT_DIR, ".scan_cache")
+IMAGE_EXTS = (".png", ".webp", ".jpg", ".jpeg", ".avif")
+CHUNK = 256
+COLUMNS = ["file", "prompt", "size", "width", "height", "mtime", "format", "job_id", "account"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY,
+    prompt TEXT,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    mtime REAL NOT NULL,
+    format TEXT,
+    job_id TEXT,
+    account TEXT,
+    error TEXT
+);
+"""
+
+def _db_path(root):
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(root)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"scan_{key}.db")
+
+def connect(root):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(_db_path(root), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _walk(root, recursive):
+    """Yield (relpath, size, mtime) of image files; directories starting with '.' are skipped."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith("."): continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive: stack.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTS):
+                        st = entry.stat()
+                        if st.st_size:
+                            yield os.path.relpath(entry.path, root), st.st_size, st.st_mtime
+        except OSError:
+            continue
+
+def scan_one(root, rel, size, mtime):
+    """Worker: header-only metadata of one file as a row tuple in SCHEMA order."""
+    try:
+        meta = image_meta.parse_file(os.path.join(root, rel))
+        info, exif = meta["info"], meta["exif"]
+        record = provenance.read_record(info) or {}
+        prompt = info.get("Prompt") or provenance.decode_exif_text(exif.get(0x010E)) or record.get("prompt")
+        return (rel, prompt, size, meta["width"], meta["height"], mtime, meta["format"],
+                record.get("job_id"), record.get("account"), None)
+    except Exception as e:
+        return (rel, None, size, None, None, mtime, None, None, None, str(e))
+
+def _scan_chunk(root, items):
+    return [scan_one(root, *item) for item in items]
+
+def scan(root, recursive=True, workers=None, force=False):
+    """
+    Generator of progress tuples (done, total, rows_in_batch) while the tree is scanned.
+    Unchanged files (same size and mtime as cached) are not parsed again; deleted files are dropped.
+    """
+    conn = connect(root)
+    try:
+        known = {f: (s, m) for f, s, m in conn.execute("SELECT file, size, mtime FROM files")}
+        todo, seen = [], set()
+        for rel, size, mtime in _walk(root, recursive):
+            seen.add(rel)
+            if force or known.get(rel) != (size, mtime):
+                todo.append((rel, size, mtime))
+        gone = [(f,) for f in known if f not in seen]
+        if gone:
+            with conn:
+                conn.executemany("DELETE FROM files WHERE file = ?", gone)
+
+        total, done = len(todo), 0
+        yield done, total, []
+        if not todo: return
+        chunks = [todo[i:i + CHUNK] for i in range(0, total, CHUNK)]
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(_scan_chunk, root, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                rows = future.result()
+                with conn:
+                    conn.executemany(f"INSERT OR REPLACE INTO files VALUES ({', '.join('?' * 10)})", rows)
+                done += len(rows)
+                yield done, total, rows
+        finally:
+            # An abandoned scan (UI rerun) drops its queued chunks; committed batches are kept for the resume.
+            pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        conn.close()
+
+def results(root, search="", limit=None):
+    """Cached scan results as a list of dicts (newest first), optionally filtered by file/prompt text."""
+    conn = connect(root)
+    conn.row_factory = sqlite3.Row
+    try:
+        sql = f"SELECT {', '.join(COLUMNS)} FROM files"
+        args = []
+        if search:
+            sql += " WHERE file LIKE ? OR prompt LIKE ?"
+            args = [f"%{search}%"] * 2
+        sql += " ORDER BY mtime DESC"
+        if limit: sql += f" LIMIT {int(limit)}"
+        return [dict(r) for r in conn.execute(sql, args)]
+    finally:
+        conn.close()
+
+def last_scan_info(root):
+    """(file count, newest mtime) of the cache for display."""
+    conn = connect(root)
+    try:
+        return conn.execute("SELECT COUNT(*), MAX(mtime) FROM files").fetchone()
+    finally:
+        conn.close()
@@ -0,0 +1,140 @@
+# watcher_engine/actions_lib/log_tail.py
+# Version: V1.1.0
+# Description: Incremental reader for engine.log. Remembers the byte offset, inode and a fingerprint of
+# the first bytes, reads only appended data, and restarts from 0 when the file is truncated, replaced
+# or rotated. Only complete lines are consumed.
+# Also: read_last_lines() (backward seek from EOF, optional filter) and the engine's rotating handler
+# (size-based, archives gzip-compressed as engine.log.N.gz).
+
+import os
+import gzip
+import shutil
+import logging.handlers
+
+HEAD_BYTES = 64
+
+class LogTailer:
+    def __init__(self, path, offset=0, ino=None):
+        self.path = path
+        self.offset = offset
+        self.ino = ino
+        self.head = None
+        self.last_line = ""
+
+    @classmethod
+    def at_end(cls, path):
+        """A tailer that starts at the current end of the file (only lines written from now on)."""
+        try:
+            st = os.stat(path)
+            return cls(path, st.st_size, st.st_ino)
+        except OSError:
+            return cls(path)
+
+    def _read_head(self, f):
+        f.seek(0)
+        return f.read(HEAD_BYTES)
+
+    def read_new_lines(self):
+        """Return the complete lines appended since the last call (decoded, without line endings)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.offset, self.ino, self.head = 0, None, None
+            return []
+
+        if (self.ino is not None and st.st_ino != self.ino) or st.st_size < self.offset:
+            self.offset, self.head = 0, None
+        self.ino = st.st_ino
+        if st.st_size == self.offset and self.head is not None:
+            return []
+
+        try:
+            with open(self.path, "rb") as f:
+                head = self._read_head(f)
+                # Same size class but different first bytes: the file was recreated and regrown.
+                n = min(len(head), len(self.head or b""))
+                if self.head is not None and self.offset > 0 and head[:n] != self.head[:n]:
+                    self.offset = 0
+                self.head = head
+                f.seek(self.offset)
+                data = f.read(max(0, st.st_size - self.offset))
+        except OSError:
+            return []
+
+        end = data.rfind(b"\n")
+        if end < 0: return []
+        self.offset += end + 1
+
+        lines = [l.decode("utf-8", errors="ignore").rstrip("\r") for l in data[:end].split(b"\n")]
+        for line in reversed(lines):
+            if line.strip():
+                self.last_line = line.strip()
+                break
+        return lines
+
+    def prime_last_line(self, window=4096):
+        """Fill last_line from the end of the file without reading it all (for a fresh UI session)."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - window))
+                tail = f.read().decode("utf-8", errors="ignore").splitlines()
+        except OSError:
+            return ""
+        for line in reversed(tail):
+            if line.strip():
+                self.last_line = line.strip()
+                break
+        return self.last_line
+
+def read_last_lines(path, n=25, predicate=None, block_size=8192, max_bytes=8 * 1024 * 1024):
+    """
+    Last n lines of a file (oldest first) by reading fixed-size blocks backwards from EOF.
+    With a predicate only matching lines count; the scan stops after max_bytes so a rare keyword
+    cannot turn the viewer into a full read of a huge file.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return []
+    with f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        found, carry, scanned = [], b"", 0
+        while pos > 0 and len(found) < n and scanned < max_bytes:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + carry
+            scanned += step
+            parts = chunk.split(b"\n")
+            # The first part may be the tail of a line that continues in the previous block; at the start
+            # of the file it is the first line and is handled with the others.
+            carry = parts.pop(0) if pos > 0 else b""
+            for raw in reversed(parts):
+                line = raw.decode("utf-8", errors="ignore").rstrip("\r")
+                if not line.strip(): continue
+                if predicate is None or predicate(line):
+                    found.append(line)
+                    if len(found) >= n: break
+    return list(reversed(found))
+
+def _gz_namer(name):
+    return f"{name}.gz"
+
+def _gz_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def rotating_handler(path, max_bytes=5 * 1024 * 1024, backups=10):
+    """
+    Append-mode handler that rolls over at max_bytes and keeps 'backups' gzip archives.
+    The file is opened on the first record, so importing the engine does not create it.
+    """
+    handler = logging.handlers.RotatingFileHandler(path, mode="a", maxBytes=max_bytes, backupCount=backups,
+                                                   encoding="utf-8", delay=True)
+    handler.namer = _gz_namer
+    handler.rotator = _gz_rotator
+    return handler
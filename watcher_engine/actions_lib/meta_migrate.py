@@ -0,0 +1,230 @@
+# watcher_engine/actions_lib/meta_migrate.py
+# Version: V1.0.0
+# Description: Lossless metadata migration between image files (used by the Meta Data Migrator page).
+# Metadata is read header-only and written into the target's container without touching pixel data:
+# PNG targets get their text chunks spliced in after IHDR, JPEG / WebP targets get a new EXIF block via
+# piexif.insert. Batch jobs pair files by name or manifest and run on a thread pool (the work is I/O-bound),
+# writing into a folder or a zip archive.
+# Metadata keys use the page's format: "PNG:<text key>" or "<ifd>:<EXIF tag name>" (ifd = 0th / Exif).
+
+import os
+import io
+import csv
+import zlib
+import struct
+import zipfile
+import piexif
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from watcher_engine.actions_lib import image_meta
+
+EXIF_IFDS = ("0th", "Exif")
+# Tag name -> id / id -> (name, type), built once instead of a linear search per key.
+TAG_IDS = {ifd: {info["name"]: tag for tag, info in piexif.TAGS[ifd].items()} for ifd in EXIF_IFDS}
+TAG_INFO = {ifd: {tag: (info["name"], info["type"]) for tag, info in piexif.TAGS[ifd].items()} for ifd in EXIF_IFDS}
+TEXT_TYPES = (piexif.TYPES.Ascii, piexif.TYPES.Undefined)
+INT_TYPES = (piexif.TYPES.Byte, piexif.TYPES.Short, piexif.TYPES.Long, piexif.TYPES.SShort, piexif.TYPES.SLong)
+# The engine stores the prompt as PNG 'Prompt' or EXIF ImageDescription (image_encoders); map across formats.
+PROMPT_KEYS = ("PNG:Prompt", "0th:ImageDescription")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_TEXT_CHUNKS = (b"tEXt", b"zTXt", b"iTXt")
+SOURCE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+TARGET_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+def file_type(name):
+    ext = os.path.splitext(name)[1].lower().lstrip(".")
+    return "jpeg" if ext == "jpg" else ext
+
+def read_metadata(data, ftype):
+    """Editable metadata of a source file as {key: str}; pixel data is never decoded."""
+    metadata = {}
+    if ftype in ("jpeg", "webp"):
+        try:
+            exif_dict = piexif.load(data)
+        except Exception:
+            return metadata
+        for ifd in EXIF_IFDS:
+            for tag, value in exif_dict[ifd].items():
+                name = TAG_INFO[ifd].get(tag, (None,))[0]
+                if name is None: continue
+                if isinstance(value, bytes):
+                    try:
+                        value = value.decode("utf-8").rstrip("\x00")
+                    except UnicodeDecodeError:
+                        continue
+                metadata[f"{ifd}:{name}"] = str(value)
+    elif ftype == "png":
+        for key, value in image_meta.parse(data)["info"].items():
+            if isinstance(value, (str, int)):
+                metadata[f"PNG:{key}"] = str(value)
+    return metadata
+
+def _for_target(metadata, ftype):
+    """Keep the keys the target container can hold and carry the prompt across PNG <-> EXIF."""
+    metadata = dict(metadata)
+    for src_key, dst_key in (PROMPT_KEYS, PROMPT_KEYS[::-1]):
+        if src_key in metadata and dst_key not in metadata:
+            metadata[dst_key] = metadata[src_key]
+    if ftype == "png":
+        # EXIF-only fields travel as text chunks named after the tag, as in the single-file mode.
+        out = {}
+        for key, value in metadata.items():
+            ifd, _, name = key.partition(":")
+            if ifd == "PNG" or (ifd in EXIF_IFDS and key != PROMPT_KEYS[1]):
+                out.setdefault(name, value)
+        return out
+    return {k: v for k, v in metadata.items() if k.partition(":")[0] in EXIF_IFDS}
+
+def _chunk(ctype, body):
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body) & 0xFFFFFFFF)
+
+def _text_chunk(key, value):
+    keyword = key.encode("latin-1", errors="replace")[:79]
+    try:
+        return _chunk(b"tEXt", keyword + b"\x00" + value.encode("latin-1"))
+    except UnicodeEncodeError:
+        # Non-Latin-1 text (e.g. CJK prompts) needs iTXt, which is UTF-8.
+        return _chunk(b"iTXt", keyword + b"\x00\x00\x00\x00\x00" + value.encode("utf-8"))
+
+def inject_png(data, texts):
+    """Splice text chunks into PNG bytes after IHDR, replacing same-keyword chunks; IDAT is copied as-is."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Target is not a PNG file")
+    keywords = {k.encode("latin-1", errors="replace")[:79] for k in texts}
+    new_chunks = b"".join(_text_chunk(k, str(v)) for k, v in texts.items())
+    out, pos = [PNG_SIGNATURE], len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if ctype in PNG_TEXT_CHUNKS and data[pos + 8:end - 4].split(b"\x00", 1)[0] in keywords:
+            pos = end
+            continue
+        out.append(data[pos:end])
+        if ctype == b"IHDR":
+            out.append(new_chunks)
+        pos = end
+        if ctype == b"IEND": break
+    return b"".join(out)
+
+def _exif_value(ifd, tag, text):
+    kind = TAG_INFO[ifd][tag][1]
+    if kind in TEXT_TYPES:
+        return text.encode("utf-8")
+    value = text.strip()
+    if kind in INT_TYPES:
+        return int(value) if value.lstrip("-").isdigit() else tuple(int(v) for v in value.strip("()").split(",") if v.strip())
+    # Rationals are shown as "(num, den)" or "((num, den), ...)"; rebuild the nested int tuples.
+    nums = [int(v) for v in value.replace("(", " ").replace(")", " ").replace(",", " ").split()]
+    pairs = tuple(zip(nums[0::2], nums[1::2]))
+    return pairs[0] if len(pairs) == 1 else pairs
+
+def build_exif(metadata, base=None):
+    """EXIF bytes from {"<ifd>:<tag name>": text}, merged over the target's own EXIF dict if given."""
+    exif = base or {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}}
+    exif.pop("thumbnail", None)
+    exif["1st"] = {}
+    for key, text in metadata.items():
+        ifd, _, name = key.partition(":")
+        tag = TAG_IDS.get(ifd, {}).get(name)
+        if tag is None: continue
+        try:
+            exif[ifd][tag] = _exif_value(ifd, tag, text)
+        except ValueError:
+            continue
+    return piexif.dump(exif)
+
+def inject_exif(data, metadata):
+    """Insert a new EXIF block into JPEG / WebP bytes; the compressed image data is left untouched."""
+    try:
+        base = piexif.load(data)
+    except Exception:
+        base = None
+    try:
+        exif_bytes = build_exif(metadata, base)
+    except Exception:
+        exif_bytes = build_exif(metadata)  # target EXIF piexif cannot re-dump: start from a clean block
+    out = io.BytesIO()
+    piexif.insert(exif_bytes, data, out)
+    return out.getvalue()
+
+def inject(data, ftype, metadata):
+    """Return the target bytes carrying 'metadata' (page key format), without re-encoding."""
+    shaped = _for_target(metadata, ftype)
+    if ftype == "png":
+        return inject_png(data, shaped)
+    if ftype in ("jpeg", "webp"):
+        return inject_exif(data, shaped)
+    raise ValueError(f"Unsupported target type: {ftype}")
+
+def migrate_file(src_path, dst_path):
+    """Metadata of src_path applied to dst_path; returns the new target bytes."""
+    with open(src_path, "rb") as f:
+        metadata = read_metadata(f.read(), file_type(src_path))
+    with open(dst_path, "rb") as f:
+        return inject(f.read(), file_type(dst_path), metadata)
+
+def _list(folder, exts):
+    with os.scandir(folder) as it:
+        return {e.name: e.path for e in it if e.is_file() and e.name.lower().endswith(exts)}
+
+def pair_by_name(src_dir, dst_dir):
+    """(source, target) path pairs whose file names match, ignoring the extension (a.png -> a.jpg)."""
+    sources = {os.path.splitext(n)[0].lower(): p for n, p in _list(src_dir, SOURCE_EXTS).items()}
+    pairs = []
+    for name, path in sorted(_list(dst_dir, TARGET_EXTS).items()):
+        src = sources.get(os.path.splitext(name)[0].lower())
+        if src: pairs.append((src, path))
+    return pairs
+
+def pair_from_manifest(manifest_text, src_dir, dst_dir):
+    """(source, target) pairs from CSV rows 'source,target'; relative names resolve against the folders."""
+    pairs = []
+    for row in csv.reader(io.StringIO(manifest_text)):
+        if len(row) < 2 or not row[0].strip() or row[0].strip().lower() == "source": continue
+        pairs.append((os.path.join(src_dir, row[0].strip()), os.path.join(dst_dir, row[1].strip())))
+    return pairs
+
+def migrate_batch(pairs, out_dir=None, zip_path=None, workers=8):
+    """
+    Migrate every (source, target) pair on a thread pool, writing results under out_dir or into zip_path
+    (stored, since the images are already compressed). Generator of (done, total, errors) progress tuples;
+    errors is a list of (target, message). Outputs are named by the target's basename: a pair whose name is
+    already taken by an earlier pair is reported in errors and skipped instead of overwriting it.
+    """
+    total, done, errors = len(pairs), 0, []
+    unique, seen = [], {}
+    for src, dst in pairs:
+        name = os.path.basename(dst)
+        if name.lower() in seen:
+            done += 1
+            errors.append((name, f"output name already used by {seen[name.lower()]}"))
+            continue
+        seen[name.lower()] = dst
+        unique.append((src, dst))
+    archive = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) if zip_path else None
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+
+    def work(src, dst):
+        data = migrate_file(src, dst)
+        if archive is None:
+            with open(os.path.join(out_dir, os.path.basename(dst)), "wb") as f:
+                f.write(data)
+            return dst, None
+        return dst, data
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(work, src, dst): dst for src, dst in unique}
+        yield done, total, errors
+        for future in as_completed(futures):
+            done += 1
+            try:
+                dst, data = future.result()
+                if data is not None:
+                    archive.writestr(os.path.basename(dst), data)
+            except Exception as e:
+                errors.append((os.path.basename(futures[future]), str(e)))
+            yield done, total, errors
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if archive: archive.close()
@@ -0,0 +1,63 @@
+# watcher_engine/actions_lib/name_allocator.py
+# Version: V1.0.0
+# Description: Per-directory, per-prefix output filename allocator.
+# The next index is kept in '<save_dir>/.gemi_names.json' (not config.json) and handed out
+# under a FileLock; the chosen name is reserved with an O_EXCL create so concurrent
+# workers can never write to the same file.
+
+import os
+import json
+
+from watcher_engine.actions_lib.file_lock import FileLock, write_json_atomic
+
+COUNTER_NAME = ".gemi_names.json"
+
+def _load_counters(counter_path):
+    if not os.path.exists(counter_path): return {}
+    try:
+        with open(counter_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+def allocate(save_dir, prefix, padding, start_idx=1, ext="png"):
+    """
+    Reserve the next free '<prefix><index>.<ext>' in save_dir and return (save_name, final_path).
+    'start_idx' is the user's 'Start No.': when it changes, the counter restarts from it.
+    The reserved file exists (empty) on return and is meant to be overwritten by the caller.
+    """
+    target_dir = save_dir or "."
+    os.makedirs(target_dir, exist_ok=True)
+    counter_path = os.path.join(target_dir, COUNTER_NAME)
+
+    with FileLock(counter_path):
+        counters = _load_counters(counter_path)
+        entry = counters.get(prefix, {})
+        if entry.get("base") != start_idx:
+            entry = {"base": start_idx, "next": start_idx}
+        idx = entry["next"]
+
+        # Only existing files left over from before the counter (or written by hand) are skipped.
+        while True:
+            save_name = f"{prefix}{str(idx).zfill(padding)}.{ext}"
+            final_path = os.path.join(save_dir, save_name)
+            try:
+                os.close(os.open(final_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                idx += 1
+
+        entry["next"] = idx + 1
+        counters[prefix] = entry
+        write_json_atomic(counter_path, counters)
+
+    return save_name, final_path
+
+def release(final_path):
+    """Drop a reservation that was never written (e.g. the download failed)."""
+    try:
+        if os.path.exists(final_path) and os.path.getsize(final_path) == 0:
+            os.remove(final_path)
+    except OSError:
+        pass
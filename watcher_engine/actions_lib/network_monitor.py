@@ -0,0 +1,128 @@
+# watcher_engine/actions_lib/network_monitor.py
+# Version: V1.0.0
+# Description: Optional network-level generation status detector ("network_detection": true in config).
+# Listens to page.on("response") for Gemini's streaming generate endpoint and classifies the finished
+# payload (success / refused / quota_exceeded) before the UI renders it. The DOM check in
+# browser_crtl_logic stays in place as the fallback.
+# Only the model's reply is classified: the stream also carries the echoed prompt and conversation metadata,
+# which must not trip the refusal keywords. Streams sent before the last arm() are ignored.
+
+import json
+import time
+import asyncio
+import weakref
+
+STREAM_MARKERS = ("StreamGenerate", "BardFrontendService")
+IMAGE_MARKERS = ("image_generation_content", "googleusercontent.com/gg-dl/", "googleusercontent.com/gg/")
+
+# One monitor per page; the entry goes away with the page object.
+_monitors = weakref.WeakKeyDictionary()
+
+def _payloads(body):
+    """Inner JSON payloads of the stream's '["wrb.fr", null, "<json>"]' envelopes, in order."""
+    for line in body.splitlines():
+        line = line.strip()
+        if not line.startswith("["): continue
+        try:
+            envelopes = json.loads(line)
+        except ValueError:
+            continue
+        for env in envelopes if isinstance(envelopes, list) else []:
+            if isinstance(env, list) and len(env) > 2 and env[0] == "wrb.fr" and isinstance(env[2], str):
+                try:
+                    yield json.loads(env[2])
+                except ValueError:
+                    pass
+
+def model_response(body):
+    """
+    (text, candidates_json) of the last chunk that carries response candidates (payload[4]):
+    the reply text of each candidate, and the candidates serialised for the image markers.
+    (None, None) when the body holds no candidates.
+    """
+    candidates = None
+    for payload in _payloads(body):
+        if isinstance(payload, list) and len(payload) > 4 and isinstance(payload[4], list) and payload[4]:
+            candidates = payload[4]
+    if candidates is None:
+        return None, None
+    texts = [c[1][0] for c in candidates
+             if isinstance(c, list) and len(c) > 1 and isinstance(c[1], list) and c[1] and isinstance(c[1][0], str)]
+    return "\n".join(texts), json.dumps(candidates, ensure_ascii=False)
+
+def classify(body, declined_kws, quota_kws):
+    """Returns "success", "quota_exceeded", "refused" or None for an unrecognised payload."""
+    text, candidates = model_response(body)
+    if text is None:
+        return None
+    if any(m in candidates for m in IMAGE_MARKERS):
+        return "success"
+    lower = text.lower()
+    if any(kw.lower() in lower for kw in quota_kws):
+        return "quota_exceeded"
+    if any(kw.lower() in lower for kw in declined_kws):
+        return "refused"
+    return None
+
+class GenerationMonitor:
+    def __init__(self, page, logger):
+        self.logger = logger
+        self.declined_kws, self.quota_kws = [], []
+        self.status = None
+        self.armed_at = None
+        self.generation = 0
+        self.known_images = []  # response image srcs present when armed (set by browser_crtl_logic)
+        self.event = asyncio.Event()
+        self._sent = weakref.WeakKeyDictionary()  # stream request -> generation it was sent in
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+
+    def arm(self, declined_kws, quota_kws):
+        """Forget the previous outcome; call right before submitting a prompt or a redo."""
+        self.declined_kws, self.quota_kws = declined_kws, quota_kws
+        self.status = None
+        self.armed_at = time.time()
+        self.generation += 1
+        self.known_images = []
+        self.event.clear()
+
+    def _on_request(self, request):
+        if self.armed_at is not None and any(m in request.url for m in STREAM_MARKERS):
+            self._sent[request] = self.generation
+
+    async def _on_response(self, response):
+        generation = self._sent.get(response.request)
+        if generation != self.generation:
+            return  # not a stream, or sent before the last arm()
+        try:
+            # Resolves when the stream is complete, i.e. when generation has finished server-side.
+            body = await response.text()
+        except Exception:
+            return
+        status = classify(body, self.declined_kws, self.quota_kws)
+        if status and generation == self.generation:
+            self.status = status
+            self.logger.info(f">> [NETWORK] Stream classified as '{status}' after {time.time() - self.armed_at:.1f}s")
+            self.event.set()
+
+    async def wait(self, timeout):
+        """Wait up to 'timeout' seconds for a network verdict; returns the status or None."""
+        if self.status: return self.status
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.status
+
+def arm(page, logger, cfg, declined_kws, quota_kws):
+    """
+    Attach (once per page) and arm the monitor. Returns None when network_detection is disabled.
+    """
+    if not cfg.get("network_detection", False):
+        return None
+    monitor = _monitors.get(page)
+    if monitor is None:
+        monitor = _monitors[page] = GenerationMonitor(page, logger)
+    monitor.logger = logger
+    monitor.arm(declined_kws, quota_kws)
+    return monitor
@@ -0,0 +1,25 @@
+# watcher_engine/actions_lib/profile_engine.py
+# Version: V1.0.0
+# Description: Control task for engine profiling. Starts a profiling window of 'profile_seconds'
+# (config, default 60); sent again while a window is open, it stops it early and writes the artifacts.
+# Returns immediately: the following jobs run inside the window.
+
+import json
+import os
+
+from watcher_engine.actions_lib import engine_profiler
+
+async def run(page, logger, config_path):
+    logger.info("Executing Action: Engine Profiling")
+    try:
+        if engine_profiler.is_active():
+            return engine_profiler.stop() is not None
+
+        duration = 60
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                duration = int(json.load(f).get("profile_seconds", 60))
+        return engine_profiler.start(logger, max(5, duration))
+    except Exception as e:
+        logger.error(f"Action Error (profile_engine): {e}")
+        return False
@@ -0,0 +1,142 @@
+# watcher_engine/actions_lib/provenance.py
+# Version: V1.0.0
+# Description: Structured provenance record embedded in every saved image.
+# PNG: compressed iTXt chunk 'Provenance' (JSON) + optional XMP packet (iTXt 'XML:com.adobe.xmp').
+
+import os
+import re
+import json
+import html
+import time
+import uuid
+import hashlib
+
+PROVENANCE_KEY = "Provenance"
+XMP_PNG_KEY = "XML:com.adobe.xmp"
+XMP_NS = "https://github.com/liewcc/GemiPersona/ns/1.0/"
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIGNIN_FILE = os.path.join(ENGINE_DIR, "signin_state.json")
+
+_job = {"id": None, "redo": 0}
+_hash_cache = {}
+
+def start_job():
+    """Called by a fresh generation: new job id, redo number 0."""
+    _job["id"] = uuid.uuid4().hex[:12]
+    _job["redo"] = 0
+    return _job["id"]
+
+def next_redo():
+    """Called by a redo on the current chat: same job id, redo number + 1."""
+    if not _job["id"]:
+        start_job()
+    _job["redo"] += 1
+    return _job["redo"]
+
+def file_sha256(path):
+    """SHA-256 of an attachment, cached by (path, mtime, size)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if key not in _hash_cache:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _hash_cache[key] = h.hexdigest()
+    return _hash_cache[key]
+
+def current_account():
+    """Account name last detected by check_signin ('' when unknown)."""
+    try:
+        with open(SIGNIN_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("user", "")
+    except (OSError, json.JSONDecodeError):
+        return ""
+
+def remember_account(user_name):
+    """Persist the signed-in account name for later provenance records."""
+    try:
+        with open(SIGNIN_FILE, "w", encoding="utf-8") as f:
+            json.dump({"user": user_name, "ts": time.time()}, f, ensure_ascii=False)
+    except OSError:
+        pass
+
+def build_record(cfg, prompt_text, chat_url=""):
+    """Assemble the provenance dict for images produced by the current job."""
+    attachments = []
+    for path in cfg.get("upload_task", []) or []:
+        if path and os.path.exists(path):
+            attachments.append({"name": os.path.basename(path), "sha256": file_sha256(path)})
+    return {
+        "v": 1,
+        "prompt": prompt_text,
+        "gem_url": cfg.get("url", ""),
+        "chat_url": chat_url,
+        "attachments": attachments,
+        "account": current_account(),
+        "job_id": _job["id"] or start_job(),
+        "redo": _job["redo"],
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "engine": cfg.get("engine_version", ""),
+    }
+
+def to_json(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+def to_xmp(record):
+    """Minimal XMP packet: dc:description carries the prompt, gemi:Provenance the JSON record."""
+    return (
+        '<?xpacket begin="\ufeff" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+        '<x:xmpmeta xmlns:x="adobe:ns:meta/">'
+        '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+        f'<rdf:Description rdf:about="" xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:gemi="{XMP_NS}">'
+        '<dc:description><rdf:Alt>'
+        f'<rdf:li xml:lang="x-default">{html.escape(record.get("prompt", ""))}</rdf:li>'
+        '</rdf:Alt></dc:description>'
+        f'<gemi:Provenance>{html.escape(to_json(record))}</gemi:Provenance>'
+        '</rdf:Description></rdf:RDF></x:xmpmeta>'
+        '<?xpacket end="w"?>'
+    )
+
+def add_to_pnginfo(pnginfo, record, with_xmp=False):
+    """Attach the record (and optionally XMP) to a PIL PngInfo."""
+    pnginfo.add_itxt(PROVENANCE_KEY, to_json(record), zip=True)
+    if with_xmp:
+        pnginfo.add_itxt(XMP_PNG_KEY, to_xmp(record))
+
+def decode_exif_text(value):
+    """EXIF ASCII fields are written as UTF-8 but Pillow decodes them as latin-1; undo that."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="ignore").rstrip("\x00")
+    if isinstance(value, str):
+        try:
+            return value.encode("latin-1").decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            return value
+    return value
+
+def read_record(info):
+    """
+    Extract the provenance dict from an image's metadata mapping (PIL img.info or a parsed chunk dict).
+    Looks at the 'Provenance' text chunk first, then any XMP packet. Returns None if absent.
+    """
+    raw = info.get(PROVENANCE_KEY)
+    if raw:
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            pass
+    xmp = info.get(XMP_PNG_KEY) or info.get("xmp")
+    if isinstance(xmp, bytes):
+        xmp = xmp.decode("utf-8", errors="ignore")
+    if xmp:
+        match = re.search(r"<gemi:Provenance>(.*?)</gemi:Provenance>", xmp, re.S)
+        if match:
+            try:
+                return json.loads(html.unescape(match.group(1)))
+            except ValueError:
+                pass
+    return None
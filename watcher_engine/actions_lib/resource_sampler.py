@@ -0,0 +1,82 @@
+# watcher_engine/actions_lib/resource_sampler.py
+# Version: V1.0.0
+# Description: Background resource sampler for the Diagnosis page.
+# Every 'interval' seconds it records CPU%, RSS, handle/fd count and child count for the UI process, the
+# engine and each Chromium process, into a fixed-size ring buffer (deque). Targets come from the engine
+# heartbeat, so sampling never walks the process table. One sampler per UI server (st.cache_resource).
+
+import os
+import time
+import threading
+from collections import deque
+import psutil
+
+from watcher_engine.actions_lib import engine_status
+
+class ResourceSampler:
+    def __init__(self, interval=5, hours=3):
+        self.interval = interval
+        self.samples = deque(maxlen=int(hours * 3600 / interval))
+        self.lock = threading.Lock()
+        self._procs = {}  # pid -> psutil.Process (kept so cpu_percent measures since the previous sample)
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                pass
+            time.sleep(self.interval)
+
+    def _targets(self):
+        targets = {"ui": os.getpid()}
+        status = engine_status.read_status()
+        if status:
+            if status.get("pid"): targets["engine"] = status["pid"]
+            for pid in status.get("browser_pids", []):
+                targets[f"chrome {pid}"] = pid
+        return targets
+
+    def _process(self, pid):
+        proc = self._procs.get(pid)
+        if proc is None or not proc.is_running():
+            proc = psutil.Process(pid)
+            proc.cpu_percent(None)  # first call only primes the counter
+            self._procs[pid] = proc
+        return proc
+
+    def sample(self):
+        now = time.time()
+        rows = []
+        for label, pid in self._targets().items():
+            try:
+                proc = self._process(pid)
+                with proc.oneshot():
+                    handles = proc.num_handles() if os.name == "nt" else proc.num_fds()
+                    rows.append({
+                        "ts": now, "process": label, "pid": pid,
+                        "cpu": proc.cpu_percent(None),
+                        "rss_mb": proc.memory_info().rss / (1024 * 1024),
+                        "handles": handles,
+                        "children": len(proc.children()),
+                    })
+            except psutil.Error:
+                self._procs.pop(pid, None)
+        live = {r["pid"] for r in rows}
+        for pid in [p for p in self._procs if p not in live]:
+            self._procs.pop(pid, None)
+        with self.lock:
+            self.samples.append(rows)
+
+    def rows(self, since=0):
+        """Flat list of per-process rows newer than 'since' (epoch seconds)."""
+        with self.lock:
+            batches = list(self.samples)
+        return [r for batch in batches for r in batch if r["ts"] >= since]
@@ -1,16 +1,20 @@
 # watcher_engine/actions_lib/scrape_gem_info.py
-# Version: V1.2.5
-# Description: Ultra-fast polling scraper for Gemini Gems.
+# Version: V1.3.0
+# Description: Gem info lookup for the Gem at config 'url'; the result lives in gem_cache (read by the pages).
 # Changes: Removed 'networkidle' to prevent hanging; added active polling for Angular content.
+# Changes V1.3.0: Served from gem_cache when fetched within the TTL; otherwise scraped in a throwaway page
+#                 (the chat page is not navigated) with a single in-page wait condition (gem_scraper.extract).
+#                 Fixes the title fallback, which called JS '.trim()' on a Python string.
+#                 No longer writes 'scraped_info.json' (nothing reads it; the pages read gem_cache).
 
-import asyncio
 import json
-import os
+
+from watcher_engine.actions_lib import gem_cache
+from watcher_engine.actions_lib import gem_scraper
 
 async def run(page, logger, config_path):
-    logger.info("🚀 Action: Starting Ultra-fast Gem Scrape (V1.2.5)...")
-    RESULT_FILE = "scraped_info.json"
-    
+    logger.info("🚀 Action: Starting Gem info lookup (V1.3.0)...")
+
     try:
         # 1. READ URL
         with open(config_path, "r", encoding="utf-8") as f:
@@ -20,61 +24,26 @@ async def run(page, logger, config_path):
             logger.error("❌ Target URL missing.")
             return False
 
-        # 2. NAVIGATE (Fast Mode)
-        logger.info(f"🌐 Navigating to: {target_url}")
-        # Use 'domcontentloaded' instead of 'networkidle' to avoid hanging
-        await page.goto(target_url, wait_until="domcontentloaded", timeout=60000)
-
-        # 3. ACTIVE POLLING FOR CONTENT
-        logger.info("⏳ Polling for Gem content...")
-        scraped_data = {"name": "", "description": ""}
-        
-        # Poll for 20 seconds
-        for i in range(40): 
-            scraped_data = await page.evaluate('''() => {
-                const clean = (t) => t ? t.trim().replace(/\\n/g, ' ') : "";
-                
-                // Try to find Name
-                const nameContainer = document.querySelector('.bot-name-container');
-                let name = "";
-                if (nameContainer) {
-                    const temp = nameContainer.cloneNode(true);
-                    const badge = temp.querySelector('bot-experiment-badge, .bot-name-container-animation-box');
-                    if (badge) badge.remove();
-                    name = clean(temp.innerText);
-                }
-
-                // Try to find Description
-                const descContainer = document.querySelector('.bot-description');
-                let description = "";
-                if (descContainer) {
-                    description = clean(descContainer.innerText);
-                }
-
-                return { name, description };
-            }''')
-
-            # If we got at least the name, we can stop early
-            if scraped_data["name"] and scraped_data["name"] != "Gemini":
-                logger.info(f"🎯 Content found at poll {i+1}")
-                break
-            
-            await asyncio.sleep(0.5)
-
-        # 4. FINAL CHECK & FALLBACK
+        # 2. CACHE LOOKUP
+        scraped_data = gem_cache.get(target_url, config_path=config_path)
+        if scraped_data:
+            logger.info("⚡ Gem info served from cache.")
+        else:
+            # 3. SCRAPE in a dedicated page; resolves as soon as the header renders
+            logger.info(f"🌐 Fetching: {target_url}")
+            scraped_data = await gem_scraper.scrape_url(page.context, target_url)
+            if scraped_data["name"]:
+                gem_cache.put(target_url, scraped_data)
+            else:
+                scraped_data = gem_cache.get_any(target_url) or scraped_data
+
+        # 4. FINAL CHECK
         if not scraped_data["name"]:
-            scraped_data["name"] = (await page.title()).replace(" - Gemini", "").trim()
-        
-        if not scraped_data["name"] or scraped_data["name"] == "Gemini":
             scraped_data["name"] = "New Gem (Fetch Failed)"
 
-        # 5. SAVE RESULT
-        with open(RESULT_FILE, "w", encoding="utf-8") as f:
-            json.dump(scraped_data, f, indent=4, ensure_ascii=False)
-            
         logger.info(f"✨ Scrape result: {scraped_data['name']}")
         return True
 
     except Exception as e:
         logger.error(f"❌ Scrape failed with error: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,27 @@
+from watcher_engine.actions_lib import auth_check
+
+NOW = 1_000_000.0
+
+
+def _cookies(names=auth_check.SESSION_COOKIES, expires=NOW + 3600, domain=".google.com"):
+    return [{"name": n, "value": "v", "domain": domain, "expires": expires} for n in names]
+
+
+def test_full_session_is_signed_in():
+    assert auth_check.cookie_verdict(_cookies(), NOW) is True
+    assert auth_check.cookie_verdict(_cookies(expires=-1), NOW) is True  # session cookies
+
+
+def test_missing_or_expired_is_signed_out():
+    assert auth_check.cookie_verdict([], NOW) is False
+    assert auth_check.cookie_verdict(_cookies(domain="example.com"), NOW) is False
+    assert auth_check.cookie_verdict(_cookies(expires=NOW - 1), NOW) is False
+
+
+def test_partial_set_is_inconclusive():
+    assert auth_check.cookie_verdict(_cookies(names=auth_check.SESSION_COOKIES[:2]), NOW) is None
+
+
+def test_longest_lived_duplicate_wins():
+    stale = _cookies(names=["SID"], expires=NOW - 1, domain="accounts.google.com")
+    assert auth_check.cookie_verdict(stale + _cookies(), NOW) is True
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+from watcher_engine.actions_lib import counter_store
+
+
+@pytest.fixture
+def logger(tmp_path, monkeypatch):
+    monkeypatch.setattr(counter_store, "DB_FILE", str(tmp_path / "counters.db"))
+    log = logging.getLogger("test_counter_store")
+    log.setLevel(logging.INFO)
+    handler = counter_store.CounterHandler()
+    log.addHandler(handler)
+    yield log, handler
+    log.removeHandler(handler)
+
+
+def _job(handler, loop):
+    handler.job_id, handler.loop = counter_store.begin_job("upload_test", loop), loop
+    return handler.job_id
+
+
+def test_counts_events_of_the_running_job(logger):
+    log, handler = logger
+    session = counter_store.start_session()
+    _job(handler, loop=True)
+    log.info(">> Saved: img_01.png")
+    log.info(">> Saved: img_02.png")
+    log.error(">> [VARIANT 1/2] Declined to generate.")
+    log.error("[FAIL] [RESET_REQUIRED] Timeout")
+
+    counters = counter_store.current()
+    assert counters["session_id"] == session
+    assert (counters["total_count"], counters["image_save"], counters["image_decline"], counters["fail_count"]) == (1, 2, 1, 1)
+    assert counter_store.session_jobs(session)[0]["saved"] == 2
+
+
+def test_resets_only_count_for_loop_jobs(logger):
+    log, handler = logger
+    counter_store.start_session()
+    _job(handler, loop=False)
+    log.error("[FAIL] [RESET_REQUIRED] Timeout")
+
+    assert counter_store.current()["fail_count"] == 0
+
+
+def test_nothing_counted_outside_a_job(logger):
+    log, handler = logger
+    counter_store.start_session()
+    log.info(">> Saved: img_01.png")
+
+    assert counter_store.current()["image_save"] == 0
+
+
+def test_a_job_reuses_one_connection(logger, monkeypatch):
+    log, handler = logger
+    counter_store.start_session()
+    opened = []
+    real_connect = counter_store.connect
+    monkeypatch.setattr(counter_store, "connect", lambda *a, **kw: opened.append(1) or real_connect(*a, **kw))
+    job_id = _job(handler, loop=True)
+    for i in range(5):
+        log.info(f">> Saved: img_{i:02d}.png")
+    counter_store.end_job(job_id, True)
+    handler.job_id = None
+
+    assert len(opened) == 1
+    assert counter_store.current()["image_save"] == 5
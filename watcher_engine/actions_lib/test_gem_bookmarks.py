@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+import pytest
+
+from watcher_engine.actions_lib import gem_bookmarks, gem_cache, gem_scraper
+
+A = "https://gemini.google.com/gem/a"
+B = "https://gemini.google.com/gem/b"
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(gem_bookmarks, "BOOKMARK_FILE", str(tmp_path / "Gems_bookmark.json"))
+
+
+def test_append_update_delete():
+    gem_bookmarks.append({"name": "A", "url": A, "description": ""})
+    gem_bookmarks.append({"name": "B", "url": B, "description": ""})
+
+    assert gem_bookmarks.update(A, {"name": "A2", "url": A + "?v=2"})
+    assert gem_bookmarks.delete(B)
+
+    assert gem_bookmarks.load() == [{"name": "A2", "url": A + "?v=2", "description": ""}]
+    assert not gem_bookmarks.update(B, {"name": "gone"})
+    assert not gem_bookmarks.delete(B)
+
+
+def test_page_edit_keeps_scraper_results():
+    gem_bookmarks.add_urls([A, B])
+    stale = gem_bookmarks.load()  # what the page rendered
+    gem_bookmarks.apply_results({B: {"name": "Scraped B", "description": "from the engine"}})
+
+    gem_bookmarks.update(stale[0]["url"], {"name": "Edited A"})
+
+    names = {b["url"]: b["name"] for b in gem_bookmarks.load()}
+    assert names == {A: "Edited A", B: "Scraped B"}
+
+
+def test_one_url_fetch_served_during_bulk_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(gem_bookmarks, "FETCH_FILE", str(tmp_path / "fetch.json"))
+    monkeypatch.setattr(gem_bookmarks, "REQUEST_FILE", str(tmp_path / "request.json"))
+    monkeypatch.setattr(gem_bookmarks, "STATUS_FILE", str(tmp_path / "status.json"))
+    monkeypatch.setattr(gem_cache, "CACHE_FILE", str(tmp_path / "cache.json"))
+    monkeypatch.setattr(gem_cache, "ttl_seconds", lambda config_path=None: 3600)
+    monkeypatch.setattr(gem_scraper.config_store, "load", lambda *a: {})
+    monkeypatch.setattr(gem_scraper, "_state", {"task": None, "fetches": set()})
+
+    async def scrape_url(context, url, timeout=None):
+        await asyncio.sleep(30 if url == A else 0)  # A belongs to a long bulk batch
+        return {"name": f"Gem {url[-1]}", "description": ""}
+    monkeypatch.setattr(gem_scraper, "scrape_url", scrape_url)
+
+    async def scenario():
+        gem_bookmarks.request_scrape([A])
+        loop = asyncio.create_task(gem_scraper.request_loop(lambda: object(), logging.getLogger("test"), interval=0.01))
+        for _ in range(200):
+            if gem_scraper.is_running(): break
+            await asyncio.sleep(0.01)
+        requested = gem_bookmarks.request_fetch(B)
+        for _ in range(200):
+            if gem_bookmarks.fetch_finished(B, requested): break
+            await asyncio.sleep(0.01)
+        loop.cancel()
+        await asyncio.gather(loop, return_exceptions=True)
+        return requested
+
+    requested = asyncio.run(scenario())
+    assert gem_bookmarks.fetch_finished(B, requested)
+    assert gem_cache.get(B, newer_than=requested)["name"] == "Gem b"
+    assert gem_scraper._state["task"].cancelled()
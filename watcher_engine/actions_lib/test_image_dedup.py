@@ -0,0 +1,99 @@
+import os
+import logging
+import threading
+
+import pytest
+from PIL import Image, ImageDraw
+
+from watcher_engine.actions_lib import image_dedup, image_ingest, library_index
+
+LOG = logging.getLogger("test_image_dedup")
+
+
+@pytest.fixture
+def save_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_dedup, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(library_index, "CACHE_DIR", str(tmp_path / "cache"))
+    out = tmp_path / "out"
+    out.mkdir()
+    return str(out)
+
+
+def _image(path, shade=0):
+    img = Image.new("RGB", (64, 64), "white")
+    ImageDraw.Draw(img).rectangle((8, 8, 40 + shade, 40), fill="black")
+    img.save(path)
+    return str(path)
+
+
+def test_hamming():
+    assert image_dedup.hamming("0000000000000000", "0000000000000000") == 0
+    assert image_dedup.hamming("000000000000000f", "0000000000000000") == 4
+    assert image_dedup.hamming("ffffffffffffffff", "0000000000000000") == 64
+
+
+def test_lookup_ignores_deleted_files(save_dir):
+    with image_dedup.claim(save_dir) as index:
+        index.record("gone.png", "sha1", "0000000000000000")
+        index.record("kept.png", "sha1", "0000000000000001")
+    open(os.path.join(save_dir, "kept.png"), "wb").close()
+    with image_dedup.claim(save_dir) as index:
+        assert index.lookup("sha1", "0000000000000000", 6) == ("kept.png", "kept.png")
+        assert index.lookup("sha2", "ffffffffffffffff", 6) == (None, None)
+        assert index.lookup("sha2", "0000000000000000", 0) == (None, None)
+
+
+def test_lookup_prefers_closest_near_duplicate(save_dir):
+    with image_dedup.claim(save_dir) as index:
+        index.record("far.png", "a", "000000000000000f")
+        index.record("close.png", "b", "0000000000000001")
+    for name in ("far.png", "close.png"):
+        open(os.path.join(save_dir, name), "wb").close()
+    with image_dedup.claim(save_dir) as index:
+        assert index.lookup("c", "0000000000000000", 6) == (None, "close.png")
+
+
+def test_lookup_finds_near_duplicates_through_any_band(save_dir):
+    # Six flipped bits spread over six bands: only the two untouched bands still match.
+    near = f"{int('0000000000000000', 16) ^ 0x0101010101010000:016x}"
+    with image_dedup.claim(save_dir) as index:
+        index.record("near.png", "a", near)
+        index.record("other.png", "b", "ffffffffffffffff")
+    for name in ("near.png", "other.png"):
+        open(os.path.join(save_dir, name), "wb").close()
+    with image_dedup.claim(save_dir) as index:
+        assert index.lookup("c", "0000000000000000", 6) == (None, "near.png")
+        assert index.lookup("c", "0000000000000000", 5) == (None, None)
+        # Past the pigeonhole bound every row is compared.
+        assert index.lookup("c", "00000000000000ff", 64) == (None, "near.png")
+
+
+def test_concurrent_ingest_saves_one_copy(save_dir, tmp_path):
+    cfg = {"save_dir": save_dir, "name_prefix": "img_", "dedup_mode": "skip", "output_format": "png"}
+    sources = [_image(tmp_path / f"dl{i}.png") for i in range(4)]
+    results = []
+    threads = [threading.Thread(target=lambda p=p: results.append(image_ingest.ingest_download(p, cfg, "x", LOG)))
+               for p in sources]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sorted(results, key=str) == [None, None, None, "img_01.png"]
+    assert [n for n in os.listdir(save_dir) if n.endswith(".png")] == ["img_01.png"]
+
+
+def test_failed_encode_releases_claim(save_dir, tmp_path, monkeypatch):
+    cfg = {"save_dir": save_dir, "name_prefix": "img_", "dedup_mode": "skip", "output_format": "png"}
+    src = _image(tmp_path / "dl.png")
+
+    def broken(pil_img, path, *args, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG truncated")
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(image_ingest.enc, "encode", broken)
+        with pytest.raises(OSError):
+            image_ingest.ingest_download(src, cfg, "x", LOG)
+    assert [n for n in os.listdir(save_dir) if not n.startswith(".gemi_names")] == []
+    # The failed image is not remembered as a duplicate of its own empty reservation.
+    assert image_ingest.ingest_download(src, cfg, "x", LOG) is not None
+    assert [n for n in os.listdir(save_dir) if n.endswith(".png")] == ["img_02.png"]
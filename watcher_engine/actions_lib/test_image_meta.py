@@ -0,0 +1,41 @@
+import io
+
+import pytest
+from PIL import Image
+
+from watcher_engine.actions_lib import image_encoders, image_meta, provenance
+
+PROMPT = "a lighthouse at dusk, 灯塔"
+RECORD = {"prompt": PROMPT, "job_id": "job-1", "model": "test"}
+
+
+def _prompt(meta):
+    return meta["info"].get("Prompt") or provenance.decode_exif_text(meta["exif"].get(0x010E))
+
+
+@pytest.mark.parametrize("fmt", sorted(image_encoders.FORMATS))
+def test_parse_encoded_output(tmp_path, fmt):
+    path = str(tmp_path / f"out.{image_encoders.extension(fmt)}")
+    image_encoders.encode(Image.new("RGB", (300, 200), "navy"), path, fmt, PROMPT, RECORD, quality=80)
+
+    meta = image_meta.parse_file(path)
+
+    assert meta["format"] == fmt.upper()
+    assert (meta["width"], meta["height"]) == (300, 200)
+    assert _prompt(meta) == PROMPT
+    assert provenance.read_record(meta["info"])["job_id"] == "job-1"
+
+
+def test_parse_avif_without_metadata():
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 24), "red").save(buf, "AVIF")
+
+    meta = image_meta.parse(buf.getvalue())
+
+    assert meta["format"] == "AVIF"
+    assert (meta["width"], meta["height"]) == (40, 24)
+    assert meta["exif"] == {} and "xmp" not in meta["info"]
+
+
+def test_parse_unknown_format():
+    assert image_meta.parse(b"GIF89a" + b"\x00" * 32)["format"] is None
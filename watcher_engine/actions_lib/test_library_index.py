@@ -0,0 +1,47 @@
+import os
+import time
+
+from PIL import Image
+
+from watcher_engine.actions_lib import library_index
+
+
+def _library(tmp_path, monkeypatch, names=("a.png", "b.png")):
+    monkeypatch.setattr(library_index, "CACHE_DIR", str(tmp_path / "cache"))
+    save_dir = tmp_path / "out"
+    save_dir.mkdir()
+    for name in names:
+        Image.new("RGB", (8, 8), "red").save(save_dir / name)
+    old = time.time() - 60
+    os.utime(save_dir, (old, old))
+    return str(save_dir)
+
+
+def test_idle_sync_does_not_scan(tmp_path, monkeypatch):
+    save_dir = _library(tmp_path, monkeypatch)
+    assert library_index.sync(save_dir) == 2
+
+    calls = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(library_index.os, "scandir", lambda p: calls.append(p) or real_scandir(p))
+    for _ in range(5):
+        assert library_index.sync(save_dir) == 0
+    assert calls == []
+    assert sorted(os.listdir(save_dir)) == ["a.png", "b.png"]
+
+
+def test_sync_picks_up_changes(tmp_path, monkeypatch):
+    save_dir = _library(tmp_path, monkeypatch)
+    library_index.sync(save_dir)
+    os.remove(os.path.join(save_dir, "a.png"))
+    assert library_index.sync(save_dir) == 1
+    assert [r["name"] for r in library_index.page(save_dir)] == ["b.png"]
+
+
+def test_fts_query():
+    assert library_index.fts_query("red light") == '"red" AND "light"*'
+    assert library_index.fts_query('"red light" house') == '"red light" AND "house"*'
+    assert library_index.fts_query('house "red light"') == '"house" AND "red light"'
+    assert library_index.fts_query('say "hi') == '"say" AND "hi"*'  # unclosed quote still searches
+    assert library_index.fts_query('a"b') == '"a" AND "b"*'
+    assert library_index.fts_query('  ""  ') == ""
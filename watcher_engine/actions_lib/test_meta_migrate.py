@@ -0,0 +1,99 @@
+import io
+import struct
+import zipfile
+
+import piexif
+import pytest
+from PIL import Image, PngImagePlugin
+
+from watcher_engine.actions_lib import image_meta, meta_migrate
+
+
+def _png(**texts):
+    info = PngImagePlugin.PngInfo()
+    for k, v in texts.items():
+        info.add_text(k, v)
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 8), "green").save(buf, "PNG", pnginfo=info)
+    return buf.getvalue()
+
+
+def _chunks(data):
+    pos, out = len(meta_migrate.PNG_SIGNATURE), []
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        out.append((ctype, data[pos + 8:pos + 8 + length]))
+        pos += 12 + length
+    return out
+
+
+def test_inject_png_replaces_keyword_and_keeps_pixels():
+    data = _png(Prompt="old prompt", Other="kept")
+
+    out = meta_migrate.inject_png(data, {"Prompt": "a lighthouse, 灯塔", "Seed": "42"})
+
+    info = image_meta.parse(out)["info"]
+    assert info["Prompt"] == "a lighthouse, 灯塔"
+    assert (info["Seed"], info["Other"]) == ("42", "kept")
+    assert [c[0] for c in _chunks(out)].count(b"iTXt") == 1  # CJK text needs iTXt
+    assert [c for c in _chunks(out) if c[0] == b"IDAT"] == [c for c in _chunks(data) if c[0] == b"IDAT"]
+    assert Image.open(io.BytesIO(out)).size == (16, 8)
+
+
+def test_inject_png_rejects_other_formats():
+    with pytest.raises(ValueError):
+        meta_migrate.inject_png(b"\xff\xd8\xff\xe0", {"Prompt": "x"})
+
+
+def test_build_exif_converts_typed_values():
+    exif = piexif.load(meta_migrate.build_exif({
+        "0th:ImageDescription": "描述 text",
+        "0th:Orientation": "6",
+        "0th:XResolution": "(300, 1)",
+        "Exif:ISOSpeedRatings": "100",
+        "0th:NoSuchTag": "ignored",
+        "GPS:GPSLatitudeRef": "N",  # only 0th / Exif are migrated
+    }))
+
+    assert exif["0th"][piexif.ImageIFD.ImageDescription].decode("utf-8") == "描述 text"
+    assert exif["0th"][piexif.ImageIFD.Orientation] == 6
+    assert exif["0th"][piexif.ImageIFD.XResolution] == (300, 1)
+    assert exif["Exif"][piexif.ExifIFD.ISOSpeedRatings] == 100
+    assert exif["GPS"] == {}
+
+
+def test_build_exif_merges_over_base_and_skips_bad_values():
+    base = {"0th": {piexif.ImageIFD.Make: b"Camera"}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": b"x"}
+
+    exif = piexif.load(meta_migrate.build_exif({"0th:Orientation": "not a number"}, base))
+
+    assert exif["0th"][piexif.ImageIFD.Make] == b"Camera"
+    assert piexif.ImageIFD.Orientation not in exif["0th"]
+    assert not exif.get("thumbnail")
+
+
+def test_prompt_carries_from_png_to_jpeg():
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 8), "blue").save(buf, "JPEG")
+    metadata = meta_migrate.read_metadata(_png(Prompt="a red door"), "png")
+
+    out = meta_migrate.inject(buf.getvalue(), "jpeg", metadata)
+
+    assert image_meta.parse(out)["exif"][0x010E] in ("a red door", b"a red door")
+
+
+def test_migrate_batch_reports_basename_collisions(tmp_path):
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        (tmp_path / sub / "img.png").write_bytes(_png())
+    src = tmp_path / "src.png"
+    src.write_bytes(_png(Prompt="moved"))
+    pairs = [(str(src), str(tmp_path / "a" / "img.png")), (str(src), str(tmp_path / "b" / "img.png"))]
+
+    for done, total, errors in meta_migrate.migrate_batch(pairs, zip_path=str(tmp_path / "out.zip")):
+        pass
+
+    assert (done, total) == (2, 2)
+    assert [(name, msg.startswith("output name already used")) for name, msg in errors] == [("img.png", True)]
+    with zipfile.ZipFile(tmp_path / "out.zip") as archive:
+        assert archive.namelist() == ["img.png"]
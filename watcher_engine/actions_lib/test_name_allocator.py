@@ -0,0 +1,55 @@
+import os
+import threading
+
+from watcher_engine.actions_lib import name_allocator as na
+
+
+def test_allocates_in_sequence(tmp_path):
+    names = [na.allocate(str(tmp_path), "img_", 3, ext="png")[0] for _ in range(3)]
+
+    assert names == ["img_001.png", "img_002.png", "img_003.png"]
+    assert all(os.path.getsize(tmp_path / n) == 0 for n in names)
+
+
+def test_skips_existing_files(tmp_path):
+    (tmp_path / "img_01.png").write_bytes(b"old")
+    (tmp_path / "img_02.png").write_bytes(b"old")
+
+    assert na.allocate(str(tmp_path), "img_", 2)[0] == "img_03.png"
+    assert (tmp_path / "img_01.png").read_bytes() == b"old"
+
+
+def test_start_index_change_restarts_counter(tmp_path):
+    na.allocate(str(tmp_path), "a_", 2)
+    na.allocate(str(tmp_path), "a_", 2)
+
+    assert na.allocate(str(tmp_path), "a_", 2, start_idx=10)[0] == "a_10.png"
+    assert na.allocate(str(tmp_path), "b_", 2)[0] == "b_01.png"  # prefixes count separately
+
+
+def test_release_drops_empty_reservation_only(tmp_path):
+    _, empty = na.allocate(str(tmp_path), "img_", 2)
+    _, written = na.allocate(str(tmp_path), "img_", 2)
+    with open(written, "wb") as f:
+        f.write(b"data")
+
+    na.release(empty)
+    na.release(written)
+
+    assert not os.path.exists(empty) and os.path.exists(written)
+
+
+def test_concurrent_allocations_are_unique(tmp_path):
+    names, lock = [], threading.Lock()
+
+    def worker():
+        for _ in range(10):
+            name = na.allocate(str(tmp_path), "img_", 4)[0]
+            with lock:
+                names.append(name)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert len(set(names)) == 40
@@ -0,0 +1,84 @@
+import gc
+import json
+import asyncio
+import logging
+
+from watcher_engine.actions_lib import network_monitor
+
+LOG = logging.getLogger("test_network_monitor")
+STREAM_URL = "https://gemini.google.com/_/BardChatUi/data/assistant.lamda.BardFrontendService/StreamGenerate"
+DECLINED, QUOTA = ["I can't create"], ["reached your limit"]
+
+
+def _stream(reply, prompt="a red fox", images=()):
+    """A StreamGenerate body in Gemini's framing: the prompt is echoed next to the reply candidate."""
+    candidate = ["rc_1", [reply]] + ([None, ["image_generation_content", list(images)]] if images else [])
+    inner = [None, ["c_1", "r_1"], [[prompt]], None, [candidate]]
+    return ")]}'\n\n180\n" + json.dumps([["wrb.fr", None, json.dumps(inner)]]) + "\n"
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+
+class FakeRequest:
+    url = STREAM_URL
+
+
+class FakeResponse:
+    url = STREAM_URL
+
+    def __init__(self, request, body):
+        self.request, self.body = request, body
+
+    async def text(self):
+        return self.body
+
+
+def test_classify():
+    assert network_monitor.classify(_stream("Here you go", images=["https://x/gg-dl/1"]), DECLINED, QUOTA) == "success"
+    assert network_monitor.classify(_stream("You've reached your limit"), DECLINED, QUOTA) == "quota_exceeded"
+    assert network_monitor.classify(_stream("I can't create that image"), DECLINED, QUOTA) == "refused"
+    assert network_monitor.classify(_stream("Working on it"), DECLINED, QUOTA) is None
+    assert network_monitor.classify("<html>not a stream</html>", DECLINED, QUOTA) is None
+
+
+def test_classify_ignores_keywords_in_the_echoed_prompt():
+    body = _stream("Sure, generating it now.", prompt="Write I can't create on a sign")
+    assert network_monitor.classify(body, DECLINED, QUOTA) is None
+
+
+def test_stream_sent_before_arm_is_ignored():
+    async def scenario():
+        page = FakePage()
+        monitor = network_monitor.arm(page, LOG, {"network_detection": True}, DECLINED, QUOTA)
+        stale = FakeRequest()
+        for handler in page.handlers["request"]: handler(stale)
+        assert network_monitor.arm(page, LOG, {"network_detection": True}, DECLINED, QUOTA) is monitor
+
+        fresh = FakeRequest()
+        for handler in page.handlers["request"]: handler(fresh)
+        for handler in page.handlers["response"]:
+            await handler(FakeResponse(stale, _stream("I can't create that")))
+        assert monitor.status is None
+        for handler in page.handlers["response"]:
+            await handler(FakeResponse(fresh, _stream("Done", images=["https://x/gg-dl/1"])))
+        assert await monitor.wait(0) == "success"
+
+    asyncio.run(scenario())
+
+
+def test_monitor_is_dropped_with_its_page():
+    async def scenario():
+        page = FakePage()
+        network_monitor.arm(page, LOG, {"network_detection": True}, DECLINED, QUOTA)
+        assert len(network_monitor._monitors) == 1
+        del page
+        gc.collect()
+        assert len(network_monitor._monitors) == 0
+
+    asyncio.run(scenario())
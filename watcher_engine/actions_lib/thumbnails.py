@@ -0,0 +1,100 @@
+# watcher_engine/actions_lib/thumbnails.py
+# Version: V1.0.0
+# Description: Shared thumbnail service for the UI pages.
+# Thumbnails are small WebP files generated once and kept in an on-disk cache ('.thumb_cache'):
+# files on disk are keyed by path + mtime + size, in-memory uploads by content hash. Every hit refreshes the
+# file's mtime, and the cache is trimmed oldest-first (LRU) whenever it grows past MAX_CACHE_BYTES.
+
+import os
+import io
+import hashlib
+from PIL import Image, ImageOps
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(ROOT_DIR, ".thumb_cache")
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+DEFAULT_SIZE = 384
+QUALITY = 80
+# Trim the cache after this many new thumbnails rather than on every write.
+PRUNE_EVERY = 50
+
+_writes_since_prune = [0]
+
+def _cache_file(key, size):
+    digest = hashlib.sha1(f"{key}|{size}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.webp")
+
+def _hit(path):
+    try:
+        os.utime(path, None)
+        return True
+    except OSError:
+        return False
+
+def _render(img, dest, size):
+    if img.format == "JPEG":
+        img.draft("RGB", (size, size))  # decode at reduced scale instead of full resolution
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    img.save(tmp_path, "WEBP", quality=QUALITY, method=4)
+    os.replace(tmp_path, dest)
+    _writes_since_prune[0] += 1
+    if _writes_since_prune[0] >= PRUNE_EVERY:
+        prune()
+
+def thumbnail_path(src_path, size=DEFAULT_SIZE):
+    """Cached thumbnail of an image file; falls back to the original path if it cannot be rendered."""
+    try:
+        st = os.stat(src_path)
+    except OSError:
+        return src_path
+    dest = _cache_file(f"{os.path.abspath(src_path)}|{st.st_mtime_ns}|{st.st_size}", size)
+    if os.path.exists(dest) and _hit(dest):
+        return dest
+    try:
+        with Image.open(src_path) as img:
+            _render(img, dest, size)
+        return dest
+    except Exception:
+        return src_path
+
+def thumbnail_for_bytes(data, size=DEFAULT_SIZE):
+    """Cached thumbnail of in-memory image bytes (e.g. a Streamlit upload), keyed by content hash."""
+    dest = _cache_file(f"sha256:{hashlib.sha256(data).hexdigest()}", size)
+    if os.path.exists(dest) and _hit(dest):
+        return dest
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            _render(img, dest, size)
+        return dest
+    except Exception:
+        return None
+
+def prune(max_bytes=MAX_CACHE_BYTES):
+    """Delete least-recently-used thumbnails until the cache fits in max_bytes; returns bytes freed."""
+    _writes_since_prune[0] = 0
+    entries, total = [], 0
+    for dirpath, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    freed = 0
+    if total <= max_bytes: return 0
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            continue
+        if total - freed <= max_bytes * 0.9:
+            break
+    return freed
@@ -1,24 +1,16 @@
 import asyncio
 import os
 import json
-import sys
-from PIL import Image, PngImagePlugin
 
-# --- PATH ADAPTATION ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.append(current_dir)
+from watcher_engine.actions_lib import browser_crtl_logic as bcl
+from watcher_engine.actions_lib import image_ingest
+from watcher_engine.actions_lib import provenance
 
-try:
-    import browser_crtl_logic as bcl
-except ImportError:
-    from . import browser_crtl_logic as bcl
-
-# Version: V5.1.14
-# Update: Refactored MONITORING LOOP to pass logger every turn, ensuring immediate capture of refusal text.
+# Version: V5.7.0
+# Update: Optional network-level status detection (config 'network_detection').
 
 async def run(page, logger, config_path):
-    logger.info(">>> [STATUS] Running Upload_Test V5.1.14")
+    logger.info(">>> [STATUS] Running Upload_Test V5.7.0")
 
     try:
         # --- [STEP 0: Load Config] ---
@@ -29,13 +21,10 @@ async def run(page, logger, config_path):
         with open(config_path, "r", encoding="utf-8") as f:
             cfg = json.load(f)
 
-        save_dir = cfg.get("save_dir", "browser_outputs")
-        prompt_text = cfg.get("last_prompt", "AI generated art")
-        start_idx = cfg.get("name_start", 1)
-        prefix = cfg.get("name_prefix", "")
-        padding = cfg.get("name_padding", 2)        
+        prompt_text = cfg.get("last_prompt", "AI generated art")        
 
         if not await bcl.start_new_chat(page, logger, config_path): return False
+        provenance.start_job()
         with open(config_path, "r", encoding="utf-8") as f: cfg = json.load(f)
         if not await bcl.handle_file_upload(page, logger, cfg.get("upload_task", [])): return False
         await bcl.ensure_tool_selected(page, logger, "create image")
@@ -53,86 +42,33 @@ async def run(page, logger, config_path):
         }''', prompt_text)
         
         await asyncio.sleep(0.5)
+        monitor = await bcl.arm_network_monitor(page, logger, cfg)
         await page.keyboard.press("Enter")
         logger.info(">> [SIGNAL] Prompt submitted. Monitoring loop started.")
 
         # --- MONITORING LOOP ---
-        status = "waiting"
-        for i in range(20):
-            # Always pass logger to ensure check_response_status can print text the moment it appears
-            status = await bcl.check_response_status(page, logger)
-            
-            if status == "refused":
-                logger.error("[FAIL] Declined to generate.")
-                return False
-            elif status == "quota_exceeded":
-                logger.error("[END] Quota Limit detected.")
-                return False
-            elif status == "success":
-                logger.info(">> [SIGNAL] Images detected. Starting download...")
-                break
-                
-            # Heartbeat info every 10 seconds if still waiting
-            if i % 5 == 0 and status in ["waiting", "generating"]:
-                logger.info(f">> [MONITOR] Status: {status} (Attempt {i+1}/60)")
-                
-            await asyncio.sleep(2)
-        # --- END MONITORING LOOP ---
+        status = await bcl.monitor_generation(page, logger, max_polls=20, monitor=monitor)
 
-        if status != "success":
+        if status == "refused":
+            logger.error("[FAIL] Declined to generate.")
+            return False
+        elif status == "quota_exceeded":
+            logger.error("[END] Quota Limit detected.")
+            return False
+        elif status != "success":
             logger.error("[FAIL] [RESET_REQUIRED] Timeout or Image failure: No image signal detected.")
             return False
+        logger.info(">> [SIGNAL] Images detected. Starting download...")
 
         # --- DOWNLOAD PROCESS ---
-        last_response = await page.query_selector('model-response:last-of-type')
-        imgs = await last_response.query_selector_all('img') if last_response else []
-        dl_count = 0
+        record = provenance.build_record(cfg, prompt_text, page.url)
+        temp_paths = await bcl.collect_response_downloads(page, logger)
+        # Dedup check, filename reservation and encoding run off the event loop
+        dl_count = await asyncio.to_thread(image_ingest.ingest_batch, [(p, record) for p in temp_paths], cfg, prompt_text, logger)
 
-        for img in imgs:
-            box = await img.bounding_box()
-            if box and box['width'] > 150:
-                try:
-                    await img.evaluate('(el) => el.click()')
-                    await asyncio.sleep(3)
-                    async with page.expect_download(timeout=15000) as dl_info:
-                        await page.evaluate('''() => {
-                            const btn = Array.from(document.querySelectorAll('button'))
-                                             .find(b => (b.ariaLabel?.includes("Download") || b.innerText.includes("Download")) && b.offsetParent !== null);
-                            if (btn) btn.click();
-                        }''')
-                        download = await dl_info.value
-                        temp_path = await download.path()
-
-                        # Atomic collision check for filename
-                        while True:
-                            save_name = f"{prefix}{str(start_idx).zfill(padding)}.png"
-                            final_path = os.path.join(save_dir, save_name)
-                            if not os.path.exists(final_path): break
-                            start_idx += 1
-
-                        with Image.open(temp_path) as pil_img:
-                            meta = PngImagePlugin.PngInfo()
-                            meta.add_text("Prompt", prompt_text)
-                            pil_img.save(final_path, "PNG", pnginfo=meta)
-                        
-                        logger.info(f">> Saved: {save_name}")
-                        start_idx += 1
-                        dl_count += 1
-                    
-                    await page.keyboard.press("Escape")
-                    await asyncio.sleep(1.0)
-                except Exception as e:
-                    logger.error(f">> Download failed: {e}")
-                    await page.keyboard.press("Escape")
-
-        # Sync back to config
-        cfg["name_start"] = start_idx
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=4, ensure_ascii=False)
-            
         logger.info(f"[SUCCESS] Upload task finished. Downloaded: {dl_count}")
         return True
 
     except Exception as e:
-        logger.error(f"[FAIL] V5.1.14 Crash: {e}")
+        logger.error(f"[FAIL] V5.7.0 Crash: {e}")
         return False
\ No newline at end of file
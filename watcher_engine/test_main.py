@@ -0,0 +1,83 @@
+import asyncio
+import argparse
+import json
+
+import pytest
+
+from watcher_engine import __main__ as cli
+from watcher_engine import watcher
+from watcher_engine.actions_lib import counter_store
+
+
+class FakeEngine:
+    """dispatch_action stand-in: logs one [SUCCESS] line per job and records the prompt it ran."""
+    def __init__(self):
+        self.prompts = []
+
+    async def dispatch_action(self, action, task=None):
+        with open(watcher.CONFIG_FILE, "r", encoding="utf-8") as f:
+            self.prompts.append(json.load(f)["last_prompt"])
+        watcher.logger.info("[SUCCESS] Upload task finished. Downloaded: 1")
+        return True
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"last_prompt": "mine", "upload_task": ["a.png"], "url": "https://x/app"}))
+    monkeypatch.setattr(watcher, "CONFIG_FILE", str(path))
+    monkeypatch.setattr(counter_store, "DB_FILE", str(tmp_path / "counters.db"))
+    return path
+
+
+def _args(**kw):
+    base = dict(redo=0, max_jobs=0, max_images=0, max_minutes=0, max_failures=5)
+    return argparse.Namespace(**{**base, **kw})
+
+
+def test_manifest_run_restores_config(config):
+    engine = FakeEngine()
+    runner = cli.BatchRun(engine, _args(redo=1))
+    watcher.logger.addHandler(runner.markers)
+    try:
+        status, reason = asyncio.run(runner.run([{"prompt": "p1", "url": "https://x/gem"}, {"prompt": "p2"}]))
+    finally:
+        watcher.logger.removeHandler(runner.markers)
+
+    assert (status, reason) == (cli.EXIT_OK, "manifest complete")
+    assert engine.prompts == ["p1", "p1", "p2", "p2"]
+    restored = {k: v for k, v in json.loads(config.read_text()).items() if k in cli.MANIFEST_FIELDS}
+    assert restored == {"last_prompt": "mine", "upload_task": ["a.png"], "url": "https://x/app"}
+
+
+def test_load_manifest_json(tmp_path):
+    path = tmp_path / "prompts.json"
+    path.write_text(json.dumps(["a cat", {"prompt": "a dog", "redo": 2, "url": "https://x/gem"}]), encoding="utf-8")
+
+    assert cli.load_manifest(str(path)) == [{"prompt": "a cat"}, {"prompt": "a dog", "redo": 2, "url": "https://x/gem"}]
+
+
+def test_load_manifest_txt_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / "prompts.txt"
+    path.write_text("a cat\n\n# not a prompt\n  a dog  \n", encoding="utf-8")
+
+    assert cli.load_manifest(str(path)) == [{"prompt": "a cat"}, {"prompt": "a dog"}]
+
+
+@pytest.mark.parametrize("data", [{"prompt": "not a list"}, [{"url": "https://x/gem"}]])
+def test_load_manifest_rejects_bad_json(tmp_path, data):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        cli.load_manifest(str(path))
+
+
+@pytest.mark.parametrize("line, action", [
+    ("", "upload_test"),
+    ("[FAIL] [RESET_REQUIRED] Timeout", "upload_test"),
+    ("[SUCCESS] Upload task finished. Downloaded: 1", "upload_test_redo"),
+    ("[FAIL] Declined to generate.", "upload_test_redo"),
+])
+def test_next_action(line, action):
+    assert cli.next_action(line) == action
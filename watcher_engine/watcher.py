@@ -1,6 +1,17 @@
 # watcher_engine/watcher.py
-# Version: V2.8.1
+# Version: V2.14.0
 # Description: Adaptive Viewport Logic with Dynamic URL Sync and Redo Protection.
+# Update V2.9.0: Run counters are recorded per job in counter_store (SQLite) while the action logs its events.
+# Update V2.10.0: Publishes engine.pid and a heartbeat (engine_status.json) for O(1) discovery by the UI.
+# Update V2.10.1: engine_version is written through config_store (locked, atomic field patch).
+# Update V2.11.0: engine.log is appended across restarts and rotated at LOG_MAX_BYTES into gzip archives.
+# Update V2.12.0: Bulk Gem scraping runs as a background task (gem_scraper.request_loop) in throwaway pages;
+#                 stealth is injected at context level so those pages get it too. The background tasks are
+#                 cancelled and awaited when run() exits.
+# Update V2.13.0: Generation jobs are gated on auth_check (cached cookie pre-check, DOM only when inconclusive);
+#                 a signed-out session ends the loop with [END] instead of running the job.
+# Update V2.13.1: launch_browser() passes extra context options through (e.g. HAR recording for the replay harness).
+# Update V2.14.0: dispatch_action() returns the job result (for the CLI batch runner, 'python -m watcher_engine').
 # UI and Comments: English only.
 
 import os
@@ -13,7 +24,7 @@ import importlib
 from playwright.async_api import async_playwright
 
 # --- CONFIG ---
-ENGINE_VERSION = "V2.8.1" 
+ENGINE_VERSION = "V2.14.0" 
 WATCHER_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(WATCHER_DIR)
 CONFIG_FILE = os.path.join(ROOT_DIR, "config.json")
@@ -21,28 +32,37 @@ TASK_FILE = os.path.join(ROOT_DIR, "task.json")
 LOG_FILE = os.path.join(ROOT_DIR, "engine.log")
 USER_DATA_DIR = os.path.join(WATCHER_DIR, "gemini_user_data")
 STATE_FILE = os.path.join(WATCHER_DIR, "state.json")
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 10
 DEFAULT_URL = "https://gemini.google.com/app"
+# Actions that submit prompts; each one is preceded by a sign-in check.
+AUTH_REQUIRED_ACTIONS = {"upload_test", "upload_test_redo"}
 
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
+from watcher_engine.actions_lib import counter_store
+from watcher_engine.actions_lib import engine_status
+from watcher_engine.actions_lib import config_store
+from watcher_engine.actions_lib import gem_scraper
+from watcher_engine.actions_lib import auth_check
+from watcher_engine.actions_lib.log_tail import rotating_handler
+
 # --- LOGGING ---
 logging.basicConfig(
     level=logging.INFO, 
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler(LOG_FILE, encoding='utf-8', mode='w'), logging.StreamHandler()]
+    handlers=[rotating_handler(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUPS), logging.StreamHandler()]
 )
 logger = logging.getLogger(__name__)
+counter_handler = counter_store.CounterHandler()
+logger.addHandler(counter_handler)
 
 def safe_sync_version():
     """Sync ENGINE_VERSION to config.json."""
     if not os.path.exists(CONFIG_FILE): return
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        data["engine_version"] = ENGINE_VERSION
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        config_store.set_field("engine_version", ENGINE_VERSION, CONFIG_FILE)
         logger.info(f"🔄 Version Check: Engine synchronized to {ENGINE_VERSION}")
     except Exception as e:
         logger.error(f"Version sync failed: {e}")
@@ -54,24 +74,35 @@ class GemiWatcher:
         self.playwright = None
         self.is_headless = False
         self.last_action_url = None # Tracks the URL used in the last non-redo action
+        self.current_action = None
+        self.last_job = None
+
+    def heartbeat_state(self):
+        """Engine fields published in engine_status.json."""
+        if self.current_action: status = f"busy:{self.current_action}"
+        elif self.page: status = "ready"
+        else: status = "idle"
+        return {
+            "status": status,
+            "engine_version": ENGINE_VERSION,
+            "headless": self.is_headless,
+            "queue_depth": 1 if os.path.exists(TASK_FILE) else 0,
+            "last_job": self.last_job,
+        }
 
     def get_config_url(self):
         """Fetch the latest URL from config.json with fallback logic."""
-        if not os.path.exists(CONFIG_FILE):
-            return DEFAULT_URL
         try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            url = data.get("url")
+            url = config_store.load(CONFIG_FILE).get("url")
             return url if url and url.strip() else DEFAULT_URL
         except Exception as e:
             logger.error(f"Error reading config URL: {e}")
             return DEFAULT_URL
 
-    async def apply_hardcore_stealth(self, page):
-        """Manual JS injection for anti-detection."""
+    async def apply_hardcore_stealth(self, target):
+        """Manual JS injection for anti-detection (a page, or the whole context so every new page gets it)."""
         try:
-            await page.add_init_script("""
+            await target.add_init_script("""
                 Object.defineProperty(navigator, 'webdriver', {get: () => False});
                 window.chrome = { runtime: {} };
                 Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
@@ -104,9 +135,11 @@ class GemiWatcher:
             except Exception as e:
                 logger.error(f"⚠️ Save state failed: {e}")
 
-    async def launch_browser(self, headless=False):
+    async def launch_browser(self, headless=False, **context_options):
+        """context_options are added to launch_persistent_context (e.g. record_har_path)."""
         if self.browser_context: return
         self.is_headless = headless
+        auth_check.invalidate()
         
         logger.info(f">>> Launching Browser (Headless={headless})...")
         try:
@@ -125,14 +158,15 @@ class GemiWatcher:
                     "--start-maximized",
                     "--disable-blink-features=AutomationControlled",
                     "--no-sandbox"
-                ]
+                ],
+                **context_options
             )
             
             if headless:
                 await self.inject_session_state()
 
+            await self.apply_hardcore_stealth(self.browser_context)
             self.page = await self.browser_context.new_page()
-            await self.apply_hardcore_stealth(self.page)
             
             # Initial Navigation
             target_url = self.get_config_url()
@@ -153,9 +187,16 @@ class GemiWatcher:
         except Exception as e:
             logger.error(f"❌ Launch failed: {e}")
 
-    async def dispatch_action(self, action_name):
-        """Action loader with URL sync and redo-protection logic."""
+    async def dispatch_action(self, action_name, task=None):
+        """Action loader with URL sync and redo-protection logic. 'loop' in the task marks a loop job. Returns ok."""
+        job_id, ok = None, False
         try:
+            if action_name in AUTH_REQUIRED_ACTIONS:
+                signed_in, source = await auth_check.check(self.page, logger, CONFIG_FILE)
+                if not signed_in:
+                    logger.error(f"[END] Not signed in (via {source}): '{action_name}' skipped. Sign in and restart.")
+                    return False
+
             current_config_url = self.get_config_url()
             is_redo_action = "redo" in action_name.lower()
 
@@ -174,45 +215,71 @@ class GemiWatcher:
             module_name = f"watcher_engine.actions_lib.{action_name}"
             module = importlib.import_module(module_name)
             importlib.reload(module)
+            loop = bool((task or {}).get("loop"))
+            try:
+                job_id = counter_store.begin_job(action_name, loop)
+            except Exception as e:
+                logger.warning(f"⚠️ Counter store unavailable: {e}")
+            counter_handler.job_id, counter_handler.loop = job_id, loop
+            self.current_action = action_name
             logger.info(f"🚀 Executing Action: {action_name}")
             
-            await module.run(self.page, logger, CONFIG_FILE)
+            ok = bool(await module.run(self.page, logger, CONFIG_FILE))
+            counter_handler.job_id = None
             
             if not self.is_headless:
                 await self.save_session_state()
         except Exception as e:
             logger.error(f"Action '{action_name}' error: {e}")
+        finally:
+            counter_handler.job_id = None
+            if self.current_action:
+                self.last_job = {"action": action_name, "ok": ok, "finished": time.time()}
+            self.current_action = None
+            if job_id is not None:
+                try: counter_store.end_job(job_id, ok)
+                except Exception: pass
+        return ok
 
     async def run(self):
         safe_sync_version()
+        engine_status.write_pid()
+        heartbeat = asyncio.create_task(engine_status.heartbeat_loop(self.heartbeat_state, logger))
+        gem_requests = asyncio.create_task(
+            gem_scraper.request_loop(lambda: self.browser_context if self.page else None, logger, CONFIG_FILE))
         logger.info(f"Watcher Engine {ENGINE_VERSION} Active. Listening for tasks...")
         
-        while True:
-            if os.path.exists(TASK_FILE):
-                try:
-                    await asyncio.sleep(0.3)
-                    with open(TASK_FILE, 'r', encoding='utf-8') as f:
-                        task = json.load(f)
-                    action = task.get("action")
+        try:
+            while True:
+                if os.path.exists(TASK_FILE):
+                    try:
+                        await asyncio.sleep(0.3)
+                        with open(TASK_FILE, 'r', encoding='utf-8') as f:
+                            task = json.load(f)
+                        action = task.get("action")
                     
-                    if action == "launch": await self.launch_browser(headless=False)
-                    elif action == "launch_headless": await self.launch_browser(headless=True)
-                    elif action == "close_browser":
-                        if self.browser_context:
-                            await self.save_session_state()
-                            await self.browser_context.close()
-                            await self.playwright.stop()
-                            self.page = None; self.browser_context = None
-                            self.last_action_url = None
-                        logger.info("Browser closed.")
-                    elif action:
-                        if self.page: await self.dispatch_action(action)
-                        else: logger.error(f"Action '{action}' ignored: Browser inactive.")
+                        if action == "launch": await self.launch_browser(headless=False)
+                        elif action == "launch_headless": await self.launch_browser(headless=True)
+                        elif action == "close_browser":
+                            if self.browser_context:
+                                await self.save_session_state()
+                                await self.browser_context.close()
+                                await self.playwright.stop()
+                                self.page = None; self.browser_context = None
+                                self.last_action_url = None
+                            logger.info("Browser closed.")
+                        elif action:
+                            if self.page: await self.dispatch_action(action, task)
+                            else: logger.error(f"Action '{action}' ignored: Browser inactive.")
                     
-                    if os.path.exists(TASK_FILE): os.remove(TASK_FILE)
-                except Exception as e:
-                    logger.error(f"Main loop error: {e}")
-            await asyncio.sleep(1)
+                        if os.path.exists(TASK_FILE): os.remove(TASK_FILE)
+                    except Exception as e:
+                        logger.error(f"Main loop error: {e}")
+                await asyncio.sleep(1)
+        finally:
+            # Background loops are stopped and awaited so they cannot write status files after exit.
+            for task in (heartbeat, gem_requests): task.cancel()
+            await asyncio.gather(heartbeat, gem_requests, return_exceptions=True)
 
 if __name__ == "__main__":
     watcher = GemiWatcher()
@@ -221,4 +288,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Stopped by user.")
     except Exception as e:
-        logger.critical(f"System Crash: {e}")
\ No newline at end of file
+        logger.critical(f"System Crash: {e}")
+    finally:
+        engine_status.clear()
\ No newline at end of file